@@ -0,0 +1,105 @@
+"""
+Mergeable accumulators for statistics computed in pieces.
+
+Each accumulator can be updated with a block of rows, merged with another
+accumulator (`+=`) and, where the statistic allows it, have a block's
+contribution removed again (`-=`). Partition-level incremental refreshes and
+chunked streaming both build on these.
+"""
+import numpy as np
+
+from binning import bin_codes
+
+
+class CorrelationMoments:
+    """Pairwise-complete sufficient statistics for k numeric columns.
+
+    For every column pair (i, j) over the rows where both are present:
+    n[i, j] = row count, sx[i, j] = sum of x_i, sxx[i, j] = sum of x_i^2 and
+    sxy[i, j] = sum of x_i * x_j. The diagonal gives per-column count, sum
+    and sum of squares.
+    """
+
+    FIELDS = ('n', 'sx', 'sxx', 'sxy')
+
+    def __init__(self, k):
+        for field in self.FIELDS:
+            setattr(self, field, np.zeros((k, k)))
+
+    @classmethod
+    def from_arrays(cls, n, sx, sxx, sxy):
+        m = cls(0)
+        m.n, m.sx, m.sxx, m.sxy = n, sx, sxx, sxy
+        return m
+
+    @classmethod
+    def from_rows(cls, X):
+        m = cls(X.shape[1])
+        m.update(X)
+        return m
+
+    def update(self, X):
+        """Add a (rows, k) block with NaN for missing values."""
+        present = (~np.isnan(X)).astype(float)
+        Xz = np.where(present > 0, X, 0.0)
+        self.n += present.T @ present
+        self.sx += Xz.T @ present
+        self.sxx += (Xz * Xz).T @ present
+        self.sxy += Xz.T @ Xz
+        return self
+
+    def copy(self):
+        return self.from_arrays(*(getattr(self, f).copy() for f in self.FIELDS))
+
+    def __iadd__(self, other):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def __isub__(self, other):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) - getattr(other, field))
+        return self
+
+    def count(self):
+        return np.diag(self.n).copy()
+
+    def total(self):
+        return np.diag(self.sx).copy()
+
+    def mean(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count() > 0, self.total() / self.count(), np.nan)
+
+    def pearson(self):
+        """k x k pairwise-complete Pearson matrix (NaN where undefined)."""
+        n, sx, sy = self.n, self.sx, self.sx.T
+        sxx, syy = self.sxx, self.sxx.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * self.sxy - sx * sy
+            var_x = n * sxx - sx * sx
+            var_y = n * syy - sy * sy
+            r = cov / np.sqrt(var_x * var_y)
+        r = np.where((n < 2) | (var_x <= 0) | (var_y <= 0), np.nan, r)
+        return np.clip(r, -1.0, 1.0)
+
+
+class BinCounts:
+    """Histogram counts over fixed edges (left-closed bins, NaN ignored)."""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, values):
+        idx = bin_codes(values, self.edges)
+        self.counts += np.bincount(idx[idx >= 0], minlength=len(self.counts))
+        return self
+
+    def __iadd__(self, other):
+        self.counts = self.counts + other.counts
+        return self
+
+    def __isub__(self, other):
+        self.counts = self.counts - other.counts
+        return self
@@ -1,32 +1,33 @@
 
-import pandas as pd
 import numpy as np
 
+from data_loader import XLSX_PATH, school_data_columns
+from driver_scan import scan_drivers
+from metrics import METRICS
+from query import Query
+
+t_col = 'enquiries_started'
+s_col = 'StudentFTE'
+
 # Load Data
 try:
-    xl = pd.ExcelFile('School Level Data.xlsx')
-    df = pd.read_excel(xl, sheet_name=0)
+    columns = school_data_columns(XLSX_PATH)
 except Exception as e:
     print(f"Error loading Excel: {e}")
     exit()
 
-t_col = 'enquiries_started'
-s_col = 'StudentFTE'
-
-if t_col not in df.columns or s_col not in df.columns:
+if t_col not in columns or s_col not in columns:
     print(f"Missing columns: {t_col} or {s_col}")
     exit()
 
-# Handle numeric
-df[t_col] = pd.to_numeric(df[t_col], errors='coerce')
-df[s_col] = pd.to_numeric(df[s_col], errors='coerce')
-
-# Filter
-df = df.dropna(subset=[t_col, s_col])
-df = df[df[s_col] > 10] # Filter very small schools
+# Filter (applied while scanning, before rows are loaded)
+df = (Query(XLSX_PATH)
+      .dropna(t_col, s_col)
+      .where(s_col, '>', 10)  # Filter very small schools
+      .collect())
 
 # Calculate Rate
-df['Rate'] = df[t_col] / df[s_col]
+df['Rate'] = METRICS['rate'].series(df)
 
 print(f"Calculated Rate for {len(df)} schools.")
 print(f"Mean Rate: {df['Rate'].mean():.4f}")
@@ -34,8 +35,8 @@ print(f"Mean Rate: {df['Rate'].mean():.4f}")
 # Select numeric
 numeric_df = df.select_dtypes(include=[np.number])
 
-# Spearman Correlation with Rate
-corr = numeric_df.corr(method='spearman')['Rate'].sort_values(ascending=False)
+# Spearman Correlation with Rate (only the Rate row, not the full matrix)
+corr = scan_drivers(numeric_df, 'Rate')['r'].rename('Rate').sort_values(ascending=False)
 
 print("\n--- TOP POSITIVE DRIVERS of Enquiry/Student ---")
 print(corr.head(15))
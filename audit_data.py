@@ -1,21 +1,28 @@
 
-import pandas as pd
 import numpy as np
 
-# Load the data
-df = pd.read_excel('School Level Data.xlsx')
+from cube import load_cube
+from data_loader import XLSX_PATH, school_data_columns
+from metrics import METRICS
+from query import Query
 
-# Filter for latest year (assuming 2024 based on previous context)
-df_24 = df[df['FiscalYear'] == 2024]
+# Filter for latest year (assuming 2024 based on previous context);
+# only these columns of the FY2024 rows are read
+fy24 = Query(XLSX_PATH).where('FiscalYear', '==', 2024)
+available = set(school_data_columns(XLSX_PATH))
+df_24 = fy24.select(*[c for c in (
+    'FiscalYear', 'Region', 'StudentFTE', 'enquiries_started', 'App',
+    'NAE_Overall_Average_Fee_USD', 'nps_score', 'Teachers_Attrition_Pct',
+) if c in available]).collect()
 
 print(f"--- Data Summary for 2024 (n={len(df_24)}) ---")
 print(f"Total Student FTE: {df_24['StudentFTE'].sum():,.0f}")
 print(f"Total Enquiries: {df_24['enquiries_started'].sum():,.0f}")
-print(f"Total Applications: {df_24['App'].sum():,.0f}" if 'App' in df.columns else "App column missing")
+print(f"Total Applications: {df_24['App'].sum():,.0f}" if 'App' in df_24.columns else "App column missing")
 
 # Correlation Matrix (Key Strategic Variables)
 cols = ['StudentFTE', 'enquiries_started', 'App', 'NAE_Overall_Average_Fee_USD', 'nps_score', 'Teachers_Attrition_Pct']
-existing_cols = [c for c in cols if c in df.columns]
+existing_cols = [c for c in cols if c in df_24.columns]
 
 print("\n--- Correlation Matrix (Spearman) ---")
 corr = df_24[existing_cols].corr(method='spearman')
@@ -23,10 +30,11 @@ print(corr)
 
 # Check the 'Rate' (Enquiries per Student)
 df_24 = df_24.copy()
-df_24['Rate'] = df_24['enquiries_started'] / df_24['StudentFTE']
+df_24['Rate'] = METRICS['rate'].series(df_24)
 print(f"\nGlobal Mean Rate: {df_24['Rate'].mean():.2f}")
 
 # Region Check
-if 'Region' in df.columns:
+if 'Region' in df_24.columns:
     print("\n--- Mean Rate by Region ---")
-    print(df_24.groupby('Region')['Rate'].mean().sort_values(ascending=False))
+    by_region = load_cube(XLSX_PATH).mean('rate', 'Region', FiscalYear=2024).rename('Rate')
+    print(by_region.sort_values(ascending=False))
@@ -0,0 +1,344 @@
+"""
+Scale-out benchmark for the analysis scripts.
+
+Builds synthetic School Level Data panels with the randomize_data.py model
+(synthetic.py) at several row counts, plus wide variants padded with extra
+numeric columns, and times each stage the scripts run: load, rate/
+utilization derivation, correlation scans, group-bys, chart rendering,
+sample extraction and dashboard payloads.
+
+Every dataset runs in a fresh process inside a temporary directory, so
+caches and memory start clean. Each stage records its wall time and its own
+peak RSS (the kernel high-water mark is reset between stages on Linux;
+elsewhere the peak is cumulative for the dataset's process).
+
+Each run is appended as one JSON line to benchmarks.jsonl, and the printed
+table compares every stage with the previous run of the same dataset.
+
+    python benchmark.py                                   # 1k, 100k, 10M rows + wide variants
+    python benchmark.py --rows 1000 100000 --wide-rows 1000
+    python benchmark.py --stages load_cold,charts,dashboard
+"""
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from profiling import peak_rss_mb, reset_peak_rss
+
+RESULTS_PATH = 'benchmarks.jsonl'
+YEARS = 7  # FY2020-FY2026, as in the source file
+WIDE_NAN_FRACTION = 0.05
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    rows: int
+    extra_columns: int = 0
+
+
+def size_label(rows):
+    for factor, suffix in ((10**6, 'M'), (10**3, 'k')):
+        if rows >= factor and rows % factor == 0:
+            return f'{rows // factor}{suffix}'
+    return str(rows)
+
+
+def datasets(rows, wide_rows, wide_columns):
+    out = [Dataset(f'tall-{size_label(n)}', n) for n in rows]
+    out += [Dataset(f'wide{wide_columns}-{size_label(n)}', n, wide_columns) for n in wide_rows]
+    return out
+
+
+def build_frame(dataset, seed=0):
+    """Synthetic panel of `dataset.rows` rows, padded to the requested width."""
+    from synthetic import synthetic_panel
+
+    n_schools = math.ceil(dataset.rows / YEARS)
+    df = synthetic_panel(n_schools, YEARS, seed=seed).head(dataset.rows)
+    rng = np.random.default_rng(seed + 1)
+    # Columns the scripts read that the synthetic model does not produce
+    df['Revenue'] = df['StudentFTE'] * df['NAE_Overall_Average_Fee_USD']
+    founded = rng.integers(1960, 2020, n_schools)[np.arange(len(df)) // YEARS]
+    df['school_age'] = df['FiscalYear'] - founded
+    extra = dataset.extra_columns - len(df.columns)
+    if extra > 0:
+        # Noise with a random loading on enquiries, so driver scans find some signal
+        enq = df['enquiries_started'].to_numpy()
+        z = (enq - enq.mean()) / (enq.std() or 1)
+        values = rng.standard_normal((len(df), extra)) + np.outer(z, rng.uniform(-1, 1, extra))
+        values[rng.random(values.shape) < WIDE_NAN_FRACTION] = np.nan
+        names = [f'metric_{i:03d}' for i in range(1, extra + 1)]
+        df = pd.concat([df, pd.DataFrame(values, columns=names, index=df.index)], axis=1)
+    return df
+
+
+# ----------------------------------------------------------------------------
+# Stages: each takes the shared context dict (dataset, source, df, ...)
+# ----------------------------------------------------------------------------
+def stage_imports(ctx):
+    # Imported up front so later stages time their work, not module loading
+    for module in ('data_loader', 'hypotheses', 'driver_scan', 'charts', 'incremental',
+                   'streaming', 'extract_samples', 'dashboard_data'):
+        importlib.import_module(module)
+
+
+def stage_generate(ctx):
+    ctx['frame'] = build_frame(ctx['dataset'], ctx['seed'])
+
+
+def stage_write_csv(ctx):
+    ctx.pop('frame').to_csv(ctx['source'], index=False)
+    ctx['csv_bytes'] = os.path.getsize(ctx['source'])
+
+
+def stage_load_cold(ctx):
+    from data_loader import load_school_data
+    ctx['df'] = load_school_data(source=ctx['source'])
+
+
+def stage_load_warm(ctx):
+    from data_loader import load_school_data
+    ctx['df'] = load_school_data(source=ctx['source'])
+
+
+def stage_derive(ctx):
+    from hypotheses import DERIVED_METRICS, MetricFrame
+    frame = MetricFrame(ctx['df'])
+    for name in DERIVED_METRICS:
+        frame.column(name)
+
+
+def stage_correlations(ctx):
+    from charts import correlation_columns
+    from driver_scan import scan_drivers
+    df = ctx['df']
+    scan_drivers(df.select_dtypes(include=[np.number]), 'enquiries_started')
+    df[correlation_columns(df)].corr()
+
+
+def stage_hypotheses(ctx):
+    from hypotheses import CHECKS, DRIVERS, HYPOTHESES, evaluate
+    evaluate(ctx['df'], HYPOTHESES + CHECKS + DRIVERS)
+
+
+def stage_panel(ctx):
+    from hypotheses import HYPOTHESES, evaluate_panel
+    evaluate_panel(ctx['df'], HYPOTHESES, resamples=1000)
+
+
+def stage_groupby(ctx):
+    from charts import prepare_region_stats
+    from dashboard_data import regional_rates, yearly_totals
+    df = ctx['df']
+    prepare_region_stats(df)
+    regional_rates(df)
+    yearly_totals(df, 'enquiries_started')
+
+
+def stage_partition_store(ctx):
+    from incremental import PartitionStore
+    PartitionStore().refresh(ctx['df'])
+
+
+def stage_cube(ctx):
+    from cube import Cube
+    cube = Cube.from_frame(ctx['df'])
+    cube.mean('rate', 'Region')
+    cube.total('StudentFTE', 'FiscalYear')
+    cube.mean('rate', 'Country', Region='Europe')
+
+
+def stage_streaming(ctx):
+    from streaming import stream_statistics
+    stream_statistics(ctx['source'])
+
+
+def stage_charts(ctx):
+    from charts import EDA_CHARTS, run_chart_jobs
+    run_chart_jobs(ctx['df'], EDA_CHARTS, processes=1)
+
+
+def stage_samples(ctx):
+    from extract_samples import fill_reservoir, sample_records
+    reservoir = fill_reservoir(ctx['source'], 100, strata=('Region', 'FiscalYear'))
+    sample_records(reservoir, 100)
+
+
+def stage_dashboard(ctx):
+    from dashboard_data import build_payloads, encode
+    for payload in build_payloads(ctx['df']).values():
+        encode(payload)
+
+
+# Setup stages always run; the others can be selected with --stages
+SETUP_STAGES = ['imports', 'generate', 'write_csv', 'load_cold']
+STAGES = {
+    'imports': stage_imports,
+    'generate': stage_generate,
+    'write_csv': stage_write_csv,
+    'load_cold': stage_load_cold,
+    'load_warm': stage_load_warm,
+    'derive': stage_derive,
+    'correlations': stage_correlations,
+    'hypotheses': stage_hypotheses,
+    'panel': stage_panel,
+    'groupby': stage_groupby,
+    'partition_store': stage_partition_store,
+    'cube': stage_cube,
+    'streaming': stage_streaming,
+    'charts': stage_charts,
+    'samples': stage_samples,
+    'dashboard': stage_dashboard,
+}
+
+
+# ----------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------
+def run_dataset(dataset, stages, seed=0):
+    """Run `stages` on `dataset` in a temporary directory (call in a fresh process)."""
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    result = {**asdict(dataset), 'stages': [], 'peak_rss_scope': 'stage' if reset_peak_rss() else 'process'}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as tmp:
+        os.chdir(tmp)
+        ctx = {'dataset': dataset, 'seed': seed, 'source': 'School Level Data.csv'}
+        try:
+            for name in stages:
+                reset_peak_rss()
+                start = time.perf_counter()
+                try:
+                    STAGES[name](ctx)
+                except Exception as e:
+                    result['stages'].append({'stage': name, 'error': f'{type(e).__name__}: {e}'})
+                    result['traceback'] = traceback.format_exc()
+                    break
+                stage = {'stage': name, 'seconds': round(time.perf_counter() - start, 4), 'peak_rss_mb': peak_rss_mb()}
+                result['stages'].append(stage)
+                # Progress, so a worker killed mid-dataset still shows how far it got
+                print(f"  {name}: {stage['seconds']:.3f}s", flush=True)
+            if 'df' in ctx:
+                result['columns'] = len(ctx['df'].columns)
+            result['csv_bytes'] = ctx.get('csv_bytes')
+        finally:
+            os.chdir(cwd)
+    return result
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def previous_stages(history, dataset_name):
+    """{stage: seconds} from the most recent run that completed `dataset_name`."""
+    for run in reversed(history):
+        for ds in run['datasets']:
+            if ds['name'] != dataset_name or 'error' in ds:
+                continue
+            stages = ds.get('stages', [])
+            if any('error' in s for s in stages):
+                continue  # A failed stage leaves the others incomparable; look further back
+            return {s['stage']: s['seconds'] for s in stages if 'seconds' in s}
+    return {}
+
+
+def print_report(record, history):
+    print(f"\n{'Dataset':<18} {'Stage':<16} {'Time (s)':>10} {'Peak RSS (MB)':>14} {'vs last':>9}")
+    print("-" * 71)
+    for ds in record['datasets']:
+        prev = previous_stages(history, ds['name'])
+        for s in ds['stages']:
+            if 'error' in s:
+                print(f"{ds['name']:<18} {s['stage']:<16} FAILED: {s['error']}")
+                continue
+            ratio = f"{s['seconds'] / prev[s['stage']]:.2f}x" if prev.get(s['stage']) else ''
+            rss = f"{s['peak_rss_mb']:,.0f}" if s['peak_rss_mb'] is not None else '-'
+            print(f"{ds['name']:<18} {s['stage']:<16} {s['seconds']:>10.3f} {rss:>14} {ratio:>9}")
+        if 'error' in ds:
+            print(f"{ds['name']:<18} FAILED: {ds['error']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Time and measure every analysis stage on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='*', default=[10**3, 10**5, 10**7],
+                        help='row counts of the tall datasets (default: 1000 100000 10000000)')
+    parser.add_argument('--wide-rows', type=int, nargs='*', default=[10**3, 10**5],
+                        help='row counts of the wide datasets (default: 1000 100000)')
+    parser.add_argument('--wide-columns', type=int, default=200,
+                        help='total columns of the wide datasets (default: 200, like the source file)')
+    parser.add_argument('--stages', default=None,
+                        help='comma-separated stages to time (default: all): ' + ', '.join(STAGES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=RESULTS_PATH, help=f'results file, one JSON run per line (default: {RESULTS_PATH})')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stages = list(STAGES)
+    if args.stages:
+        wanted = [s.strip() for s in args.stages.split(',') if s.strip()]
+        unknown = [s for s in wanted if s not in STAGES]
+        if unknown:
+            raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(STAGES)}")
+        stages = SETUP_STAGES + [s for s in stages if s in wanted and s not in SETUP_STAGES]
+
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpus': os.cpu_count(),
+        'datasets': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    for dataset in datasets(args.rows, args.wide_rows, args.wide_columns):
+        print(f"Running {dataset.name} ({dataset.rows:,} rows)...", flush=True)
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_dataset, dataset, stages, args.seed).result()
+        except BrokenProcessPool:
+            result = {**asdict(dataset), 'stages': [], 'error': 'worker process died (out of memory?)'}
+        record['datasets'].append(result)
+
+    history = load_history(args.out)
+    with open(args.out, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+    print_report(record, history)
+    print(f"\nResults appended to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Binning service: histogram counts of any metric in one pass over the rows.
+
+Bins are left-closed; NaN and values outside the edges are not counted.
+`histogram()` counts a whole column with np.histogram. With grouping
+columns, `bin_codes()` finds every value's bin with one np.searchsorted over
+the edges, each row's group codes are folded into its bin code and a single
+bincount returns the (group x ... x bin) counts; any marginal is a sum over
+axes. Either way the rows are scanned once, whatever the number of bins:
+
+    h = histogram(util, UTIL_EDGES, by=[df['Region'], df['FiscalYear']])
+    h.total()              # network counts per bin
+    h.by('Region')         # DataFrame: one row per region, one column per bin
+
+`histograms()` serves several binnings of the same values from that one
+scan: they are binned over the union of the edges and the fine counts are
+summed into each requested binning. UTIL_BIN_EDGES is that union for the
+utilization histograms of the EDA page and of dashboard.html.
+
+    python binning.py --metric utilization --by Region
+"""
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CSV_PATH, load_school_data
+from metrics import METRICS
+from panel import GroupIndex
+from stats_engine import as_float_array
+
+# Utilization bins of the EDA page (one 110%+ bin) and of dashboard.html (10% wide up to 120%)
+UTIL_EDGES = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 200]
+DASHBOARD_UTIL_EDGES = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120]
+
+
+def merge_edges(*edge_lists):
+    """Sorted union of several edge lists; every one of them is a coarsening of it."""
+    return sorted(set().union(*(map(float, edges) for edges in edge_lists)))
+
+
+# Both utilization binnings are sums of these bins, so one pass serves every page
+UTIL_BIN_EDGES = merge_edges(UTIL_EDGES, DASHBOARD_UTIL_EDGES)
+
+
+def bin_codes(values, edges, closed_last=False):
+    """Bin index of each value over `edges` (left-closed bins), -1 for NaN and values outside.
+
+    closed_last=True also puts values equal to the last edge in the last
+    bin, as np.histogram does.
+    """
+    values = as_float_array(values)
+    edges = np.asarray(edges, dtype=float)
+    codes = np.searchsorted(edges, values, side='right') - 1  # NaN sorts past the last edge
+    if closed_last:
+        codes[values == edges[-1]] = len(edges) - 2
+    codes[codes >= len(edges) - 1] = -1
+    return codes
+
+
+def coarsen(counts, edges, to):
+    """Counts over `edges` (last axis) summed into the bins of `to`, a subset of `edges`."""
+    edges, to = np.asarray(edges, dtype=float), np.asarray(to, dtype=float)
+    pos = np.searchsorted(edges, to)
+    if not np.array_equal(edges[np.minimum(pos, len(edges) - 1)], to):
+        raise ValueError(f"Edges {to.tolist()} are not a subset of {edges.tolist()}")
+    counts = np.asarray(counts)
+    cumulative = np.concatenate([np.zeros(counts.shape[:-1] + (1,), dtype=counts.dtype),
+                                 np.cumsum(counts, axis=-1)], axis=-1)
+    return cumulative[..., pos[1:]] - cumulative[..., pos[:-1]]
+
+
+def _groupings(by):
+    if by is None:
+        return []
+    if isinstance(by, pd.DataFrame):
+        by = [by[c] for c in by.columns]
+    elif isinstance(by, (GroupIndex, pd.Series, np.ndarray)):
+        by = [by]
+    return [g if isinstance(g, GroupIndex) else GroupIndex(g) for g in by]
+
+
+@dataclass(frozen=True)
+class Histogram:
+    edges: np.ndarray
+    # (*(len(index) + 1 for index in groups), bins); the last slot of a group axis is rows without a label
+    counts: np.ndarray
+    groups: tuple = ()  # pd.Index of each grouping column
+
+    @property
+    def labels(self):
+        return [f'{low:g}-{high:g}' for low, high in zip(self.edges[:-1], self.edges[1:])]
+
+    def total(self):
+        """Counts per bin over every row, with or without group labels."""
+        return self.counts.reshape(-1, len(self.edges) - 1).sum(axis=0)
+
+    def by(self, name):
+        """Counts per label of grouping column `name` (rows) and bin (columns)."""
+        axis = [index.name for index in self.groups].index(name)
+        others = tuple(i for i in range(len(self.groups)) if i != axis)
+        counts = self.counts.sum(axis=others) if others else self.counts
+        return pd.DataFrame(counts[:-1], index=self.groups[axis], columns=self.labels)
+
+    def coarsen(self, edges):
+        """The same counts over `edges`, a subset of this histogram's edges."""
+        return Histogram(np.asarray(edges, dtype=float), coarsen(self.counts, self.edges, edges), self.groups)
+
+
+def histogram(values, edges, by=None, closed_last=False):
+    """Histogram of `values` over `edges`, optionally per label of one or more grouping columns.
+
+    `by` is a label column, a GroupIndex, a DataFrame or a list of these.
+    """
+    edges = np.asarray(edges, dtype=float)
+    bins = len(edges) - 1
+    groupings = _groupings(by)
+    if not groupings:
+        # np.histogram counts sorted blocks against the edges, faster than a code per row
+        values = as_float_array(values)
+        values = values[~np.isnan(values)]
+        counts, _ = np.histogram(values, edges)
+        if not closed_last:
+            counts[-1] -= np.count_nonzero(values == edges[-1])
+        return Histogram(edges, counts.astype(np.int64))
+    codes = bin_codes(values, edges, closed_last)
+    keep = codes >= 0
+    key = codes[keep]
+    shape = []
+    stride = bins
+    for groups in reversed(groupings):
+        # Rows without a label go to an extra last slot so totals still count them
+        slot = np.where(groups.codes < 0, groups.size, groups.codes)[keep]
+        key = key + slot * stride
+        stride *= groups.size + 1
+        shape.insert(0, groups.size + 1)
+    counts = np.bincount(key, minlength=stride).reshape(shape + [bins])
+    return Histogram(edges, counts, tuple(groups.index for groups in groupings))
+
+
+def histograms(values, binnings, by=None):
+    """{name: Histogram} for several {name: edges} binnings of the same values, from one scan."""
+    fine = histogram(values, merge_edges(*binnings.values()), by)
+    return {name: fine.coarsen(edges) for name, edges in binnings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Histogram of a metric, optionally per Region/FiscalYear')
+    parser.add_argument('--source', default=CSV_PATH)
+    parser.add_argument('--metric', default='utilization',
+                        help='derived metric (metrics.py) or numeric column (default: utilization)')
+    parser.add_argument('--edges', type=float, nargs='+', default=UTIL_EDGES,
+                        help='bin edges; bins are left-closed (default: the utilization bins)')
+    parser.add_argument('--by', nargs='*', default=[], help='grouping columns, e.g. Region FiscalYear')
+    args = parser.parse_args()
+
+    sources = METRICS[args.metric].columns if args.metric in METRICS else (args.metric,)
+    df = load_school_data(list(dict.fromkeys([*sources, *args.by])), source=args.source)
+    values = METRICS[args.metric].values(df) if args.metric in METRICS else df[args.metric]
+    h = histogram(values, args.edges, by=[df[c] for c in args.by])
+
+    print(f"{args.metric} histogram of {len(df):,} rows ({int(h.total().sum()):,} binned):")
+    for label, count in zip(h.labels, h.total()):
+        print(f"  {label:>9} {count:>8,}")
+    for name in args.by:
+        print(f"\nBy {name}:")
+        print(h.by(name).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,676 @@
+"""
+Chart-job pipeline for the analysis PNGs.
+
+Each chart is a ChartJob: `prepare(df)` reduces the data to what the chart
+plots (None = nothing to draw) and `render(fig, payload)` draws it on a
+matplotlib Figure using the object-oriented API, so no pyplot global state
+is shared between charts. `run_chart_jobs()` renders jobs in a process pool;
+the DataFrame is sent to each worker once, at pool start-up.
+
+With a ChartCache, each job's payload is hashed together with its render
+function, figure size, style rcParams, savefig options (dpi) and the source
+of this module. A PNG whose digest is already cached is copied (or left in
+place) instead of being drawn and re-encoded.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import matplotlib
+import matplotlib.style
+from matplotlib.figure import Figure
+
+from binning import histogram
+from data_loader import CACHE_DIR
+from driver_scan import scan_drivers
+from metrics import METRICS
+from panel import GroupIndex
+from profiling import span
+
+# Dark dashboard theme shared by every chart
+STYLE = ['seaborn-v0_8-darkgrid', {
+    'figure.facecolor': '#0a0f1a',
+    'axes.facecolor': '#111827',
+    'text.color': '#f9fafb',
+    'axes.labelcolor': '#e5e7eb',
+    'xtick.color': '#9ca3af',
+    'ytick.color': '#9ca3af',
+    'axes.edgecolor': '#374151',
+    'grid.color': '#374151',
+    'grid.alpha': 0.3,
+    'font.family': 'sans-serif',
+    'font.size': 11,
+}]
+
+EDA_SAVE = {'dpi': 150, 'bbox_inches': 'tight', 'facecolor': '#0a0f1a'}
+
+
+@dataclass(frozen=True)
+class ChartJob:
+    name: str
+    filename: str
+    prepare: callable
+    render: callable
+    figsize: tuple = (12, 8)
+    style: list = field(default_factory=lambda: STYLE)
+    savefig: dict = field(default_factory=lambda: EDA_SAVE)
+
+
+def render_chart(job, payload, path=None, spans=None):
+    """Draw `payload` with `job` and save it to `path` (default: job.filename).
+
+    Draw and savefig timings are appended to `spans` (see profiling.span).
+    """
+    spans = [] if spans is None else spans
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with matplotlib.style.context(job.style):
+            fig = Figure(figsize=job.figsize)
+            with span(spans, job.name + ':draw'):
+                job.render(fig, payload)
+            with span(spans, job.name + ':savefig'):
+                fig.savefig(path or job.filename, **job.savefig)
+    return path or job.filename
+
+
+# ----------------------------------------------------------------------------
+# Content-addressed PNG cache
+# ----------------------------------------------------------------------------
+CHART_CACHE_DIR = os.path.join(CACHE_DIR, 'charts')
+CHART_CACHE_MAX_BYTES = 64 * 2**20
+
+
+def _normalized(obj):
+    """Numeric data of a Series/DataFrame as float64 rounded to 8 decimals.
+
+    The same totals summed as int (full run) or float (partition store), or
+    correlations that differ in the last bits, then hash to the same digest.
+    """
+    if isinstance(obj, pd.Series):
+        numeric = pd.api.types.is_numeric_dtype(obj) and not pd.api.types.is_bool_dtype(obj)
+        return obj.astype('float64').round(8) if numeric else obj
+    columns = obj.select_dtypes('number').columns
+    return obj.astype({c: 'float64' for c in columns}).round({c: 8 for c in columns})
+
+
+def _feed(h, obj):
+    """Feed a payload into hash `h` by value (pandas, NumPy and plain containers)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(type(obj).__name__.encode())
+        h.update(repr(list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name).encode())
+        h.update(pd.util.hash_pandas_object(_normalized(obj), index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f'{obj.dtype.str}{obj.shape}'.encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for key in sorted(obj, key=repr):
+            _feed(h, key)
+            _feed(h, obj[key])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(f'{type(obj).__name__}[{len(obj)}]'.encode())
+        for item in obj:
+            _feed(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+_CODE_DIGEST = None
+
+
+def _code_digest():
+    """Hash of the module defining the charts, so editing a chart invalidates it."""
+    global _CODE_DIGEST
+    if _CODE_DIGEST is None:
+        _CODE_DIGEST = hashlib.sha256(inspect.getsource(sys.modules[__name__]).encode()).digest()
+    return _CODE_DIGEST
+
+
+def chart_digest(job, payload):
+    """Content address of the PNG `job` would draw for `payload`."""
+    h = hashlib.sha256(_code_digest())
+    h.update(f'{job.render.__module__}.{job.render.__qualname__}'.encode())
+    h.update(json.dumps([job.figsize, job.style, job.savefig, matplotlib.__version__],
+                        sort_keys=True, default=str).encode())
+    _feed(h, payload)
+    return h.hexdigest()
+
+
+class ChartCache:
+    """PNG blobs named by digest plus a manifest of sizes, last use and outputs.
+
+    Workers only look for `<digest>.png`; the parent process installs blobs
+    to their output files, updates the manifest and evicts least recently
+    used blobs once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=CHART_CACHE_DIR, max_bytes=CHART_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = self._load()
+        self.hits = self.misses = 0
+        self._used = set()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault('blobs', {})
+        manifest.setdefault('outputs', {})
+        return manifest
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, digest + '.png')
+
+    def install(self, digest, filename, rendered):
+        """Make `filename` a copy of blob `digest`, skipping the copy if it already is."""
+        blob = self.blob_path(digest)
+        size = os.path.getsize(blob)
+        current = (self.manifest['outputs'].get(filename) == digest and os.path.exists(filename)
+                   and os.path.getsize(filename) == size)
+        if rendered or not current:
+            shutil.copyfile(blob, filename)
+        self.manifest['outputs'][filename] = digest
+        self.manifest['blobs'][digest] = {'size': size, 'used': time.time()}
+        self._used.add(digest)
+        if rendered:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return filename
+
+    def evict(self):
+        """Drop least recently used blobs (never ones used this run) down to max_bytes."""
+        blobs = self.manifest['blobs']
+        total = sum(b['size'] for b in blobs.values())
+        for digest in sorted(blobs, key=lambda d: blobs[d]['used']):
+            if total <= self.max_bytes:
+                break
+            if digest in self._used:
+                continue
+            total -= blobs.pop(digest)['size']
+            try:
+                os.remove(self.blob_path(digest))
+            except OSError:
+                pass
+        self.manifest['outputs'] = {f: d for f, d in self.manifest['outputs'].items() if d in blobs}
+
+    def save(self):
+        self.evict()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def summary(self):
+        return f"Chart cache: {self.hits} unchanged, {self.misses} rendered"
+
+
+# ----------------------------------------------------------------------------
+# Process pool plumbing: the DataFrame is shipped once per worker
+# ----------------------------------------------------------------------------
+_WORKER_DF = None
+
+
+def _init_worker(df):
+    global _WORKER_DF
+    _WORKER_DF = df
+
+
+def _run_job(job, payload=None, cache_dir=None, force=False):
+    """Returns (name, filename or blob digest, rendered, spans); filename/digest is None if skipped."""
+    spans = []
+    if payload is None:
+        with span(spans, job.name + ':prepare'):
+            payload = job.prepare(_WORKER_DF)
+    if payload is None:
+        return job.name, None, False, spans
+    if cache_dir is None:
+        return job.name, render_chart(job, payload, spans=spans), True, spans
+    with span(spans, job.name + ':digest'):
+        digest = chart_digest(job, payload)
+    blob = os.path.join(cache_dir, digest + '.png')
+    if force or not os.path.exists(blob):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = os.path.join(cache_dir, f'{digest}.{os.getpid()}.tmp.png')
+        render_chart(job, payload, tmp, spans=spans)
+        os.replace(tmp, blob)
+        return job.name, digest, True, spans
+    return job.name, digest, False, spans
+
+
+def run_chart_jobs(df, jobs, payloads=None, processes=None, cache=None, force=False, profiler=None):
+    """Render `jobs` and return {name: saved filename or None}.
+
+    `payloads` may supply precomputed payloads by job name (e.g. from the
+    incremental store); the other jobs prepare theirs from `df` inside the
+    worker. processes=1 renders in-process. With a ChartCache, unchanged
+    charts are taken from the cache; force=True re-renders them anyway.
+    With a profiler, each job's prepare/draw/savefig times are recorded.
+    """
+    payloads = payloads or {}
+    cache_dir = cache.directory if cache else None
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes <= 1:
+        _init_worker(df)
+        results = [_run_job(job, payloads.get(job.name), cache_dir, force) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(df,)) as pool:
+            futures = [pool.submit(_run_job, job, payloads.get(job.name), cache_dir, force) for job in jobs]
+            results = [f.result() for f in futures]
+    if profiler is not None:
+        for *_, spans in results:
+            profiler.add_spans(spans)
+
+    if cache is None:
+        return {name: path for name, path, _, _ in results}
+    saved = {}
+    for job, (name, digest, rendered, _) in zip(jobs, results):
+        saved[name] = cache.install(digest, job.filename, rendered) if digest else None
+    cache.save()
+    return saved
+
+
+def select_jobs(jobs, names):
+    """Filter `jobs` by a comma-separated list of names (None/'' = all)."""
+    if not names:
+        return list(jobs)
+    wanted = [n.strip() for n in names.split(',') if n.strip()]
+    known = {job.name: job for job in jobs}
+    unknown = [n for n in wanted if n not in known]
+    if unknown:
+        raise ValueError(f"Unknown chart(s): {', '.join(unknown)}. Available: {', '.join(known)}")
+    return [known[n] for n in wanted]
+
+
+# ----------------------------------------------------------------------------
+# EDA charts (run_analysis.py)
+# ----------------------------------------------------------------------------
+CORR_COLUMNS = ['enquiries_started', 'leads_submitted', 'StudentFTE', 'CapacityFTE',
+                'NAE_Overall_Average_Fee_USD', 'Revenue', 'nps_score']
+SHORT_NAMES = {
+    'enquiries_started': 'Enquiries',
+    'leads_submitted': 'Leads',
+    'StudentFTE': 'Students',
+    'CapacityFTE': 'Capacity',
+    'NAE_Overall_Average_Fee_USD': 'Fees',
+    'Revenue': 'Revenue',
+    'nps_score': 'NPS'
+}
+DRIVER_COLUMNS = [
+    'enquiries_started', 'leads_submitted', 'StudentFTE', 'CapacityFTE',
+    'NAE_Overall_Average_Fee_USD', 'Revenue', 'nps_score', 'nps_response_count',
+    'Teachers_Attrition_Pct', 'MAC_Attrition_Pct', 'Employee_Engagement_Score',
+    'Student_Expat_Pct', 'Academic_Performance_Index', 'school_age',
+    'Overall_Gap_Median', 'Avg_Principal_Tenure'
+]
+
+
+def correlation_columns(df):
+    return [c for c in CORR_COLUMNS if c in df.columns]
+
+
+def prepare_correlation_matrix(df):
+    cols = correlation_columns(df)
+    if len(cols) < 4:
+        return None
+    return df[cols].corr()
+
+
+def render_correlation_matrix(fig, corr_matrix):
+    import seaborn as sns  # slow to import; only this chart needs it
+
+    ax = fig.subplots()
+    corr_matrix = corr_matrix.rename(columns=SHORT_NAMES, index=SHORT_NAMES)
+    cmap = sns.diverging_palette(250, 15, s=75, l=40, as_cmap=True)
+    sns.heatmap(corr_matrix, annot=True, fmt='.2f', cmap=cmap,
+                center=0, vmin=-1, vmax=1, square=True, linewidths=1,
+                cbar_kws={'label': 'Correlation Coefficient', 'shrink': 0.8},
+                annot_kws={'size': 12, 'weight': 'bold'}, ax=ax)
+    ax.set_title('Correlation Matrix: Key Performance Metrics', fontsize=16,
+                 color='white', pad=20, fontweight='bold')
+    fig.tight_layout()
+
+
+def prepare_region_stats(df):
+    if 'Region' not in df.columns:
+        return None
+    regions = GroupIndex(df['Region'])
+    return pd.DataFrame({
+        'enquiries_started': regions.mean(df['enquiries_started']),
+        'School': regions.nunique(df['School']),
+    }, index=regions.index).sort_values('enquiries_started', ascending=True)
+
+
+def render_regional_enquiries(fig, region_stats):
+    ax = fig.subplots()
+    colors = matplotlib.colormaps['YlOrRd'](np.linspace(0.3, 0.9, len(region_stats)))
+    bars = ax.barh(range(len(region_stats)), region_stats['enquiries_started'],
+                   color=colors, edgecolor='white', linewidth=1, height=0.7)
+    ax.set_yticks(range(len(region_stats)))
+    ax.set_yticklabels(region_stats.index)
+    for i, (bar, val) in enumerate(zip(bars, region_stats['enquiries_started'])):
+        ax.text(val + 30, i, f'{val:,.0f}',
+                va='center', fontsize=11, color='white', fontweight='bold')
+    ax.set_xlabel('Average Enquiries per School-Year', fontsize=12)
+    ax.set_title('Average Enquiries by Region', fontsize=16, color='white',
+                 pad=20, fontweight='bold')
+    ax.grid(True, alpha=0.3, axis='x')
+    ax.set_xlim(0, region_stats['enquiries_started'].max() * 1.2)
+    fig.tight_layout()
+
+
+def prepare_nps_correlations(df):
+    if 'nps_score' not in df.columns:
+        return None
+    nps_data = [
+        ('NPS Response Count', df['nps_response_count'].corr(df['enquiries_started']) if 'nps_response_count' in df.columns else np.nan),
+        ('NPS Score', df['nps_score'].corr(df['enquiries_started']))
+    ]
+    return [(n, v) for n, v in nps_data if not np.isnan(v)] or None
+
+
+def render_nps_correlation(fig, nps_data):
+    ax = fig.subplots()
+    names = [x[0] for x in nps_data]
+    values = [x[1] for x in nps_data]
+    colors = ['#10b981' if v > 0 else '#ef4444' for v in values]
+    bars = ax.barh(names, values, color=colors, edgecolor='white', linewidth=1, height=0.5)
+    ax.axvline(x=0, color='white', linewidth=1, alpha=0.5)
+    for bar, val in zip(bars, values):
+        offset = 0.02 if val >= 0 else -0.02
+        ax.text(val + offset, bar.get_y() + bar.get_height()/2,
+                f'{val:+.2f}', va='center', fontsize=12, color='white', fontweight='bold')
+    ax.set_xlabel('Correlation with Enquiries', fontsize=12)
+    ax.set_title('NPS vs Enquiries Correlation', fontsize=16, color='white', pad=20, fontweight='bold')
+    ax.set_xlim(-0.5, 0.5)
+    ax.grid(True, alpha=0.3, axis='x')
+    fig.tight_layout()
+
+
+def prepare_enquiry_drivers(df):
+    """Complete-case correlations of the driver columns with enquiries_started."""
+    numeric_cols = [c for c in DRIVER_COLUMNS if c in df.columns]
+    corr_df = df[numeric_cols].dropna()
+    if 'enquiries_started' in corr_df.columns and len(corr_df) > 10:
+        return corr_df.corr()['enquiries_started'].drop('enquiries_started').sort_values(ascending=False)
+    return pd.Series(dtype=float)
+
+
+def prepare_demand_drivers(df):
+    corr_with_enquiries = prepare_enquiry_drivers(df)
+    return corr_with_enquiries if len(corr_with_enquiries) > 0 else None
+
+
+def render_demand_drivers(fig, corr_with_enquiries):
+    ax = fig.subplots()
+    top_drivers = corr_with_enquiries.head(10).sort_values()
+    colors = ['#10b981' if v > 0 else '#ef4444' for v in top_drivers.values]
+    bars = ax.barh(range(len(top_drivers)), top_drivers.values,
+                   color=colors, edgecolor='white', linewidth=1, height=0.6)
+    ax.set_yticks(range(len(top_drivers)))
+    ax.set_yticklabels(top_drivers.index, fontsize=10)
+    for i, (bar, val) in enumerate(zip(bars, top_drivers.values)):
+        offset = 0.02 if val > 0 else -0.02
+        align = 'left' if val > 0 else 'right'
+        ax.text(val + offset, i, f'{val:+.2f}',
+                va='center', ha=align, fontsize=11, color='white', fontweight='bold')
+    ax.axvline(x=0, color='white', linewidth=1, alpha=0.5)
+    ax.set_xlabel('Correlation Coefficient (r)', fontsize=12)
+    ax.set_title('Top Drivers of School Enquiries', fontsize=16, color='white', pad=20, fontweight='bold')
+    ax.grid(True, alpha=0.3, axis='x')
+    fig.tight_layout()
+
+
+def prepare_utilization(df):
+    if 'StudentFTE' not in df.columns or 'CapacityFTE' not in df.columns:
+        return None
+    util_data = METRICS['utilization'].series(df).dropna()
+    util_data = util_data[util_data < 300].to_numpy()  # Filter extreme outliers
+    # The 30 bins ax.hist would draw, counted here so only the counts reach the renderer
+    edges = np.histogram_bin_edges(util_data, bins=30)
+    return {'edges': edges, 'counts': histogram(util_data, edges, closed_last=True).total(),
+            'mean': float(util_data.mean())}
+
+
+def render_utilization_distribution(fig, payload):
+    ax = fig.subplots()
+    edges, mean = payload['edges'], payload['mean']
+    ax.hist(edges[:-1], bins=edges, weights=payload['counts'],
+            color='#c9a227', edgecolor='white', linewidth=0.5, alpha=0.9)
+    ax.axvline(x=100, color='#ef4444', linewidth=2, linestyle='--', label=f'100% Capacity')
+    ax.axvline(x=mean, color='#10b981', linewidth=2, label=f'Mean: {mean:.0f}%')
+    ax.set_xlabel('Utilization (%)', fontsize=12)
+    ax.set_ylabel('Number of School-Years', fontsize=12)
+    ax.set_title('School Capacity Utilization Distribution', fontsize=16, color='white', pad=20, fontweight='bold')
+    ax.legend(framealpha=0.9, facecolor='#1f2937', edgecolor='#374151')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+
+def prepare_yearly_enquiries(df):
+    if 'FiscalYear' not in df.columns:
+        return None
+    return df.groupby('FiscalYear')['enquiries_started'].sum().sort_index()
+
+
+def render_enquiries_trend(fig, yearly):
+    ax = fig.subplots()
+    ax.plot(range(len(yearly)), yearly.values, marker='o', markersize=12, linewidth=3,
+            color='#c9a227', markerfacecolor='#c9a227', markeredgecolor='white', markeredgewidth=2)
+    ax.fill_between(range(len(yearly)), yearly.values, alpha=0.2, color='#c9a227')
+    ax.set_xticks(range(len(yearly)))
+    ax.set_xticklabels(yearly.index, fontsize=10)
+    for i, val in enumerate(yearly.values):
+        ax.annotate(f'{val/1000:.0f}K', (i, val), textcoords="offset points",
+                    xytext=(0, 15), ha='center', fontsize=11, color='white', fontweight='bold')
+    ax.set_xlabel('Fiscal Year', fontsize=12)
+    ax.set_ylabel('Total Enquiries', fontsize=12)
+    ax.set_title('Enquiries Trend Over Time', fontsize=16, color='white', pad=20, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+
+def _region_palette(df):
+    """Region order and tab10 colours of the fees scatter, shared by both scatters."""
+    scatter_df = df[['NAE_Overall_Average_Fee_USD', 'enquiries_started', 'Region']].dropna()
+    regions = list(scatter_df['Region'].unique())
+    colors = matplotlib.colormaps['tab10'](np.linspace(0, 1, len(regions)))
+    return regions, colors
+
+
+def _prepare_scatter(df, x_col):
+    if x_col not in df.columns or 'Region' not in df.columns or 'NAE_Overall_Average_Fee_USD' not in df.columns:
+        return None
+    regions, colors = _region_palette(df)
+    scatter_df = df[[x_col, 'enquiries_started', 'Region']].dropna()
+    return {
+        'points': [(region, color, scatter_df.loc[scatter_df['Region'] == region, [x_col, 'enquiries_started']].to_numpy())
+                   for region, color in zip(regions, colors)],
+    }
+
+
+def prepare_fees_scatter(df):
+    return _prepare_scatter(df, 'NAE_Overall_Average_Fee_USD')
+
+
+def prepare_size_scatter(df):
+    return _prepare_scatter(df, 'StudentFTE')
+
+
+def _render_scatter(fig, payload, xlabel, title, legend_loc):
+    ax = fig.subplots()
+    for region, color, xy in payload['points']:
+        ax.scatter(xy[:, 0], xy[:, 1],
+                   label=region, alpha=0.7, s=80, c=[color],
+                   edgecolors='white', linewidth=0.5)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel('Enquiries Started', fontsize=12)
+    ax.set_title(title, fontsize=16, color='white', pad=20, fontweight='bold')
+    ax.legend(title='Region', loc=legend_loc, framealpha=0.9,
+              facecolor='#1f2937', edgecolor='#374151', fontsize=9)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+
+def render_fees_vs_enquiries(fig, payload):
+    _render_scatter(fig, payload, 'Average Fee (USD)', 'Fees vs Enquiries by Region', 'upper right')
+
+
+def render_size_vs_enquiries(fig, payload):
+    _render_scatter(fig, payload, 'Student FTE (School Size)', 'School Size vs Enquiries by Region', 'upper left')
+
+
+EDA_CHARTS = [
+    ChartJob('correlation_matrix', 'correlation_matrix.png',
+             prepare_correlation_matrix, render_correlation_matrix, figsize=(12, 10)),
+    ChartJob('regional_enquiries', 'regional_enquiries.png',
+             prepare_region_stats, render_regional_enquiries, figsize=(12, 7)),
+    ChartJob('nps_correlation', 'nps_correlation.png',
+             prepare_nps_correlations, render_nps_correlation, figsize=(10, 6)),
+    ChartJob('demand_drivers', 'demand_drivers.png',
+             prepare_demand_drivers, render_demand_drivers),
+    ChartJob('utilization_distribution', 'utilization_distribution.png',
+             prepare_utilization, render_utilization_distribution, figsize=(12, 6)),
+    ChartJob('enquiries_trend', 'enquiries_trend.png',
+             prepare_yearly_enquiries, render_enquiries_trend, figsize=(12, 6)),
+    ChartJob('fees_vs_enquiries', 'fees_vs_enquiries.png',
+             prepare_fees_scatter, render_fees_vs_enquiries),
+    ChartJob('size_vs_enquiries', 'size_vs_enquiries.png',
+             prepare_size_scatter, render_size_vs_enquiries),
+]
+
+
+# ----------------------------------------------------------------------------
+# Enquiry-rate charts (run_rate_analysis.py); `df` carries a 'Rate' column
+# ----------------------------------------------------------------------------
+RATE_STYLE = ['seaborn-v0_8-darkgrid', {
+    'figure.facecolor': '#0a0f1a',
+    'axes.facecolor': '#111827',
+    'text.color': '#f9fafb',
+    'axes.labelcolor': '#e5e7eb',
+    'xtick.color': '#9ca3af',
+    'ytick.color': '#9ca3af',
+    'font.family': 'sans-serif',
+}]
+RATE_SAVE = {'facecolor': '#0a0f1a'}
+
+
+def prepare_rate_drivers(df):
+    numeric_df = df.select_dtypes(include=[np.number])
+    # Top correlations with Rate (only the Rate row, not the full matrix)
+    corr = scan_drivers(numeric_df, 'Rate')['r'].rename('Rate').sort_values()
+    # Filter out the metric itself and components
+    corr = corr.drop(['Rate', 'enquiries_started', 'leads_submitted', 'tv_leads_t_plus1'], errors='ignore')
+    corr = corr.dropna()
+    return pd.concat([corr.head(5), corr.tail(5)])
+
+
+def render_rate_drivers(fig, top_drivers):
+    ax = fig.subplots()
+    colors = ['#10b981' if v > 0 else '#ef4444' for v in top_drivers.values]
+    ax.barh(range(len(top_drivers)), top_drivers.values, color=colors, edgecolor='white', height=0.6)
+    ax.set_yticks(range(len(top_drivers)))
+    ax.set_yticklabels(top_drivers.index, fontsize=10)
+    ax.axvline(0, color='white', alpha=0.5)
+    ax.set_title("Top Drivers: Enquiries per Student", fontsize=16, color='white', fontweight='bold')
+    fig.tight_layout()
+
+
+def prepare_rate_regions(df):
+    if 'Region' not in df.columns:
+        return None
+    regions = GroupIndex(df['Region'])
+    return regions.series(regions.mean(df['Rate']), 'Rate').sort_values()
+
+
+def render_rate_regions(fig, region_stats):
+    ax = fig.subplots()
+    colors = matplotlib.colormaps['YlOrRd'](np.linspace(0.3, 0.9, len(region_stats)))
+    ax.barh(range(len(region_stats)), region_stats.values, color=colors, edgecolor='white')
+    ax.set_yticks(range(len(region_stats)))
+    ax.set_yticklabels(region_stats.index)
+    for i, v in enumerate(region_stats.values):
+        ax.text(v + 0.05, i, f'{v:.2f}', va='center', color='white', fontweight='bold')
+    ax.set_title("Average Enquiries per Student by Region", fontsize=16, color='white', fontweight='bold')
+    fig.tight_layout()
+
+
+def _prepare_rate_scatter(df, x_col):
+    if 'NAE_Overall_Average_Fee_USD' not in df.columns:
+        return None
+    regions = df['Region'].dropna().unique()
+    colors = matplotlib.colormaps['tab10'](np.linspace(0, 1, len(regions)))
+    return [(r, c, df.loc[df['Region'] == r, [x_col, 'Rate']].to_numpy(dtype=float, na_value=np.nan))
+            for r, c in zip(regions, colors)]
+
+
+def prepare_rate_fees_scatter(df):
+    return _prepare_rate_scatter(df, 'NAE_Overall_Average_Fee_USD')
+
+
+def prepare_rate_size_scatter(df):
+    return _prepare_rate_scatter(df, 'StudentFTE')
+
+
+def _render_rate_scatter(fig, points, xlabel, title):
+    ax = fig.subplots()
+    for r, c, xy in points:
+        ax.scatter(xy[:, 0], xy[:, 1], label=r, color=c, alpha=0.7, edgecolors='white')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Enquiries per Student')
+    ax.set_title(title, fontsize=16, color='white', fontweight='bold')
+    ax.legend(frameon=True, facecolor='#1f2937')
+    fig.tight_layout()
+
+
+def render_rate_fees_scatter(fig, points):
+    _render_rate_scatter(fig, points, 'Average Fee (USD)', "Fees vs Enquiry Rate")
+
+
+def render_rate_size_scatter(fig, points):
+    _render_rate_scatter(fig, points, 'School Size (FTE)', "Size vs Enquiry Rate")
+
+
+def prepare_rate_nps(df):
+    if 'nps_score' not in df.columns:
+        return None
+    return df['nps_score'].corr(df['Rate'], method='spearman')
+
+
+def render_rate_nps(fig, nps_corr):
+    ax = fig.subplots()
+    ax.barh(['NPS Score'], [nps_corr], color='#10b981' if nps_corr > 0 else '#ef4444', height=0.4)
+    ax.set_xlim(-1, 1)
+    ax.axvline(0, color='white')
+    ax.text(nps_corr + (0.1 if nps_corr > 0 else -0.1), 0, f"{nps_corr:.3f}", color='white', fontweight='bold', va='center')
+    ax.set_title("NPS vs Enquiry Rate Correlation", fontsize=14, color='white', fontweight='bold')
+    fig.tight_layout()
+
+
+RATE_CHARTS = [
+    ChartJob('demand_drivers', 'demand_drivers.png', prepare_rate_drivers, render_rate_drivers,
+             style=RATE_STYLE, savefig=RATE_SAVE),
+    ChartJob('regional_enquiries', 'regional_enquiries.png', prepare_rate_regions, render_rate_regions,
+             figsize=(12, 7), style=RATE_STYLE, savefig=RATE_SAVE),
+    ChartJob('fees_vs_enquiries', 'fees_vs_enquiries.png', prepare_rate_fees_scatter, render_rate_fees_scatter,
+             style=RATE_STYLE, savefig=RATE_SAVE),
+    ChartJob('size_vs_enquiries', 'size_vs_enquiries.png', prepare_rate_size_scatter, render_rate_size_scatter,
+             style=RATE_STYLE, savefig=RATE_SAVE),
+    ChartJob('nps_correlation', 'nps_correlation.png', prepare_rate_nps, render_rate_nps,
+             figsize=(8, 4), style=RATE_STYLE, savefig=RATE_SAVE),
+]
@@ -1,18 +1,19 @@
-
-import pandas as pd
 import os
 
+from data_loader import CSV_PATH, XLSX_PATH, load_school_data
+from writers import export
+
 # Input and output paths
-input_file = "School Level Data.xlsx"
-output_file = "School Level Data.csv"
+input_file = XLSX_PATH
+output_file = CSV_PATH
 
 if os.path.exists(input_file):
     try:
-        # Read Excel file
-        df = pd.read_excel(input_file)
-        
+        # Read Excel file (its canonical Parquet file while the XLSX export is pending)
+        df = load_school_data(source=input_file)
+
         # Save as CSV
-        df.to_csv(output_file, index=False)
+        export(df, output_file)
         print(f"Successfully converted '{input_file}' to '{output_file}'")
     except Exception as e:
         print(f"Error converting file: {e}")
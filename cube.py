@@ -0,0 +1,329 @@
+"""
+OLAP cube of School Level Data: additive statistics per
+Region -> Subregion -> Country -> City -> School x FiscalYear cell.
+
+Each cell holds, for every measure in MEASURES, the count of non-missing
+values, their sum and their sum of squares, plus the utilization histogram
+counts over UTIL_BIN_EDGES. All of these add up, so every rollup is a sum of
+cells: the rollup along each prefix of the hierarchy, with and without
+FiscalYear, is precomputed when the cube is built, and a query filters and
+sums one of them instead of scanning the rows:
+
+    cube = load_cube(XLSX_PATH)                       # cached per content of the file
+    cube.mean('rate', 'Region')                       # Series, one value per region
+    cube.total('enquiries_started', 'FiscalYear')     # yearly totals
+    cube.mean('rate', 'Country', Region='Europe', FiscalYear=2024)   # drill-down
+    cube.members('Region')                            # schools per region
+
+Members are stripped strings; blank labels are missing. As with a pandas
+group-by, rows with a missing member are left out of that level's groups
+but still count in the network total. Measures are source columns or
+derived metrics from metrics.METRICS (rate, utilization), which are
+averaged per row like the scripts do.
+
+The cube also answers the PartitionStore queries (totals, means, counts,
+schools, histogram with dim 'region' or 'year'), so dashboard_data.py can
+take either as its `store`.
+
+    python cube.py --level Country --measure rate --where Region=Europe
+"""
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from binning import UTIL_BIN_EDGES, bin_codes, coarsen
+from data_loader import CACHE_DIR, CSV_PATH, file_sha256, load_school_data, school_data_columns
+from metrics import METRICS, MetricStore, definitions_digest
+from stats_engine import as_float_array
+
+LEVELS = ('Region', 'Subregion', 'Country', 'City', 'School')
+TIME = 'FiscalYear'
+MEASURES = ('StudentFTE', 'CapacityFTE', 'enquiries_started', 'leads_submitted', 'Revenue', 'rate', 'utilization')
+STATS = ('n', 'sum', 'sq')
+# PartitionStore dimension names
+DIMS = {'region': 'Region', 'year': TIME}
+CUBE_CACHE_DIR = os.path.join(CACHE_DIR, 'cube')
+
+
+def cube_columns(measures=MEASURES):
+    """Source columns a cube of `measures` reads."""
+    cols = list(LEVELS) + [TIME]
+    for m in measures:
+        cols.extend(METRICS[m].columns if m in METRICS else (m,))
+    return list(dict.fromkeys(cols))
+
+
+def _members(column):
+    """Codes of a label column (missing last) and its sorted, stripped members."""
+    codes, labels = pd.factorize(column)
+    # Strip the distinct labels only, then merge the ones that become equal
+    stripped = pd.Series(labels.astype(str), dtype=object).str.strip().replace('', np.nan)
+    merged, members = pd.factorize(stripped, sort=True)
+    codes = np.where(codes < 0, -1, merged[np.maximum(codes, 0)] if len(merged) else -1)
+    return np.where(codes < 0, len(members), codes), pd.Index(members, dtype=str)
+
+
+class Cube:
+    def __init__(self, cells, measures=MEASURES, edges=UTIL_BIN_EDGES):
+        """`cells`: one row per (LEVELS, TIME) cell with its 'rows' and stat columns."""
+        self.cells = cells
+        self.measures = list(measures)
+        self.edges = list(edges)
+        self.columns = ['rows'] + [f'{m}_{s}' for m in self.measures for s in STATS] + \
+            [f'util_{i}' for i in range(len(self.edges) - 1)]
+        # (depth, by year) -> stats summed to the first `depth` LEVELS (+ TIME), missing members kept
+        self.rollups = {}
+        for year in (False, True):
+            frame = cells.set_index(list(LEVELS) + ([TIME] if year else []))[self.columns]
+            if not year:
+                frame = frame.groupby(level=list(range(len(LEVELS))), dropna=False, observed=True).sum()
+            self.rollups[(len(LEVELS), year)] = frame
+            for depth in range(len(LEVELS) - 1, -1, -1):
+                keys = list(range(depth)) + ([depth + 1] if year else [])
+                if keys:
+                    frame = frame.groupby(level=keys, dropna=False, observed=True).sum()
+                else:
+                    frame = frame.sum().to_frame().T
+                self.rollups[(depth, year)] = frame
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_frame(cls, df, measures=MEASURES, edges=UTIL_BIN_EDGES):
+        """Build the cells from one pass over the rows of `df`."""
+        n = len(df)
+        keys = np.zeros(n, dtype=np.int64)
+        members = {}
+        for level in LEVELS + (TIME,):
+            column = df[level] if level in df.columns else pd.Series([pd.NA] * n, dtype='string')
+            if level == TIME:
+                values = as_float_array(column)
+                uniques = np.unique(values[~np.isnan(values)])
+                codes = np.where(np.isnan(values), len(uniques), np.searchsorted(uniques, values))
+                uniques = pd.Index(uniques, dtype=float)
+            else:
+                codes, uniques = _members(column)
+            keys = keys * (len(uniques) + 1) + codes
+            members[level] = (uniques, len(uniques) + 1)
+        cell_keys, cell = np.unique(keys, return_inverse=True)
+        k = len(cell_keys)
+
+        data = {}
+        remainder = cell_keys
+        for level in reversed(LEVELS + (TIME,)):
+            uniques, radix = members[level]
+            codes = remainder % radix
+            remainder = remainder // radix
+            values = uniques.take(np.minimum(codes, radix - 2), allow_fill=False) if len(uniques) else \
+                np.full(k, np.nan)
+            if level == TIME:
+                data[level] = np.where(codes == radix - 1, np.nan, np.asarray(values, dtype=float))
+            else:
+                data[level] = pd.Categorical(np.asarray(values, dtype=object), categories=uniques)
+                data[level][codes == radix - 1] = np.nan
+        cells = pd.DataFrame({level: data[level] for level in LEVELS + (TIME,)})
+        cells['rows'] = np.bincount(cell, minlength=k)
+
+        util = None
+        for m in measures:
+            if m in METRICS:
+                values = METRICS[m].values(df)
+            elif m in df.columns:
+                values = as_float_array(df[m])
+            else:
+                values = np.full(n, np.nan)
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            cells[f'{m}_n'] = np.bincount(cell, weights=present, minlength=k).astype(np.int64)
+            cells[f'{m}_sum'] = np.bincount(cell, weights=filled, minlength=k)
+            cells[f'{m}_sq'] = np.bincount(cell, weights=filled * filled, minlength=k)
+            if m == 'utilization':
+                util = values
+        if util is None:
+            util = METRICS['utilization'].values(df)
+        bins = len(edges) - 1
+        idx = bin_codes(util, edges)
+        keep = idx >= 0
+        counts = np.bincount(cell[keep] * bins + idx[keep], minlength=k * bins).reshape(k, bins)
+        for i in range(bins):
+            cells[f'util_{i}'] = counts[:, i]
+        return cls(cells, measures, edges)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def rollup(self, level=None, year=False, **where):
+        """Stat columns per member of `level` (and FiscalYear if `year`), over the cells matching `where`.
+
+        `level` is one of LEVELS, 'FiscalYear' or None (network total);
+        `where` maps levels or FiscalYear to a member or a list of members.
+        """
+        if level == TIME:
+            level, year = None, True
+        unknown = [c for c in [level, *where] if c is not None and c not in LEVELS + (TIME,)]
+        if unknown:
+            raise KeyError(f"Unknown level(s): {', '.join(unknown)}; expected {', '.join(LEVELS + (TIME,))}")
+        used = [c for c in [level, *where] if c in LEVELS]
+        depth = max((LEVELS.index(c) + 1 for c in used), default=0)
+        frame = self.rollups[(depth, year or TIME in where)]
+        if where:
+            mask = np.ones(len(frame), dtype=bool)
+            for name, value in where.items():
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                mask &= frame.index.get_level_values(name).isin(list(values))
+            frame = frame[mask]
+        keys = ([level] if level else []) + ([TIME] if year else [])
+        if not keys:
+            return frame.sum().to_frame('all').T
+        return frame.groupby(level=keys, observed=True).sum()
+
+    def _stat(self, measure, stat, level, year, where):
+        if measure not in self.measures:
+            raise KeyError(f"{measure!r} is not a cube measure; expected one of {', '.join(self.measures)}")
+        frame = self.rollup(level, year, **where)
+        return frame[f'{measure}_{stat}'], frame[f'{measure}_n']
+
+    def total(self, measure, level=None, year=False, **where):
+        return self._stat(measure, 'sum', level, year, where)[0].rename(measure)
+
+    def count(self, measure, level=None, year=False, **where):
+        return self._stat(measure, 'n', level, year, where)[0].rename(measure)
+
+    def mean(self, measure, level=None, year=False, **where):
+        """Mean of the non-missing values per member (NaN for members with none)."""
+        total, n = self._stat(measure, 'sum', level, year, where)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (total / n.where(n > 0)).rename(measure)
+
+    def std(self, measure, level=None, year=False, **where):
+        """Sample standard deviation per member (ddof=1, as pandas)."""
+        total, n = self._stat(measure, 'sum', level, year, where)
+        sq = self._stat(measure, 'sq', level, year, where)[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (sq - total * total / n) / (n - 1)
+        return np.sqrt(var.clip(lower=0).where(n > 1)).rename(measure)
+
+    def members(self, level, of='School', year=False, **where):
+        """Distinct members of `of` with rows, per member of `level` (e.g. schools per region)."""
+        if level == TIME:
+            level, year = None, True
+        depth = max([LEVELS.index(of)] + [LEVELS.index(c) for c in [level, *where] if c in LEVELS]) + 1
+        frame = self.rollups[(depth, year or TIME in where)]
+        frame = frame[frame['rows'].to_numpy() > 0]
+        for name, value in where.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            frame = frame[frame.index.get_level_values(name).isin(list(values))]
+        keys = ([level] if level else []) + ([TIME] if year else [])
+        labels = frame.index.to_frame(index=False)
+        return labels.groupby(keys, observed=True)[of].nunique().rename(of)
+
+    def drill(self, **path):
+        """Stats of the next level below `path` (e.g. Region='Europe' -> its subregions)."""
+        depth = max((LEVELS.index(c) + 1 for c in path if c in LEVELS), default=0)
+        if depth == len(LEVELS):
+            raise ValueError("School is the finest level; use rollup(year=True) for its years")
+        return self.rollup(LEVELS[depth], **path)
+
+    def histogram(self, edges=None, **where):
+        """Utilization counts of the cells matching `where` over `edges` (default: the cube's own bins).
+
+        `edges` must be a subset of the cube's edges; bins are left-closed.
+        """
+        frame = self.rollup(None, **where)
+        counts = frame[[f'util_{i}' for i in range(len(self.edges) - 1)]].to_numpy()[0].astype(np.int64)
+        return counts if edges is None else coarsen(counts, self.edges, edges)
+
+    # ------------------------------------------------------------------
+    # PartitionStore queries (dim 'region' or 'year')
+    # ------------------------------------------------------------------
+    def _by(self, method, dim, measure):
+        series = method(measure, DIMS.get(dim, dim))
+        return {key: value for key, value in series.items()}
+
+    def totals(self, dim, measure):
+        return self._by(self.total, dim, measure)
+
+    def means(self, dim, measure):
+        return self._by(self.mean, dim, measure)
+
+    def counts(self, dim, measure):
+        return self._by(self.count, dim, measure)
+
+    def schools(self, dim):
+        return self.members(DIMS.get(dim, dim)).to_dict()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        self.cells.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, measures=MEASURES, edges=UTIL_BIN_EDGES):
+        return cls(pd.read_parquet(path), measures, edges)
+
+
+def cube_path(source=CSV_PATH):
+    """Cells file of `source`, named by the content hash of the file and of the definitions."""
+    text = f'{MetricStore(source).source_digest()}:{definitions_digest()}:{file_sha256(__file__)}'
+    return os.path.join(CUBE_CACHE_DIR, hashlib.sha256(text.encode()).hexdigest()[:32] + '.parquet')
+
+
+def load_cube(source=CSV_PATH):
+    """Cube of `source`: its cells are read from the cache, or built with one scan and cached."""
+    path = cube_path(source)
+    try:
+        return Cube.load(path)
+    except (OSError, ValueError):
+        pass
+    available = school_data_columns(source)
+    cube = Cube.from_frame(load_school_data([c for c in cube_columns() if c in available], source=source))
+    try:
+        cube.save(path)
+    except (ImportError, OSError):
+        pass  # No Parquet engine: the cube is rebuilt next time
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Roll School Level Data up the Region > ... > School hierarchy')
+    parser.add_argument('--source', default=CSV_PATH)
+    parser.add_argument('--level', default='Region', choices=LEVELS + (TIME,))
+    parser.add_argument('--measure', default='enquiries_started', choices=MEASURES)
+    parser.add_argument('--where', nargs='*', default=[], metavar='LEVEL=MEMBER',
+                        help='e.g. Region=Europe FiscalYear=2024')
+    parser.add_argument('--by-year', action='store_true', help='one row per member and fiscal year')
+    args = parser.parse_args()
+
+    where = {}
+    for item in args.where:
+        name, _, value = item.partition('=')
+        where[name] = float(value) if name == TIME else value
+    cube = load_cube(args.source)
+    print(f"{len(cube.cells):,} cells, {int(cube.cells['rows'].sum()):,} rows")
+
+    year = args.by_year and args.level != TIME
+    table = pd.DataFrame({
+        'n': cube.count(args.measure, args.level, year, **where),
+        'total': cube.total(args.measure, args.level, year, **where),
+        'mean': cube.mean(args.measure, args.level, year, **where),
+        'std': cube.std(args.measure, args.level, year, **where),
+    })
+    if args.level in LEVELS and args.level != 'School':
+        table['schools'] = cube.members(args.level, year=year, **where)
+    title = f"{args.measure} by {args.level}" + (' and FiscalYear' if year else '')
+    if where:
+        title += ' where ' + ', '.join(f'{k}={v}' for k, v in where.items())
+    print(f"\n{title}\n")
+    print(table.to_string(float_format=lambda v: f'{v:,.2f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Pre-aggregated JSON payloads for the HTML dashboards.
+
+Each dashboard gets one compact JSON file in data/ holding only the fields
+and rollups it displays, so pages no longer download and parse the raw CSV.
+data/manifest.json lists every payload with its SHA-256; pages append the
+hash to the payload URL so browsers refetch it only when it changed.
+
+Pages that embed their arrays (eda.html, hypothesis.html, dashboard.html)
+get them injected between `// @generated <name>` and `// @end <name>`
+marker lines.
+Everything is built from one loaded frame, and a file is rewritten only when
+its content actually changes.
+
+The yearly trends, regional means and utilization histograms are lookups
+in a cube.Cube built once per run, or with --incremental in the
+(School, FiscalYear) partition store. The cube bins utilization once over
+binning.UTIL_BIN_EDGES, and both pages' histograms are sums of those bins.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from binning import DASHBOARD_UTIL_EDGES, UTIL_EDGES, coarsen, histogram
+from charts import CORR_COLUMNS, DRIVER_COLUMNS, SHORT_NAMES, prepare_enquiry_drivers
+from cube import Cube, cube_columns
+from data_loader import load_school_data
+from hypotheses import DRIVERS, HYPOTHESES, evaluate, page_rows, required_columns
+from incremental import refresh_store, source_columns
+from leaderboard import LEADERBOARD_COLUMNS, leaderboard_payload
+from metrics import METRICS
+from panel import GroupIndex
+
+DATA_DIR = 'data'
+MANIFEST = 'manifest.json'
+# Pages whose embedded arrays are kept in sync with their payload
+INJECT_TARGETS = {'eda': 'eda.html', 'hypothesis': 'hypothesis.html', 'dashboard': 'dashboard.html'}
+
+UTIL_LABELS = ['10-20%', '20-30%', '30-40%', '40-50%', '50-60%', '60-70%',
+               '70-80%', '80-90%', '90-100%', '100-110%', '110%+']
+
+# Short labels that fit the region axes of the hypothesis and dashboard pages
+REGION_LABELS = {'South East Asia & India': 'SEA & India'}
+
+
+def data_columns():
+    """Source columns needed to build every payload."""
+    cols = (source_columns() + cube_columns() + required_columns(DRIVERS + HYPOTHESES) + LEADERBOARD_COLUMNS
+            + CORR_COLUMNS + DRIVER_COLUMNS)
+    return list(dict.fromkeys(cols))
+
+
+# ----------------------------------------------------------------------------
+# Shared rollups (also printed by generate_aligned_data.py)
+# ----------------------------------------------------------------------------
+def yearly_totals(df, measure, store=None):
+    """Sum of `measure` per FiscalYear, oldest first."""
+    if store:
+        return pd.Series({float(y): v for y, v in store.totals('year', measure).items()}).sort_index()
+    return df.groupby('FiscalYear')[measure].sum().sort_index()
+
+
+def regional_rates(df, store=None):
+    """Mean enquiries per student FTE by Region, highest first."""
+    if store:
+        return pd.Series(store.means('region', 'rate')).sort_values(ascending=False)
+    regions = GroupIndex(df['Region'])
+    return regions.series(regions.mean(METRICS['rate'].values(df))).sort_values(ascending=False)
+
+
+def driver_correlations(df):
+    """[(driver name, Spearman rho)] with more than 10 pairs, strongest first."""
+    results = evaluate(df, DRIVERS)
+    correlations = [(h.name, results[h.id]['r']) for h in DRIVERS if results[h.id]['n'] > 10]
+    correlations.sort(key=lambda x: abs(x[1]), reverse=True)
+    return correlations
+
+
+def utilization_counts(df, edges, store=None):
+    """School-years per utilization bin over `edges` (left-closed bins).
+
+    Summed from the store's histogram when its bins cover `edges`, otherwise
+    binned from `df` in one pass.
+    """
+    if store and set(map(float, edges)) <= set(map(float, store.edges)):
+        return coarsen(store.histogram(), store.edges, edges)
+    return histogram(METRICS['utilization'].values(df), edges).total()
+
+
+def utilization_histogram(df, store=None):
+    """[(bin label, school-years)] over UTIL_EDGES (left-closed bins)."""
+    counts = utilization_counts(df, UTIL_EDGES, store)
+    return [(label, int(count)) for label, count in zip(UTIL_LABELS, counts)]
+
+
+def _named_values(series, digits=2):
+    return [{'name': name, 'value': round(float(val), digits)}
+            for name, val in series.items() if pd.notna(val) and val > 0]
+
+
+# ----------------------------------------------------------------------------
+# Page payloads
+# ----------------------------------------------------------------------------
+def eda_payload(df, store=None):
+    trend = yearly_totals(df, 'StudentFTE', store)
+    return {
+        'trendData': [{'year': f'FY{int(yr)}', 'value': int(val)} for yr, val in trend.items() if pd.notna(yr)],
+        'regionsData': _named_values(regional_rates(df, store)),
+        'driversData': [{'name': name, 'r': round(float(r), 2)} for name, r in driver_correlations(df)],
+        'utilizationData': [{'bin': label, 'count': count}
+                            for label, count in utilization_histogram(df, store) if count > 0],
+    }
+
+
+def hypothesis_payload(df, store=None):
+    regions = regional_rates(df, store)
+    return {'hypotheses': page_rows(evaluate(df)),
+            'regions': _named_values(regions.rename(index=lambda r: REGION_LABELS.get(r, r)))}
+
+
+def dashboard_payload(df, store=None):
+    drivers = prepare_enquiry_drivers(df).head(10)
+    if store:
+        regions = pd.Series(store.means('region', 'enquiries_started')).sort_values(ascending=False)
+    else:
+        by_region = GroupIndex(df['Region'])
+        regions = by_region.series(by_region.mean(df['enquiries_started'])).sort_values(ascending=False)
+    trend = yearly_totals(df, 'enquiries_started', store)
+    cols = [c for c in CORR_COLUMNS if c in df.columns]
+    matrix = df[cols].corr().round(2)
+    labels = [SHORT_NAMES.get(c, c) for c in cols]
+    counts = utilization_counts(df, DASHBOARD_UTIL_EDGES, store)
+    return {
+        'driversData': [{'name': name, 'r': round(float(r), 2)} for name, r in drivers.items()],
+        'regionData': [{'name': REGION_LABELS.get(name, name), 'value': int(round(val))}
+                       for name, val in regions.items()],
+        'trendData': [{'year': f'FY{int(yr)}', 'value': int(val)} for yr, val in trend.items() if pd.notna(yr)],
+        # Every (row, column) cell of the matrix, row by row
+        'correlationData': [{'x': x, 'y': y, 'r': None if np.isnan(v) else float(v)}
+                            for x, row in zip(labels, matrix.to_numpy()) for y, v in zip(labels, row)],
+        'utilizationData': [{'bin': int(low + 5), 'count': int(c)} for low, c in zip(DASHBOARD_UTIL_EDGES[:-1], counts)],
+    }
+
+
+PAGES = {
+    'eda': eda_payload,
+    'hypothesis': hypothesis_payload,
+    'dashboard': dashboard_payload,
+    'leaderboard': leaderboard_payload,
+}
+
+
+# ----------------------------------------------------------------------------
+# Build
+# ----------------------------------------------------------------------------
+def encode(payload):
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def write_if_changed(path, body):
+    """Write bytes `body` to `path` unless it already holds them; returns True if written."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                return False
+    except OSError:
+        pass
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(body)
+    os.replace(tmp, path)
+    return True
+
+
+def _report(path, written, size):
+    print(f"  {'✓' if written else '='} {path} ({size:,} bytes{'' if written else ', unchanged'})")
+
+
+def build_payloads(df, store=None, pages=PAGES):
+    """Every page's payload; the rollups come from `store`, or from a cube of `df` built here."""
+    store = store or Cube.from_frame(df)
+    return {page: build(df, store) for page, build in pages.items()}
+
+
+def write_payloads(payloads, out_dir=DATA_DIR):
+    """Write data/<page>.json for every payload plus the manifest; returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    for page, payload in payloads.items():
+        body = encode(payload)
+        filename = page + '.json'
+        path = os.path.join(out_dir, filename)
+        _report(path, write_if_changed(path, body), len(body))
+        manifest[page] = {'file': filename, 'sha256': hashlib.sha256(body).hexdigest(), 'bytes': len(body)}
+    body = (json.dumps({'pages': manifest}, indent=2, sort_keys=True) + '\n').encode('utf-8')
+    write_if_changed(os.path.join(out_dir, MANIFEST), body)
+    return manifest
+
+
+def js_array(name, items, indent):
+    """`const name = [...];` with one `{ key: value }` object literal per line."""
+    lines = [f'{indent}const {name} = [']
+    lines += [f'{indent}    {{ {", ".join(f"{k}: {json.dumps(v, ensure_ascii=False)}" for k, v in item.items())} }},'
+              for item in items]
+    lines[-1] = lines[-1].rstrip(',') if items else lines[-1]
+    lines.append(f'{indent}];')
+    return '\n'.join(lines) + '\n'
+
+
+def inject(html, payload):
+    """Replace each payload array between its @generated/@end markers in `html`."""
+    for name, items in payload.items():
+        pattern = re.compile(rf'^( *)// @generated {name}\b[^\n]*\n(.*?)^ *// @end {name}\n', re.M | re.S)
+        match = pattern.search(html)
+        if match is None:
+            raise ValueError(f"No '// @generated {name}' ... '// @end {name}' block found")
+        html = html[:match.start(2)] + js_array(name, items, match.group(1)) + html[match.end(2):]
+    return html
+
+
+def inject_pages(payloads, targets=INJECT_TARGETS):
+    """Write each page's payload arrays into its HTML file; returns the files rewritten."""
+    written = []
+    for page, path in targets.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        body = inject(html, payloads[page]).encode('utf-8')
+        changed = write_if_changed(path, body)
+        _report(path, changed, len(body))
+        if changed:
+            written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build pre-aggregated JSON payloads for the dashboards')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse per-(School, FiscalYear) statistics from the last run')
+    parser.add_argument('--out', default=DATA_DIR, help='output directory (default: data)')
+    parser.add_argument('--no-inject', action='store_true',
+                        help='only write the JSON payloads, leave the HTML files untouched')
+    args = parser.parse_args()
+
+    df = load_school_data(data_columns())
+    print("Loaded", len(df), "rows")
+    store = refresh_store(df) if args.incremental else None
+    payloads = build_payloads(df, store)
+    write_payloads(payloads, out_dir=args.out)
+    if not args.no_inject:
+        inject_pages(payloads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Shared data-loading layer for the School Level Data scripts.
+
+The first load of a source file (CSV or XLSX) parses it once and writes a
+typed Parquet snapshot to .cache/. Later loads check the snapshot against the
+source file's mtime/size (fast path) and SHA-256 hash (slow path) and read
+only the columns the calling script asks for.
+
+For extracts too large to load at once, `iter_school_data()` streams a CSV
+in fixed-size chunks holding only the requested columns.
+
+Country-year macro covariates (GDP growth, inflation, population, HNWI
+counts, ...) are repeated on every school row of the source file. The
+snapshot keeps each one that is constant per (iso2, FiscalYear) once per
+key in a separate country-year table, and `load_school_data()` hash-joins
+it back onto the rows only when a caller asks for it. Columns whose values
+differ within a key stay on the school rows, so the split is lossless.
+
+Scripts that rewrite the data save a canonical Parquet file next to the
+CSV/XLSX and export those formats later (see writers.py). The canonical
+file records the (mtime, size) stamp each export had when it was written;
+while an export is missing or still has that stamp, every load of its path
+reads the canonical file instead (`resolve_source()`).
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Snapshot is an optimisation; fall back to the source file
+    pq = None
+
+CSV_PATH = 'School Level Data.csv'
+XLSX_PATH = 'School Level Data.xlsx'
+CACHE_DIR = '.cache'
+CHUNK_ROWS = 100_000
+# Parquet row group size: lets filtered scans (query.py) skip row groups by their statistics
+ROW_GROUP_ROWS = 65_536
+# Parquet schema metadata key of a canonical file: {export file name: its stamp
+# when the canonical file was written, or None if it did not exist}
+EXPORTS_KEY = b'school_data_exports'
+
+# Country-year covariates of the source file and the key they belong to
+MACRO_KEYS = ('iso2', 'FiscalYear')
+MACRO_COLUMNS = (
+    'total_enrolment', 'total_public_enrolment', 'tv_total_private_enrolment_t_plus1',
+    'gdp_growth_pct', 'gdp_per_capita_growth_pct', 'market_cap', 'gross_savings_pct_gdp',
+    'total_population', 'population_0_14_pct_total', 'urban_population_pct_total', 'net_migration',
+    'inflation_pct', 'govt_expenditure_on_education_pct_gdp', 'foreign_dir_investment_net_inflows_pct_gdp',
+    'govt_expenditure_on_education_per_student_pct_gdp', 'household_final_consumption_expenditure',
+    'millionaires', 'eyp_private_enrolment', 'hnwi_billionaires', 'hnwi_centi_millionaires',
+    'hnwi_millionaire_growth_2014_to_2024', 'hnwi_number_of_millionaires',
+)
+
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def canonical_path(source):
+    """Canonical Parquet file of a CSV/XLSX export (same name, .parquet)."""
+    return os.path.splitext(source)[0] + '.parquet'
+
+
+def _is_parquet(source):
+    return source.lower().endswith('.parquet')
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def recorded_exports(canonical):
+    """{export file name: stamp} recorded in a canonical file by writers.write_canonical()."""
+    metadata = pq.read_schema(canonical).metadata or {}
+    recorded = json.loads(metadata.get(EXPORTS_KEY, b'{}'))
+    return {name: tuple(stamp) if stamp else None for name, stamp in recorded.items()}
+
+
+def export_is_pending(path, recorded_stamp):
+    """True while an export is missing or unchanged since its canonical file was written."""
+    stamp = file_stamp(path)
+    return stamp is None or stamp == recorded_stamp
+
+
+def resolve_source(source):
+    """`source`, or its canonical Parquet file while the export of `source` is pending.
+
+    Only the recorded stamps count, not mtimes: a CSV/XLSX exported, restored
+    or edited after the canonical file was written is read as is.
+    """
+    if pq is None or _is_parquet(source):
+        return source
+    canonical = canonical_path(source)
+    if not os.path.exists(canonical):
+        return source
+    recorded = recorded_exports(canonical)
+    name = os.path.basename(source)
+    if name in recorded and export_is_pending(source, recorded[name]):
+        return canonical
+    return source
+
+
+def _snapshot_paths(source):
+    name = os.path.basename(source)
+    return (os.path.join(CACHE_DIR, name + '.parquet'),
+            os.path.join(CACHE_DIR, name + '.meta.json'))
+
+
+def macro_path(source):
+    """Country-year table of a source's snapshot."""
+    return os.path.join(CACHE_DIR, os.path.basename(source) + '.macro.parquet')
+
+
+def _read_source(source, columns=None):
+    if source.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(source, sheet_name=0, usecols=columns)
+    return pd.read_csv(source, usecols=columns, encoding='utf-8-sig')
+
+
+def _typed(df):
+    """Give every column a single Arrow-friendly type.
+
+    Object columns that parse cleanly as numbers become float64, the rest
+    become strings (mixed str/NaN columns otherwise fail to serialise).
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object and str(df[col].dtype) != 'str':
+            continue
+        converted = pd.to_numeric(df[col], errors='coerce')
+        if converted.notna().sum() == df[col].notna().sum() and converted.notna().any():
+            df[col] = converted
+        else:
+            df[col] = df[col].astype('string')
+    return df
+
+
+def split_macro(df, columns=MACRO_COLUMNS):
+    """(school rows, country-year table, moved columns) for the `columns` that are constant per key.
+
+    A column moves to the table only if every (iso2, FiscalYear) key has a
+    single value for it (missing counts as a value) and rows without a full
+    key never have one, so joining it back restores every row exactly.
+    """
+    keys = list(MACRO_KEYS)
+    candidates = [c for c in columns if c in df.columns]
+    if not candidates or not all(k in df.columns for k in keys):
+        return df, None, []
+    keyed = df[keys].notna().all(axis=1).to_numpy()
+    group = df.loc[keyed].groupby(keys, sort=False).ngroup().to_numpy()
+    distinct = df.loc[keyed, candidates].groupby(group).nunique(dropna=False).max()
+    unkeyed = df.loc[~keyed, candidates].notna().any()
+    moved = [c for c in candidates if distinct.get(c, 0) <= 1 and not unkeyed[c]]
+    if not moved:
+        return df, None, []
+    table = (df.loc[keyed, keys + moved].drop_duplicates(keys)
+             .sort_values(keys).reset_index(drop=True))
+    return df.drop(columns=moved), table, moved
+
+
+def join_macro(df, table, columns):
+    """`columns` of the country-year `table` for each row of `df`, by a hash join on (iso2, FiscalYear).
+
+    Rows whose key is missing or not in the table get missing values.
+    """
+    keys = list(MACRO_KEYS)
+    rows = pd.MultiIndex.from_frame(table[keys]).get_indexer(pd.MultiIndex.from_frame(df[keys]))
+    joined = table[columns].take(np.maximum(rows, 0)).set_axis(df.index)
+    return joined.mask(pd.Series(rows < 0, index=df.index), axis=0)
+
+
+def _load_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+
+def ensure_snapshot(source=CSV_PATH, refresh=False):
+    """Build (or validate) the Parquet snapshot of `source` and return its metadata."""
+    snap_path, meta_path = _snapshot_paths(source)
+    stat = os.stat(source)
+    meta = None if refresh else _load_meta(meta_path)
+
+    # Snapshots split over another MACRO_COLUMNS list (or not split) are rebuilt once
+    split = meta is not None and meta.get('macro_candidates') == list(MACRO_COLUMNS)
+    if split and os.path.exists(snap_path):
+        if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return meta
+        # mtime changed (e.g. a fresh checkout) - only rebuild if the content did
+        digest = file_sha256(source)
+        if digest == meta['sha256']:
+            meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            _write_meta(meta_path, meta)
+            return meta
+    else:
+        digest = file_sha256(source)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df = _typed(_read_source(source))
+    rows, table, moved = split_macro(df)
+    tmp = snap_path + '.tmp'
+    rows.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, snap_path)
+    if table is not None:
+        tmp = macro_path(source) + '.tmp'
+        table.to_parquet(tmp, index=False)
+        os.replace(tmp, macro_path(source))
+
+    meta = {
+        'source': source,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': digest,
+        'rows': len(df),
+        'columns': list(df.columns),
+        'dtypes': {c: str(t) for c, t in df.dtypes.items()},
+        'macro_candidates': list(MACRO_COLUMNS),
+        'macro_columns': moved,
+    }
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def school_data_columns(source=CSV_PATH):
+    """Column names of the source file, without loading any data."""
+    if pq is None:
+        return list(_read_source(source).columns)
+    source = resolve_source(source)
+    if _is_parquet(source):
+        return pq.read_schema(source).names
+    return ensure_snapshot(source)['columns']
+
+
+def load_school_data(columns=None, source=CSV_PATH, refresh=False):
+    """Load School Level Data as a DataFrame.
+
+    `columns` limits the read to the listed columns; names that do not exist
+    in the file are skipped so callers can keep their `if col in df.columns`
+    guards.
+    """
+    if pq is None:
+        available = list(_read_source(source).columns) if columns is not None else None
+        wanted = None if columns is None else [c for c in columns if c in available]
+        return _read_source(source, wanted)
+
+    source = resolve_source(source)
+    moved = []
+    if _is_parquet(source):
+        # Canonical file: already typed, no snapshot needed
+        snap_path, available = source, pq.read_schema(source).names
+    else:
+        meta = ensure_snapshot(source, refresh=refresh)
+        snap_path, available, moved = _snapshot_paths(source)[0], meta['columns'], meta['macro_columns']
+    if columns is not None:
+        available = set(available)
+        columns = [c for c in dict.fromkeys(columns) if c in available]
+    wanted = [c for c in moved if columns is None or c in columns]
+    if not wanted:
+        return pd.read_parquet(snap_path, columns=columns)
+
+    # Country-year columns are stored once per key: join them onto the rows
+    order = columns if columns is not None else available
+    stored = [c for c in order if c not in moved]
+    df = pd.read_parquet(snap_path, columns=list(dict.fromkeys(stored + list(MACRO_KEYS))))
+    table = pd.read_parquet(macro_path(source), columns=list(MACRO_KEYS) + wanted)
+    df = pd.concat([df, join_macro(df, table, wanted)], axis=1)
+    return df[order]
+
+
+def load_records(columns=None, source=CSV_PATH):
+    """Rows as a list of dicts, with '' for missing values (csv.DictReader style)."""
+    df = load_school_data(columns, source=source)
+    df = df.astype(object).where(df.notna(), '')
+    return df.to_dict('records')
+
+
+def iter_school_data(columns, source=CSV_PATH, chunksize=CHUNK_ROWS, numeric=()):
+    """Stream a CSV (or its canonical Parquet file) as DataFrames of at most `chunksize` rows.
+
+    Only `columns` are kept (missing names are skipped, as in
+    load_school_data); columns listed in `numeric` are parsed as float64 with
+    unparseable values as NaN, so every chunk has the same types. Memory use
+    depends on `chunksize`, not on the file size.
+    """
+    source = resolve_source(source)
+    wanted = set(columns)
+    numeric = [c for c in numeric if c in wanted]
+    if _is_parquet(source):
+        parquet = pq.ParquetFile(source)
+        names = [c for c in parquet.schema_arrow.names if c in wanted]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=names):
+            chunk = batch.to_pandas()
+            for c in [c for c in numeric if c in chunk.columns]:
+                chunk[c] = pd.to_numeric(chunk[c], errors='coerce').astype(float)
+            yield chunk
+        return
+    if source.lower().endswith(('.xlsx', '.xls')):
+        raise ValueError(f"Streaming needs a CSV source, got {source}")
+    with pd.read_csv(source, usecols=lambda c: c in wanted, chunksize=chunksize,
+                     encoding='utf-8-sig', dtype={c: str for c in numeric}) as reader:
+        for chunk in reader:
+            for c in numeric:
+                if c in chunk.columns:
+                    chunk[c] = pd.to_numeric(chunk[c].str.replace(',', '', regex=False), errors='coerce')
+            yield chunk
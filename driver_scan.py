@@ -0,0 +1,98 @@
+"""
+Target-vs-all driver scan.
+
+`df.corr(method='spearman')['Rate']` builds the full column x column matrix
+just to read one row of it, so its cost grows with the square of the column
+count. `scan_drivers()` computes only that row: every column is ranked once,
+the target is re-ranked once per distinct missing-value pattern, and columns
+are correlated in blocks spread over a thread pool (NumPy releases the GIL
+for the sorting and arithmetic).
+
+Results match pandas' pairwise-complete `corr()` semantics.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from stats_engine import pearson_batch
+
+DEFAULT_BLOCK_SIZE = 32
+
+
+def _rank_ignoring_nan(values):
+    """Average ranks of the non-NaN entries; NaN stays NaN."""
+    ranked = np.full(values.shape, np.nan)
+    ok = ~np.isnan(values)
+    ranked[ok] = rankdata(values[ok])
+    return ranked
+
+
+class _TargetRanks:
+    """Target ranks per missing-value pattern of the partner column.
+
+    A column's ranks over the rows where the target is present are also its
+    ranks over the pairwise-complete rows (its own NaNs are skipped either
+    way), so only the target ever needs re-ranking.
+    """
+
+    def __init__(self, target, method):
+        self.target = target
+        self.method = method
+        self._cache = {}
+        self.full = self._transform(np.ones(len(target), dtype=bool))
+
+    def _transform(self, mask):
+        out = np.full(len(self.target), np.nan)
+        out[mask] = rankdata(self.target[mask]) if self.method == 'spearman' else self.target[mask]
+        return out
+
+    def for_mask(self, mask):
+        if mask.all():
+            return self.full
+        key = np.packbits(mask).tobytes()
+        if key not in self._cache:
+            self._cache[key] = self._transform(mask)
+        return self._cache[key]
+
+
+def _scan_block(block, target_ranks, method):
+    if method == 'spearman':
+        X = np.column_stack([_rank_ignoring_nan(block[:, j]) for j in range(block.shape[1])])
+    else:
+        X = block
+    Y = np.column_stack([target_ranks.for_mask(~np.isnan(block[:, j])) for j in range(block.shape[1])])
+    return pearson_batch(X, Y, min_n=2, constant_r=np.nan)
+
+
+def scan_drivers(df, target, columns=None, method='spearman', n_jobs=None,
+                 block_size=DEFAULT_BLOCK_SIZE):
+    """Correlate `target` with every numeric column of `df`.
+
+    Returns a DataFrame indexed by column name with r, n and p, equal to
+    `df[columns].corr(method)[target]` but without building the full matrix.
+    """
+    if method not in ('spearman', 'pearson'):
+        raise ValueError(f"Unsupported method: {method}")
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns.tolist()
+
+    t = df[target].to_numpy(dtype=float, na_value=np.nan)
+    present = ~np.isnan(t)
+    target_ranks = _TargetRanks(t[present], method)
+    values = df[columns].to_numpy(dtype=float, na_value=np.nan)[present]
+
+    blocks = [values[:, i:i + block_size] for i in range(0, len(columns), block_size)]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(blocks) == 1:
+        parts = [_scan_block(b, target_ranks, method) for b in blocks]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(lambda b: _scan_block(b, target_ranks, method), blocks))
+
+    if not parts:
+        return pd.DataFrame(columns=['r', 'n', 'p'], dtype=float)
+    r, n, p = (np.concatenate(arrays) for arrays in zip(*parts))
+    return pd.DataFrame({'r': r, 'n': n, 'p': p}, index=pd.Index(columns))
@@ -1,49 +1,74 @@
-import csv
+"""
+Extract representative school-year samples for the scatter plots
+(samples.json, hypothesis.html `sampleData`).
+
+The CSV is streamed in chunks into a seeded reservoir (sampling.py), so the
+output is reproducible and memory stays bounded on large extracts. Pass
+several --size values to get several samples from the same pass, and
+--stratify Region FiscalYear for samples proportional to each stratum.
+"""
+import argparse
 import json
-import random
-
-with open("School Level Data.csv", "r", encoding="utf-8-sig") as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
-
-def num(v):
-    if v is None or v == "":
-        return None
-    try:
-        return float(str(v).replace(",", ""))
-    except:
-        return None
-
-# Seed for reproducibility if needed, but we just want legit data
-all_samples = []
-
-for r in rows:
-    enq = num(r.get("enquiries_started"))
-    fte = num(r.get("StudentFTE"))
-    cap = num(r.get("CapacityFTE"))
-    fees = num(r.get("NAE_Overall_Average_Fee_USD"))
-    nps = num(r.get("nps_score"))
-    attr = num(r.get("Teachers_Attrition_Pct"))
-    age = num(r.get("school_age"))
-    region = r.get("Region", "Unknown")
-    
-    if all(x is not None for x in [enq, fte, cap, fees, nps, attr, age]):
-        all_samples.append({
-            "enq": enq,
-            "fte": fte,
-            "cap": cap,
-            "util": (fte / cap * 100) if cap > 0 else 0,
-            "rate": (enq / fte) if fte > 0 else 0,
-            "fees": fees,
-            "nps": nps,
-            "attr": attr,
-            "age": age,
-            "region": region
-        })
-
-# Take 100 actual data points
-sample_data = random.sample(all_samples, min(100, len(all_samples)))
-
-print("JSON_START")
-print(json.dumps(sample_data))
-print("JSON_END")
+
+from data_loader import CHUNK_ROWS, CSV_PATH, iter_school_data
+from metrics import METRICS
+from sampling import StratifiedReservoir
+
+NUMERIC = ["enquiries_started", "StudentFTE", "CapacityFTE", "NAE_Overall_Average_Fee_USD",
+           "nps_score", "Teachers_Attrition_Pct", "school_age"]
+
+
+
+def fill_reservoir(source=CSV_PATH, capacity=100, seed=0, strata=(), chunksize=CHUNK_ROWS):
+    """Stream `source` into a StratifiedReservoir of usable scatter points."""
+    reservoir = StratifiedReservoir(capacity, seed=seed, strata=strata)
+    for chunk in iter_school_data(NUMERIC + ["Region", "FiscalYear"], source,
+                                  chunksize=chunksize, numeric=NUMERIC + ["FiscalYear"]):
+        # Only rows with every metric present are usable scatter points
+        chunk = chunk.dropna(subset=[c for c in NUMERIC if c in chunk.columns])
+        samples = chunk.assign(
+            util=METRICS["utilization"].values(chunk),
+            rate=METRICS["rate"].values(chunk),
+            Region=chunk["Region"].fillna(""),
+        )
+        # ... and a defined rate and utilization (metrics.py policy)
+        reservoir.update(samples.dropna(subset=["util", "rate"]))
+    return reservoir
+
+
+def sample_records(reservoir, size):
+    """The sample of `size` as samples.json records."""
+    return [{
+        "enq": r.enquiries_started,
+        "fte": r.StudentFTE,
+        "cap": r.CapacityFTE,
+        "util": r.util,
+        "rate": r.rate,
+        "fees": r.NAE_Overall_Average_Fee_USD,
+        "nps": r.nps_score,
+        "attr": r.Teachers_Attrition_Pct,
+        "age": r.school_age,
+        "region": r.Region,
+    } for r in reservoir.sample(size).itertuples(index=False)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract seeded scatter samples')
+    parser.add_argument('--size', type=int, nargs='+', default=[100], help='sample size(s) (default: 100)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+    parser.add_argument('--stratify', nargs='*', default=[], choices=['Region', 'FiscalYear'],
+                        help='columns to stratify by')
+    parser.add_argument('--source', default=CSV_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    reservoir = fill_reservoir(args.source, max(args.size), seed=args.seed, strata=args.stratify,
+                               chunksize=args.chunksize)
+    for size in args.size:
+        print("JSON_START" if len(args.size) == 1 else f"JSON_START {size}")
+        print(json.dumps(sample_records(reservoir, size)))
+        print("JSON_END")
+
+
+if __name__ == '__main__':
+    main()
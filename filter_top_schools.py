@@ -1,50 +1,132 @@
 """
 Filter dataset to keep only 80 schools with the most complete data.
 Schools are ranked by the number of non-null values in key metrics.
+
+Completeness is one groupby-sum over the not-null mask of the key metrics:
+per (School, FiscalYear) first, then per school. Each metric can be
+weighted (--weight nps_score=2), and the selection is the top --top schools
+(argpartition, ties broken by school name) that also reach --min-score.
 """
+import argparse
+
 import pandas as pd
 import numpy as np
 
-# Load data
-df = pd.read_csv('School Level Data.csv')
-print(f"Original: {len(df)} rows, {df['School'].nunique()} unique schools")
-
-# Key metrics to consider for completeness
-key_metrics = [
-    'StudentFTE', 'CapacityFTE', 'NAE_Overall_Average_Fee_USD',
-    'leads_submitted', 'enquiries_started', 'nps_score',
-    'nps_responses_count', 'Teachers_Attrition_Pct'
-]
-
-# Count non-null values per school across all years
-school_completeness = df.groupby('School').apply(
-    lambda x: x[key_metrics].notna().sum().sum()
-).reset_index()
-school_completeness.columns = ['School', 'completeness_score']
-
-# Sort by completeness and get top 80 schools
-school_completeness = school_completeness.sort_values('completeness_score', ascending=False)
-top_80_schools = school_completeness.head(80)['School'].tolist()
-
-print(f"\nTop 80 schools by data completeness:")
-print(f"  Min completeness score: {school_completeness.head(80)['completeness_score'].min()}")
-print(f"  Max completeness score: {school_completeness.head(80)['completeness_score'].max()}")
-
-# Filter to keep only records from top 80 schools
-df_filtered = df[df['School'].isin(top_80_schools)]
-
-print(f"\nFiltered: {len(df_filtered)} rows, {df_filtered['School'].nunique()} unique schools")
-
-# Show which schools were removed
-removed_schools = [s for s in df['School'].unique() if s not in top_80_schools]
-print(f"\nRemoved {len(removed_schools)} schools:")
-for school in removed_schools:
-    score = school_completeness[school_completeness['School'] == school]['completeness_score'].values[0]
-    print(f"  {school}: completeness score = {score}")
-
-# Save filtered data
-df_filtered.to_csv('School Level Data.csv', index=False)
-df_filtered.to_excel('School Level Data.xlsx', index=False)
-
-print(f"\n✓ Saved filtered data to CSV and Excel")
-print(f"✓ {df_filtered['School'].nunique()} schools, {len(df_filtered)} total records")
+from data_loader import CSV_PATH, load_school_data
+from writers import save_school_data
+
+# Key metrics to consider for completeness, with their default weights
+METRIC_WEIGHTS = {
+    'StudentFTE': 1.0,
+    'CapacityFTE': 1.0,
+    'NAE_Overall_Average_Fee_USD': 1.0,
+    'leads_submitted': 1.0,
+    'enquiries_started': 1.0,
+    'nps_score': 1.0,
+    'nps_responses_count': 1.0,
+    'Teachers_Attrition_Pct': 1.0,
+}
+TOP_SCHOOLS = 80
+
+
+def completeness(df, weights=METRIC_WEIGHTS):
+    """Weighted count of non-null key metrics per (School, FiscalYear) and per School.
+
+    Returns (yearly, school): a Series indexed by (School, FiscalYear) and
+    one indexed by School, both sorted by key.
+    """
+    metrics = [m for m in weights if m in df.columns]
+    w = np.array([weights[m] for m in metrics], dtype=float)
+    row_score = df[metrics].notna().to_numpy() @ w
+    yearly = pd.Series(row_score, index=df.index).groupby(
+        [df['School'], df['FiscalYear']], dropna=False).sum()
+    school = yearly.groupby(level='School').sum()
+    return yearly.rename('completeness_score'), school.rename('completeness_score')
+
+
+def top_k(values, k):
+    """Positions of the `k` largest values, largest first; ties keep input order."""
+    values = np.asarray(values, dtype=float)
+    if k >= len(values):
+        return np.argsort(-values, kind='stable')
+    if k <= 0:
+        return np.array([], dtype=int)
+    kth = values[np.argpartition(-values, k - 1)[k - 1]]
+    above = np.flatnonzero(values > kth)
+    tied = np.flatnonzero(values == kth)[:k - len(above)]
+    chosen = np.concatenate([above, tied])
+    return chosen[np.argsort(-values[chosen], kind='stable')]
+
+
+def select_schools(scores, top=TOP_SCHOOLS, min_score=None):
+    """Scores of the selected schools, best first."""
+    selected = scores.iloc[top_k(scores.to_numpy(), top)]
+    if min_score is not None:
+        selected = selected[selected >= min_score]
+    return selected
+
+
+def parse_weight(text):
+    metric, sep, weight = text.partition('=')
+    if not sep or metric not in METRIC_WEIGHTS:
+        raise argparse.ArgumentTypeError(
+            f"expected METRIC=WEIGHT with METRIC one of: {', '.join(METRIC_WEIGHTS)}")
+    return metric, float(weight)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep the schools with the most complete key metrics')
+    parser.add_argument('--top', type=int, default=TOP_SCHOOLS, help=f'schools to keep (default: {TOP_SCHOOLS})')
+    parser.add_argument('--min-score', type=float, default=None, help='also drop schools scoring below this')
+    parser.add_argument('--weight', type=parse_weight, action='append', default=[],
+                        help='metric weight, e.g. nps_score=2 (repeatable; default weight 1)')
+    parser.add_argument('--by-year', action='store_true', help='print completeness per fiscal year')
+    parser.add_argument('--dry-run', action='store_true', help='report only, do not save')
+    args = parser.parse_args()
+    weights = {**METRIC_WEIGHTS, **dict(args.weight)}
+
+    # Load data
+    df = load_school_data(source=CSV_PATH)
+    print(f"Original: {len(df)} rows, {df['School'].nunique()} unique schools")
+
+    # Count non-null values per school across all years
+    yearly, school_completeness = completeness(df, weights)
+    selected = select_schools(school_completeness, args.top, args.min_score)
+    top_schools = set(selected.index)
+
+    print(f"\nTop {len(selected)} schools by data completeness:")
+    print(f"  Min completeness score: {selected.min():g}")
+    print(f"  Max completeness score: {selected.max():g}")
+
+    if args.by_year:
+        max_score = sum(w for m, w in weights.items() if m in df.columns)
+        by_year = yearly.groupby(level='FiscalYear', dropna=False).agg(['mean', 'size'])
+        print("\nCompleteness by fiscal year (mean share of weighted metrics present):")
+        for year, row in by_year.iterrows():
+            label = 'unknown' if pd.isna(year) else f"FY{int(year)}"
+            print(f"  {label}: {row['mean'] / max_score:.1%} ({int(row['size'])} schools)")
+
+    # Filter to keep only records from top schools
+    df_filtered = df[df['School'].isin(top_schools)]
+
+    print(f"\nFiltered: {len(df_filtered)} rows, {df_filtered['School'].nunique()} unique schools")
+
+    # Show which schools were removed
+    all_schools = pd.unique(df['School'])
+    removed_schools = all_schools[~pd.Index(all_schools).isin(selected.index)]
+    print(f"\nRemoved {len(removed_schools)} schools:")
+    for school, score in school_completeness.reindex(removed_schools).items():
+        print(f"  {school}: completeness score = {score:g}")
+
+    if args.dry_run:
+        return
+
+    # Save filtered data (Parquet now, CSV/XLSX exported by writers.py)
+    save_school_data(df_filtered)
+
+    print(f"\n✓ Saved filtered data")
+    print(f"✓ {df_filtered['School'].nunique()} schools, {len(df_filtered)} total records")
+
+
+if __name__ == '__main__':
+    main()
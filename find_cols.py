@@ -1,8 +1,8 @@
 
-import pandas as pd
+from data_loader import XLSX_PATH, school_data_columns
 
-df = pd.read_excel('School Level Data.xlsx')
-matches = [c for c in df.columns if 'nquir' in c or 'FTE' in c or 'Student' in c]
+columns = school_data_columns(XLSX_PATH)
+matches = [c for c in columns if 'nquir' in c or 'FTE' in c or 'Student' in c]
 print("--- Found Columns ---")
 for m in matches:
     print(m)
@@ -1,30 +1,52 @@
 """
 Generate aligned data values from CSV for use in HTML dashboards.
 This script calculates actual statistics from the randomized CSV
-and outputs JavaScript arrays that can be pasted into the HTML files.
+and prints them as JavaScript arrays for review. The rollups are shared
+with dashboard_data.py, which writes them as JSON and into the pages'
+@generated blocks: run `python dashboard_data.py` to update the HTML.
+
+The yearly trend, regional rates and utilization histogram are lookups in
+a cube.Cube of the data; with --incremental they come from the
+(School, FiscalYear) partition store, which only recomputes partitions
+whose rows changed since the last run.
 """
+import argparse
+import json
+
 import pandas as pd
 import numpy as np
-from scipy import stats
+
+from cube import Cube, cube_columns
+from dashboard_data import driver_correlations, regional_rates, utilization_histogram, yearly_totals
+from data_loader import load_school_data
+from hypotheses import DRIVERS, HYPOTHESES, evaluate, page_rows, required_columns
+from incremental import refresh_store, source_columns
+from metrics import METRICS
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument('--incremental', action='store_true',
+                    help='reuse per-(School, FiscalYear) statistics from the last run')
+args = parser.parse_args()
 
 # Load data
-df = pd.read_csv('School Level Data.csv')
+df = load_school_data(list(dict.fromkeys(source_columns() + cube_columns() + required_columns(DRIVERS + HYPOTHESES))))
 print("Loaded", len(df), "rows")
 print()
+store = refresh_store(df) if args.incremental else Cube.from_frame(df)
 
 # Calculate Rate (key metric for hypothesis testing)
-df['rate'] = df['enquiries_started'] / df['StudentFTE']
-df['utilization'] = (df['StudentFTE'] / df['CapacityFTE']) * 100
+df['rate'] = METRICS['rate'].series(df)
+df['utilization'] = METRICS['utilization'].series(df)
 
 print("=" * 70)
-print("COPY THESE VALUES INTO index.html")
+print("DASHBOARD VALUES (written into the pages by `python dashboard_data.py`)")
 print("=" * 70)
 print()
 
 # 1. Trend Data
 print("// trendData - Total StudentFTE by year")
 print("const trendData = [")
-trend = df.groupby('FiscalYear')['StudentFTE'].sum().sort_index()
+trend = yearly_totals(df, 'StudentFTE', store)
 for yr, val in trend.items():
     if pd.notna(yr):
         print(f'    {{ year: "FY{int(yr)}", value: {int(val)} }},')
@@ -34,7 +56,7 @@ print()
 # 2. Regional Data
 print("// regionsData - Average rate by region")
 print("const regionsData = [")
-regional = df.groupby('Region')['rate'].mean().sort_values(ascending=False)
+regional = regional_rates(df, store)
 for reg, val in regional.items():
     if pd.notna(val) and val > 0:
         print(f'    {{ name: "{reg}", value: {val:.2f} }},')
@@ -44,23 +66,7 @@ print()
 # 3. Correlation Data (drivers)
 print("// driversData - Correlation with enquiries_started")
 print("const driversData = [")
-correlations = []
-metrics = [
-    ('leads_submitted', 'Leads Intensity'),
-    ('NAE_Overall_Average_Fee_USD', 'Fees (Average)'),
-    ('StudentFTE', 'Student FTE (Size)'),
-    ('nps_score', 'NPS Score'),
-    ('nps_responses_count', 'NPS Response Count'),
-    ('Teachers_Attrition_Pct', 'Teacher Attrition')
-]
-for col, name in metrics:
-    valid = df[[col, 'enquiries_started']].dropna()
-    if len(valid) > 10:
-        rho, p = stats.spearmanr(valid[col], valid['enquiries_started'])
-        correlations.append((name, rho))
-
-# Sort by absolute value
-correlations.sort(key=lambda x: abs(x[1]), reverse=True)
+correlations = driver_correlations(df)  # sorted by absolute value
 for name, rho in correlations:
     print(f'    {{ name: "{name}", r: {rho:.2f} }},')
 print("];")
@@ -69,21 +75,24 @@ print()
 # 4. Utilization Distribution
 print("// utilizationData - Histogram of utilization rates")
 print("const utilizationData = [")
-bins = [(10, 20), (20, 30), (30, 40), (40, 50), (50, 60), (60, 70), 
-        (70, 80), (80, 90), (90, 100), (100, 110), (110, 200)]
-labels = ['10-20%', '20-30%', '30-40%', '40-50%', '50-60%', '60-70%', 
-          '70-80%', '80-90%', '90-100%', '100-110%', '110%+']
-for (low, high), label in zip(bins, labels):
-    count = ((df['utilization'] >= low) & (df['utilization'] < high)).sum()
+for label, count in utilization_histogram(df, store):
     print(f'    {{ bin: "{label}", count: {count} }},')
 print("];")
 print()
 
 print("=" * 70)
-print("COPY THESE VALUES INTO hypothesis.html")
+print("HYPOTHESIS PAGE VALUES (written into hypothesis.html by `python dashboard_data.py`)")
 print("=" * 70)
 print()
 
+# Hypothesis cards: the registry in hypotheses.py with the evaluated correlations
+print("// hypotheses array - H1-H20 from hypotheses.py")
+print("const hypotheses = [")
+for row in page_rows(evaluate(df)):
+    print('    { ' + ', '.join(f'{k}: {json.dumps(v, ensure_ascii=False)}' for k, v in row.items()) + ' },')
+print("];")
+print()
+
 # Hypothesis data with correlations
 print("// regions array")
 print("const regions = [")
@@ -0,0 +1,269 @@
+"""
+Hypothesis registry and batched evaluator.
+
+Every hypothesis tested in hypothesis.html is defined once here: the x/y
+columns it correlates (source columns or derived metrics), the method and
+the value the dashboard claims. `evaluate()` materialises each column and
+each rank transform exactly once and runs all correlations of a method in a
+single batched pass, so adding hypotheses does not add passes over the data.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.stats import rankdata
+
+from metrics import METRICS
+from panel import GroupIndex, panel_correlations
+from resampling import resample_tests
+from stats_engine import as_float_array, pearson_batch
+
+# Derived metrics (defined in metrics.py): name -> (columns, function of those column arrays)
+DERIVED_METRICS = {name: (m.columns, m.compute) for name, m in METRICS.items()}
+
+
+@dataclass(frozen=True)
+class Hypothesis:
+    id: str
+    name: str
+    category: str
+    claimed: float
+    x: str = None
+    y: str = None
+    method: str = 'pearson'  # 'pearson', 'spearman' or 'categorical'
+    symbol: str = 'ρ'
+    note: str = ''
+    description: str = ''  # card text in hypothesis.html
+
+    @property
+    def testable(self):
+        return self.method != 'categorical' and self.x is not None and self.y is not None
+
+
+HYPOTHESES = (
+    # Operational
+    Hypothesis("H1", "Scale Effect", "ops", 0.83, "StudentFTE", "enquiries_started", note="StudentFTE vs Enquiries",
+               description="Larger schools (Size) generate significantly more enquiries due to market presence."),
+    Hypothesis("H2", "Growth Strain", "ops", -0.47, "Teachers_Attrition_Pct", "enquiries_started", note="Teacher Attrition vs Enquiries",
+               description="High teacher attrition correlates negatively with demand (r=-0.47), as turnover undermines market trust."),
+    Hypothesis("H3", "Leader Stability", "ops", 0.20, "Average_Principal_Tenure", "rate", note="Principal Tenure vs Rate",
+               description="Principal tenure shows no meaningful correlation with enquiry rate (n=143, sparse data)."),
+    Hypothesis("H4", "Retention Momentum", "ops", 0.14, "Enquiries - Enrolled CVR YoY", "rate", note="CVR YoY vs Rate",
+               description="Year-on-year conversion rate growth shows no significant link to volume (n=66, sparse data)."),
+
+    # Curriculum
+    Hypothesis("H5", "IB Quality Magnet", "curr", 0.32, method="categorical", note="IB NPS - use nps_education_quality",
+               description="IB curriculum correlates with the highest average NPS (47.0 vs 44 for others)."),
+    Hypothesis("H6", "IGCSE Volume Engine", "curr", 0.10, method="categorical", note="IGCSE +112% - categorical",
+               description="IGCSE programs drive the highest raw enquiry volumes (+112% vs mean)."),
+    Hypothesis("H7", "A-Level Core", "curr", 0.09, method="categorical", note="A-Levels +6% - categorical",
+               description="A-Levels maintain steady demand (+6%) as the global standard for UK-bound students."),
+    Hypothesis("H8", "Multi-Program Lift", "curr", 0.09, method="categorical", note="Multi-curricula - categorical",
+               description="Offering multiple curricula shows negligible impact on enquiry rate."),
+
+    # Market
+    Hypothesis("H9", "Lead Velocity", "market", 0.94, "leads_submitted", "enquiries_started", note="Leads vs Enquiries",
+               description="Raw lead intensity (r=0.94) is the primary driver of final enquiry volume."),
+    Hypothesis("H10", "Regional Bias", "market", 0.68, method="categorical", symbol="H", note="Regional H-test",
+               description="The Middle East leads with a rate of 0.63 enquiries/student across regions."),
+    Hypothesis("H11", "Wealth Density", "market", 0.21, "hnwi_number_of_millionaires", "rate", note="HNWI vs Rate",
+               description="HNWI concentration shows no significant link to enquiry rate (r=-0.01, n=90)."),
+    Hypothesis("H12", "Fee Sensitivity", "market", -0.22, "NAE_Overall_Average_Fee_USD", "enquiries_started", note="Fees vs Enquiries",
+               description="Higher fees act as a volume constraint (r=-0.22) in competitive markets."),
+
+    # Quality
+    Hypothesis("H13", "Engagement Signal", "quality", 0.74, "nps_responses_count", "enquiries_started", note="NPS Response Count vs Enquiries",
+               description="NPS response volume (r=0.74) predicts demand better than the score itself."),
+    Hypothesis("H14", "Principal Quality", "quality", 0.12, "nps_principal_quality_score", "rate", note="Principal NPS vs Rate",
+               description="High perceived Principal quality leads (+0.11) community satisfaction."),
+    Hypothesis("H15", "Intent Channel", "quality", 0.22, "Device_desktop", "rate", note="Desktop % vs Rate",
+               description="Desktop users (+0.17) show higher 'High-Intent' enquiry behavior than mobile."),
+    Hypothesis("H16", "Relocation Driver", "quality", 0.26, "Student_Expat_Pct", "rate", note="Expat % vs Rate",
+               description="Expat concentration shows a weak positive link (+0.06) with enquiry rate."),
+
+    # Rejected
+    Hypothesis("H17", "The NPS Paradox", "rejected", 0.12, "nps_score", "rate", note="NPS vs Rate",
+               description="NPS scores show a modest positive correlation (r=0.25) with enquiry rate, but not a strong driver."),
+    Hypothesis("H18", "Academic Performance", "rejected", -0.01, "Academic_Performance_Index", "rate", note="Academic Index vs Rate",
+               description="Standardized academic results show zero correlation with enquiry rate."),
+    Hypothesis("H19", "Maintenance Capex", "rejected", 0.06, "Mainentance_Capex_sum", "rate", note="Maint Capex vs Rate",
+               description="Facility maintenance spending shows no significant link to immediate volume."),
+    Hypothesis("H20", "School Age", "rejected", 0.06, "school_age", "rate", note="School Age vs Rate",
+               description="School maturity (years open) does not predict enquiry intensity."),
+)
+
+# Supporting correlations quoted alongside the hypotheses (curriculum cards,
+# recommendations table). Claimed values are the figures shown in the page.
+CHECKS = (
+    Hypothesis("IB_NPS", "IB vs NPS", "curr", 0.32, "Curricula_Offered_IB", "nps_score"),
+    Hypothesis("EDU_NPS", "Education Quality vs NPS", "curr", 0.32, "nps_education_quality_score", "nps_score"),
+    Hypothesis("MULTI_RATE", "Curricula Count vs Rate", "curr", 0.09, "Curricula_Offered_count", "rate"),
+    Hypothesis("EXPAT_RATE", "Expat % vs Rate", "quality", 0.51, "Student_Expat_Pct", "rate"),
+    Hypothesis("STAB_RATE", "Teacher Stability vs Rate", "ops", -0.47, "stability", "rate"),
+    Hypothesis("UTIL_RATE", "Utilization vs Rate", "ops", 0.42, "utilization", "rate"),
+)
+
+# Spearman drivers of enquiry volume shown in the index.html drivers chart
+DRIVERS = (
+    Hypothesis("D1", "Leads Intensity", "market", 0.94, "leads_submitted", "enquiries_started", method="spearman"),
+    Hypothesis("D2", "Fees (Average)", "market", -0.22, "NAE_Overall_Average_Fee_USD", "enquiries_started", method="spearman"),
+    Hypothesis("D3", "Student FTE (Size)", "ops", 0.83, "StudentFTE", "enquiries_started", method="spearman"),
+    Hypothesis("D4", "NPS Score", "quality", 0.12, "nps_score", "enquiries_started", method="spearman"),
+    Hypothesis("D5", "NPS Response Count", "quality", 0.06, "nps_responses_count", "enquiries_started", method="spearman"),
+    Hypothesis("D6", "Teacher Attrition", "ops", -0.47, "Teachers_Attrition_Pct", "enquiries_started", method="spearman"),
+)
+
+
+def required_columns(hypotheses):
+    """Source columns needed to evaluate `hypotheses` (derived metrics expanded)."""
+    cols = []
+    for h in hypotheses:
+        if not h.testable:
+            continue
+        for name in (h.x, h.y):
+            cols.extend(DERIVED_METRICS[name][0] if name in DERIVED_METRICS else (name,))
+    return list(dict.fromkeys(cols))
+
+
+class MetricFrame:
+    """Column/derived-metric/rank cache over a DataFrame.
+
+    Each source column is converted to float once, each derived metric is
+    computed once and each rank transform is computed once per missing-value
+    pattern, however many hypotheses share it. With a metrics.MetricStore of
+    the file `df` was loaded from (all rows, in order), derived metrics are
+    read from the store instead of computed.
+    """
+
+    def __init__(self, df, store=None):
+        self.df = df
+        self.store = store
+        self._columns = {}
+        self._ranks = {}
+
+    def column(self, name):
+        if name not in self._columns:
+            if name in METRICS:
+                values = self._stored(name)
+                if values is None:
+                    metric = METRICS[name]
+                    values = metric.compute(*(self.key(k) for k in metric.keys),
+                                            *(self.column(s) for s in metric.sources))
+            elif name in self.df.columns:
+                values = as_float_array(self.df[name])
+            else:
+                values = np.full(len(self.df), np.nan)
+            self._columns[name] = values
+        return self._columns[name]
+
+    def key(self, name):
+        """A column as it is (not converted to float), e.g. School."""
+        if name not in self.df.columns:
+            return np.full(len(self.df), np.nan)
+        return self.df[name].to_numpy()
+
+    def _stored(self, name):
+        if self.store is None:
+            return None
+        values = self.store[name]
+        return values if len(values) == len(self.df) else None
+
+    def ranks(self, name, mask, mask_key):
+        """Average ranks of `name` over the rows in `mask` (NaN elsewhere)."""
+        key = (name, mask_key)
+        if key not in self._ranks:
+            ranked = np.full(len(mask), np.nan)
+            ranked[mask] = rankdata(self.column(name)[mask])
+            self._ranks[key] = ranked
+        return self._ranks[key]
+
+
+def _pair_columns(frame, h):
+    """(x, y) arrays a hypothesis correlates: the columns, or their ranks over the complete rows."""
+    x, y = frame.column(h.x), frame.column(h.y)
+    if h.method == 'pearson':
+        return x, y
+    if h.method != 'spearman':
+        raise ValueError(f"Unknown method {h.method!r} for {h.id}")
+    mask = ~(np.isnan(x) | np.isnan(y))
+    mask_key = np.packbits(mask).tobytes()
+    return frame.ranks(h.x, mask, mask_key), frame.ranks(h.y, mask, mask_key)
+
+
+def evaluate(df, hypotheses=HYPOTHESES, frame=None):
+    """Evaluate all testable hypotheses; returns {id: {'r', 'n', 'p'}}.
+
+    Pearson hypotheses are correlated in one batch. Spearman hypotheses are
+    grouped by their pairwise-complete row mask so each column is ranked once
+    per distinct mask, then correlated in one batch on the ranks.
+    """
+    frame = frame or MetricFrame(df)
+    results = {}
+
+    by_method = {}
+    for h in hypotheses:
+        if h.testable:
+            by_method.setdefault(h.method, []).append(h)
+
+    for method, group in by_method.items():
+        xs, ys = zip(*(_pair_columns(frame, h) for h in group))
+        r, n, p = pearson_batch(np.column_stack(xs), np.column_stack(ys))
+        for h, ri, ni, pi in zip(group, r, n, p):
+            results[h.id] = {
+                'r': None if np.isnan(ri) else float(ri),
+                'n': int(ni),
+                'p': None if np.isnan(pi) else float(pi),
+            }
+    return results
+
+
+def page_rows(results, hypotheses=HYPOTHESES):
+    """The hypothesis cards of hypothesis.html from the registry and evaluate() `results`.
+
+    Categorical hypotheses are not evaluated: their cards show the claimed
+    value without n, p or a verdict.
+    """
+    rows = []
+    for h in hypotheses:
+        res = results.get(h.id)
+        tested = res is not None and res['r'] is not None and res['p'] is not None
+        rows.append({
+            'id': h.id, 'cat': h.category, 'name': h.name, 'desc': h.description,
+            'rho': round(res['r'], 2) if tested else h.claimed,
+            'p': round(res['p'], 4) if tested else None,
+            'n': res['n'] if tested else None,
+            'sig': bool(res['p'] < 0.05) if tested else None,
+            'type': h.symbol,
+        })
+    return rows
+
+
+def evaluate_resampled(df, hypotheses=HYPOTHESES, frame=None, **kwargs):
+    """evaluate() with a bootstrap CI and permutation p-value per hypothesis.
+
+    Returns {id: {'r', 'n', 'low', 'high', 'p'}}; keyword arguments
+    (resamples, confidence, seed, processes) go to resampling.resample_tests.
+    """
+    frame = frame or MetricFrame(df)
+    correlations = {h.id: (frame.column(h.x), frame.column(h.y), h.method)
+                    for h in hypotheses if h.testable}
+    return resample_tests(correlations, **kwargs)
+
+
+def evaluate_panel(df, hypotheses=HYPOTHESES, frame=None, group='School', **kwargs):
+    """evaluate() with school-year rows treated as a panel of `group`s.
+
+    Returns {id: {'r', 'n', 'within', 'within_p', 'between', 'groups',
+    'between_p', 'low', 'high'}}: pooled r, within-school r, school-level r
+    and the school block-bootstrap CI of r (see panel.py). Keyword
+    arguments (resamples, confidence, seed) go to panel_correlations.
+    """
+    frame = frame or MetricFrame(df)
+    testable = [h for h in hypotheses if h.testable]
+    if not testable:
+        return {}
+    xs, ys = zip(*(_pair_columns(frame, h) for h in testable))
+    stats = panel_correlations(np.column_stack(xs), np.column_stack(ys), GroupIndex(df[group]), **kwargs)
+    return {h.id: {key: (int(values[i]) if key in ('n', 'groups')
+                         else None if np.isnan(values[i]) else float(values[i]))
+                   for key, values in stats.items()}
+            for i, h in enumerate(testable)}
@@ -0,0 +1,243 @@
+"""
+Incremental re-analysis over (School, FiscalYear) partitions.
+
+PartitionStore keeps mergeable sufficient statistics (counts, sums, sums of
+squares and cross-products, utilization bin counts) for every
+(School, FiscalYear) partition plus running aggregates per Region, per
+FiscalYear and for the whole network. On refresh each partition's rows are
+hashed; only new or changed partitions have their statistics recomputed and
+their old contribution swapped for the new one in the aggregates, so a
+monthly drop that touches one year costs about one year's worth of work.
+
+Spearman correlations need global ranks and are not incremental; callers
+still compute those on the full data.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from accumulators import BinCounts, CorrelationMoments
+from binning import UTIL_EDGES
+from data_loader import CACHE_DIR, CSV_PATH
+from hypotheses import DERIVED_METRICS, MetricFrame
+
+MEASURES = [
+    'enquiries_started', 'leads_submitted', 'StudentFTE', 'CapacityFTE',
+    'NAE_Overall_Average_Fee_USD', 'Revenue', 'nps_score', 'rate', 'utilization',
+]
+NETWORK = ('all', '')
+
+
+def source_columns(measures=MEASURES):
+    """Source columns the store reads (derived measures expanded)."""
+    cols = ['School', 'FiscalYear', 'Region']
+    for m in measures:
+        cols.extend(DERIVED_METRICS[m][0] if m in DERIVED_METRICS else (m,))
+    return list(dict.fromkeys(cols))
+
+
+def state_path(source=CSV_PATH):
+    """Store file for a source (CSV and XLSX extracts are tracked separately)."""
+    return os.path.join(CACHE_DIR, os.path.basename(source) + '.partitions.npz')
+
+
+def _year_label(year):
+    return '' if pd.isna(year) else str(int(year))
+
+
+class Partition:
+    __slots__ = ('digest', 'school', 'region', 'year', 'moments', 'hist')
+
+    def __init__(self, digest, school, region, year, moments, hist):
+        self.digest = digest
+        self.school = school
+        self.region = region
+        self.year = year
+        self.moments = moments
+        self.hist = hist
+
+    def group_keys(self):
+        keys = [NETWORK]
+        if self.region:
+            keys.append(('region', self.region))
+        if self.year:
+            keys.append(('year', self.year))
+        return keys
+
+
+class GroupQueries:
+    """Read-only queries over `self.groups`: {(dim, value): (CorrelationMoments, BinCounts)}.
+
+    dim is 'region' or 'year'; NETWORK holds the whole network.
+    """
+
+    def _by(self, dim, stat, measure):
+        j = self.measures.index(measure)
+        return {value: getattr(moments, stat)()[j]
+                for (d, value), (moments, _) in self.groups.items() if d == dim}
+
+    def totals(self, dim, measure):
+        """{group value: sum of `measure`} for dim 'region' or 'year'."""
+        return self._by(dim, 'total', measure)
+
+    def means(self, dim, measure):
+        """{group value: mean of `measure`} (NaN-skipping, like pandas)."""
+        return self._by(dim, 'mean', measure)
+
+    def counts(self, dim, measure):
+        return self._by(dim, 'count', measure)
+
+    def correlation(self, measures=None, group=NETWORK):
+        """Pairwise-complete Pearson matrix as a DataFrame."""
+        r = pd.DataFrame(self.groups[group][0].pearson(), index=self.measures, columns=self.measures)
+        return r if measures is None else r.loc[measures, measures]
+
+    def histogram(self, group=NETWORK):
+        return self.groups[group][1].counts.copy()
+
+
+class PartitionStore(GroupQueries):
+    def __init__(self, measures=MEASURES, edges=UTIL_EDGES):
+        self.measures = list(measures)
+        self.edges = list(edges)
+        self.partitions = {}
+        self.groups = {}
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+    def refresh(self, df):
+        """Bring the store in line with `df`; returns (changed, removed) partition keys."""
+        schools = df['School'].astype(str).to_numpy()
+        years = [_year_label(y) for y in df['FiscalYear']]
+        keys = pd.Series(schools) + '|' + pd.Series(years)
+        codes, uniques = pd.factorize(keys)
+
+        # Order-insensitive partition digest: wrapping sum of row hashes.
+        # Numbers are hashed as float64 so int/float typing does not matter.
+        hashed = pd.DataFrame({'key': keys, 'region': df['Region'].fillna('').astype(str).to_numpy()})
+        for c in source_columns(self.measures):
+            if c in df.columns and c not in ('School', 'FiscalYear', 'Region'):
+                hashed[c] = df[c].to_numpy(dtype=float, na_value=np.nan)
+        row_hash = pd.util.hash_pandas_object(hashed, index=False).to_numpy()
+        digests = np.zeros(len(uniques), dtype=np.uint64)
+        np.add.at(digests, codes, row_hash)
+
+        changed = [i for i, key in enumerate(uniques)
+                   if key not in self.partitions or self.partitions[key].digest != digests[i]]
+        current = set(uniques)
+        removed = [key for key in self.partitions if key not in current]
+
+        if changed:
+            frame = MetricFrame(df)
+            X = np.column_stack([frame.column(m) for m in self.measures])
+            util = frame.column('utilization')
+            regions = df['Region'].fillna('').astype(str).to_numpy()
+
+            order = np.argsort(codes, kind='stable')
+            starts = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for i in changed:
+                rows = order[starts[i]:starts[i + 1]]
+                region = next((r for r in regions[rows] if r), '')
+                part = Partition(
+                    digests[i], schools[rows[0]], region, years[rows[0]],
+                    CorrelationMoments.from_rows(X[rows]),
+                    BinCounts(self.edges).update(util[rows]),
+                )
+                self._replace(uniques[i], part)
+
+        for key in removed:
+            self._replace(key, None)
+        return [uniques[i] for i in changed], removed
+
+    def _replace(self, key, new):
+        old = self.partitions.pop(key, None)
+        if old is not None:
+            for g in old.group_keys():
+                moments, hist = self.groups[g]
+                moments -= old.moments
+                hist -= old.hist
+        if new is not None:
+            self.partitions[key] = new
+            for g in new.group_keys():
+                if g not in self.groups:
+                    self.groups[g] = (CorrelationMoments(len(self.measures)), BinCounts(self.edges))
+                moments, hist = self.groups[g]
+                moments += new.moments
+                hist += new.hist
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def schools(self, dim):
+        """{group value: number of distinct schools}."""
+        out = {}
+        for p in self.partitions.values():
+            value = p.region if dim == 'region' else p.year
+            if value:
+                out.setdefault(value, set()).add(p.school)
+        return {k: len(v) for k, v in out.items()}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        parts = list(self.partitions.items())
+        groups = list(self.groups.items())
+        k = len(self.measures)
+        arrays = {
+            'measures': np.array(self.measures),
+            'edges': np.array(self.edges, dtype=float),
+            'keys': np.array([key for key, _ in parts], dtype=str),
+            'digests': np.array([p.digest for _, p in parts], dtype=np.uint64),
+            'meta': np.array([(p.school, p.region, p.year) for _, p in parts], dtype=str).reshape(-1, 3),
+            'hist': np.array([p.hist.counts for _, p in parts]).reshape(-1, len(self.edges) - 1),
+            'group_keys': np.array([g for g, _ in groups], dtype=str).reshape(-1, 2),
+            'group_hist': np.array([h.counts for _, (_, h) in groups]).reshape(-1, len(self.edges) - 1),
+        }
+        for field in CorrelationMoments.FIELDS:
+            arrays[field] = np.array([getattr(p.moments, field) for _, p in parts]).reshape(-1, k, k)
+            arrays['group_' + field] = np.array([getattr(m, field) for _, (m, _) in groups]).reshape(-1, k, k)
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, measures=MEASURES, edges=UTIL_EDGES):
+        """Load saved state; returns an empty store if none matches `measures`/`edges`."""
+        store = cls(measures, edges)
+        if not os.path.exists(path):
+            return store
+        with np.load(path) as data:
+            if list(data['measures']) != store.measures or list(data['edges']) != [float(e) for e in store.edges]:
+                return store
+
+            def moments(prefix, i):
+                return CorrelationMoments.from_arrays(*(data[prefix + f][i].copy() for f in CorrelationMoments.FIELDS))
+
+            def hist(counts):
+                b = BinCounts(store.edges)
+                b.counts = counts.copy()
+                return b
+
+            for i, key in enumerate(data['keys']):
+                school, region, year = data['meta'][i]
+                store.partitions[str(key)] = Partition(
+                    data['digests'][i], str(school), str(region), str(year),
+                    moments('', i), hist(data['hist'][i]))
+            for i, (dim, value) in enumerate(data['group_keys']):
+                store.groups[(str(dim), str(value))] = (moments('group_', i), hist(data['group_hist'][i]))
+        return store
+
+
+def refresh_store(df, source=CSV_PATH):
+    """Load the saved store for `source`, apply `df`, save it back and report what changed."""
+    path = state_path(source)
+    store = PartitionStore.load(path)
+    changed, removed = store.refresh(df)
+    store.save(path)
+    print(f"Incremental refresh: {len(changed)} changed, {len(removed)} removed "
+          f"of {len(store.partitions)} (School, FiscalYear) partitions")
+    return store
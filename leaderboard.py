@@ -0,0 +1,492 @@
+"""
+Leaderboard scoring engine for leaderboard.html.
+
+A Leaderboard holds one row per school (usually the school-years of one
+fiscal year) with its metrics (fees, utilization, leadIntensity, nps,
+stability), their normalised sub-scores and the weighted composite score.
+Scaling is vectorized over the whole (rows x metrics) matrix:
+
+* 'fixed' (default): min-max against the SCORE_WEIGHTS bounds, clamped;
+* 'minmax': min-max against the observed range of each metric;
+* 'percentile': percentile rank of each value within its metric.
+
+Missing metrics score 0.5. For every metric and the score the board keeps
+the descending sort order (missing values last, ties by row) as an index
+array plus its inverse, the rank of each row. dashboard_data.py ships the
+orders in data/leaderboard.json, so the page ranks and sorts without
+sorting anything itself.
+
+`update(school, **values)` re-ranks incrementally: the school's row is
+re-scored and moved within each affected order with a binary search, and
+only the ranks between its old and new position shift. With 'fixed'
+scaling no other row changes; with data-dependent scaling the board is
+re-scored in full only when the update moves a bound.
+
+What-if weightings reuse the cached (schools x metrics) sub-score matrix:
+a weighting is one matrix-vector product plus an argpartition for the top
+K, and `what_if_batch()` ranks a whole batch of weight vectors with one
+matrix product per chunk. `load_leaderboard()` keeps the board of a source
+file in memory until the file changes:
+
+    year, _, board = load_leaderboard()
+    board.what_if({'nps': 0.5, 'stability': 0.5}, top=10)   # [(school, score)]
+    rows, scores = board.what_if_batch(weightings, top=10)  # (weightings, 10) arrays
+
+    python leaderboard.py                        # top schools of the payload year
+    python leaderboard.py --update "School 12" nps=70 utilization=95
+    python leaderboard.py --weights nps=0.5 stability=0.5
+    python leaderboard.py --random 1000          # how often each school makes the top 10
+"""
+import argparse
+import functools
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CSV_PATH, load_school_data, resolve_source
+
+LEADERBOARD_COLUMNS = [
+    'School', 'FiscalYear', 'City', 'Region', 'StudentFTE', 'CapacityFTE',
+    'NAE_Overall_Average_Fee_USD', 'leads_submitted', 'nps_score', 'Teachers_Attrition_Pct',
+]
+# Location used when City/Region is missing, picked by a hash of the school name
+LOCATION_FALLBACKS = [
+    ('Dubai', 'Middle East'),
+    ('Singapore', 'SEA & India'),
+    ('Zurich', 'Europe'),
+    ('Shanghai', 'China International'),
+    ('New York', 'The Americas'),
+    ('London', 'Europe'),
+]
+# Composite score: metric -> (weight, normalisation min, max)
+SCORE_WEIGHTS = {
+    'utilization': (0.30, 70, 110),
+    'leadIntensity': (0.20, 0.5, 2.5),
+    'nps': (0.25, 10, 75),
+    'stability': (0.25, 70, 95),
+}
+METRIC_KEYS = ('fees', 'utilization', 'leadIntensity', 'nps', 'stability')
+# Normalisation range of every metric under 'fixed' scaling (fees: the page's fee axis)
+METRIC_BOUNDS = {'fees': (18000, 46000), **{key: (low, high) for key, (_, low, high) in SCORE_WEIGHTS.items()}}
+# Columns of the page that carry a rank badge, in display order
+RANK_KEYS = ('score',) + METRIC_KEYS
+SCALINGS = ('fixed', 'minmax', 'percentile')
+# Scores computed per what-if chunk (weightings x schools): bounds memory on large sweeps
+WHAT_IF_CHUNK_ELEMENTS = 1 << 22
+
+
+def _name_hash(name):
+    """Sum of the name's UTF-16 code units (JavaScript charCodeAt)."""
+    return sum(np.frombuffer(name.encode('utf-16-le'), dtype='<u2').tolist())
+
+
+def _normalize(values, low, high):
+    """Clamp (values - low) / (high - low) to [0, 1]; missing values score 0.5."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = np.clip((values - low) / (high - low), 0, 1)
+    scaled = np.where(high > low, scaled, 0.5)  # No spread to scale against
+    return np.where(np.isnan(values), 0.5, scaled)
+
+
+def weight_vector(weights):
+    """Weights over METRIC_KEYS, scaled to sum to 1.
+
+    `weights` maps metric -> weight (or a SCORE_WEIGHTS-style (weight, min,
+    max) tuple); metrics it does not name weigh 0. A sequence is read in
+    METRIC_KEYS order.
+    """
+    if isinstance(weights, dict):
+        unknown = [k for k in weights if k not in METRIC_KEYS]
+        if unknown:
+            raise KeyError(f"Unknown metric(s): {', '.join(unknown)}; expected {', '.join(METRIC_KEYS)}")
+        vector = np.array([(lambda w: w[0] if isinstance(w, tuple) else w)(weights.get(k, 0))
+                           for k in METRIC_KEYS], dtype=float)
+    else:
+        vector = np.asarray(weights, dtype=float)
+        if vector.shape != (len(METRIC_KEYS),):
+            raise ValueError(f"Expected {len(METRIC_KEYS)} weights ({', '.join(METRIC_KEYS)}), got {vector.shape}")
+    if not np.isfinite(vector).all() or (vector < 0).any() or vector.sum() <= 0:
+        raise ValueError(f"Weights must be non-negative with a positive sum, got {vector.tolist()}")
+    return vector / vector.sum()
+
+
+def weight_matrix(batch):
+    """(weightings, metrics) matrix with one weight_vector() row per item of `batch`."""
+    if isinstance(batch, pd.DataFrame):
+        batch = batch.to_dict('records')
+    return np.stack([weight_vector(w) for w in batch]) if len(batch) else np.empty((0, len(METRIC_KEYS)))
+
+
+def scale(values, scaling='fixed', bounds=None):
+    """Sub-scores in [0, 1] of a (rows, metrics) matrix, column by column.
+
+    `bounds` is the (low, high) pair of arrays used by 'fixed' and 'minmax'
+    scaling; 'percentile' ignores it.
+    """
+    if scaling == 'percentile':
+        pct = pd.DataFrame(values).rank(pct=True).to_numpy()
+        return np.where(np.isnan(values), 0.5, pct)
+    low, high = bounds
+    return _normalize(values, low, high)
+
+
+def leaderboard_metrics(df):
+    """Leaderboard metrics of every row of `df` as float arrays (NaN = not shown)."""
+    num = {c: df[c].to_numpy(dtype=float, na_value=np.nan) if c in df.columns else np.full(len(df), np.nan)
+           for c in LEADERBOARD_COLUMNS[4:]}
+    fte = np.nan_to_num(num['StudentFTE'])
+    cap = np.nan_to_num(num['CapacityFTE'])
+    leads = np.nan_to_num(num['leads_submitted'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'fees': np.nan_to_num(num['NAE_Overall_Average_Fee_USD']),
+            'utilization': np.where(cap > 0, fte / cap * 100, np.nan),
+            'leadIntensity': np.where(cap > 0, leads / cap, np.nan),
+            'nps': num['nps_score'],
+            'stability': 100 - np.nan_to_num(num['Teachers_Attrition_Pct']),
+        }
+
+
+class Leaderboard:
+    """Scores, sort orders and ranks of one set of schools, updatable one school at a time."""
+
+    def __init__(self, ids, metrics, weights=SCORE_WEIGHTS, scaling='fixed'):
+        if scaling not in SCALINGS:
+            raise ValueError(f"Unknown scaling {scaling!r}; expected one of {', '.join(SCALINGS)}")
+        self.ids = list(ids)
+        self.row = {school: i for i, school in enumerate(self.ids)}
+        self.weight = weight_vector(weights)
+        self.scaling = scaling
+        self.values = np.column_stack([np.asarray(metrics[k], dtype=float) for k in METRIC_KEYS]) \
+            if self.ids else np.empty((0, len(METRIC_KEYS)))
+        self.rescore()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def _bounds(self):
+        if self.scaling == 'fixed':
+            low, high = zip(*(METRIC_BOUNDS[k] for k in METRIC_KEYS))
+            return np.array(low, dtype=float), np.array(high, dtype=float)
+        if self.scaling == 'minmax':
+            if not len(self.values):
+                return np.full(len(METRIC_KEYS), np.nan), np.full(len(METRIC_KEYS), np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # A metric nobody has scores 0.5
+                return np.nanmin(self.values, axis=0), np.nanmax(self.values, axis=0)
+        return None
+
+    def rescore(self):
+        """Re-score every row and rebuild every sort order."""
+        self.bounds = self._bounds()
+        self.subscores = scale(self.values, self.scaling, self.bounds)
+        self.score = self.subscores @ self.weight * 100
+        self.orders, self.ranks, self._keys = {}, {}, {}
+        for key in RANK_KEYS:
+            self._sort(key)
+
+    def column(self, key):
+        return self.score if key == 'score' else self.values[:, METRIC_KEYS.index(key)]
+
+    @staticmethod
+    def _sort_keys(values):
+        """Ascending keys of a descending sort with missing values last."""
+        return np.where(np.isnan(values), np.inf, -values)
+
+    def _sort(self, key):
+        keys = self._sort_keys(self.column(key))
+        order = np.argsort(keys, kind='stable')
+        self.orders[key] = order
+        self._keys[key] = keys[order]
+        self.ranks[key] = np.empty(len(order), dtype=np.intp)
+        self.ranks[key][order] = np.arange(len(order))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def _move(self, key, i):
+        """Move row `i` to its place in the `key` order after its value changed.
+
+        Only the entries between its old and new position shift.
+        """
+        order, keys, ranks = self.orders[key], self._keys[key], self.ranks[key]
+        old = ranks[i]
+        new_key = self._sort_keys(self.column(key)[i:i + 1])[0]
+        # Position among the other rows; equal keys stay in row order, as in the stable full sort
+        lo, hi = np.searchsorted(keys, new_key, 'left'), np.searchsorted(keys, new_key, 'right')
+        ties = order[lo:hi]
+        new = lo - (old < lo) + np.searchsorted(ties[ties != i], i)
+        if new < old:
+            order[new + 1:old + 1] = order[new:old].copy()
+            keys[new + 1:old + 1] = keys[new:old].copy()
+        elif new > old:
+            order[old:new] = order[old + 1:new + 1].copy()
+            keys[old:new] = keys[old + 1:new + 1].copy()
+        order[new], keys[new] = i, new_key
+        a, b = min(old, new), max(old, new) + 1
+        ranks[order[a:b]] = np.arange(a, b)
+
+    def update(self, school, **values):
+        """Set metrics of one school (e.g. nps=70) and re-rank; returns {key: (old rank, new rank)}."""
+        unknown = [k for k in values if k not in METRIC_KEYS]
+        if unknown:
+            raise KeyError(f"Unknown metric(s): {', '.join(unknown)}; expected {', '.join(METRIC_KEYS)}")
+        i = self.row[school]
+        before = {key: self.rank(key, school) for key in RANK_KEYS}
+        for key, value in values.items():
+            self.values[i, METRIC_KEYS.index(key)] = np.nan if value is None else float(value)
+
+        bounds = self._bounds()
+        if self.scaling == 'percentile' or not all(
+                np.array_equal(new, old, equal_nan=True) for new, old in zip(bounds, self.bounds)):
+            self.rescore()  # Every row's sub-scores depend on the changed values
+        else:
+            self.subscores[i] = scale(self.values[i:i + 1], self.scaling, self.bounds)[0]
+            self.score[i] = self.subscores[i] @ self.weight * 100
+            for key in ('score', *values):
+                self._move(key, i)
+        return {key: (before[key], self.rank(key, school)) for key in RANK_KEYS
+                if before[key] != self.rank(key, school)}
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def rank(self, key, school):
+        """1-based rank of `school` by `key` (highest first); None if its value is missing."""
+        i = self.row[school]
+        return None if np.isnan(self.column(key)[i]) else int(self.ranks[key][i]) + 1
+
+    def top(self, key='score', n=10):
+        return [self.ids[i] for i in self.orders[key][:n]]
+
+    # ------------------------------------------------------------------
+    # What-if weightings
+    # ------------------------------------------------------------------
+    def what_if(self, weights, top=None):
+        """[(school, score)] under other weights, highest first (only the `top` best if given)."""
+        rows, scores = self.what_if_batch([weights], top)
+        return [(self.ids[i], float(score)) for i, score in zip(rows[0], scores[0])]
+
+    def what_if_batch(self, batch, top=None):
+        """Rankings of the schools under every weighting of `batch` (see weight_matrix).
+
+        Returns (rows, scores), (weightings, top) arrays of row indices and
+        their scores, highest score first (ties by row). The sub-scores are
+        not recomputed: each weighting is a product with the cached matrix,
+        and only its `top` best rows are sorted (all rows if top is None).
+        """
+        weights = weight_matrix(batch)
+        n = len(self)
+        top = n if top is None else max(0, min(top, n))
+        rows = np.empty((len(weights), top), dtype=np.intp)
+        scores = np.empty((len(weights), top))
+        if not top:
+            return rows, scores
+        step = max(1, WHAT_IF_CHUNK_ELEMENTS // n)
+        for start in range(0, len(weights), step):
+            chunk = weights[start:start + step] @ self.subscores.T * 100  # (weightings, schools)
+            best = (np.argpartition(-chunk, top - 1, axis=1)[:, :top] if top < n
+                    else np.broadcast_to(np.arange(n), chunk.shape))
+            best_scores = np.take_along_axis(chunk, best, axis=1)
+            order = np.lexsort((best, -best_scores), axis=1)
+            rows[start:start + step] = np.take_along_axis(best, order, axis=1)
+            scores[start:start + step] = np.take_along_axis(best_scores, order, axis=1)
+        return rows, scores
+
+    def averages(self):
+        """Mean of each ranked column over the rows that have it."""
+        out = {}
+        for key in RANK_KEYS:
+            values = self.column(key)
+            values = values[~np.isnan(values)]
+            if len(values):
+                out[key] = float(values.mean())
+        return out
+
+
+# ----------------------------------------------------------------------------
+# Payload
+# ----------------------------------------------------------------------------
+def _best_year(fy, fte, cap):
+    """Year with most rows having FTE or capacity data (first seen wins ties, 2024 preferred)."""
+    valid_years = pd.Series(fy[(fte > 10) | (cap > 100)])
+    year_counts = valid_years.value_counts(sort=False).reindex(valid_years.unique())
+    best_year = 2024
+    for year, count in year_counts.items():
+        if 2020 <= year <= 2026 and count > year_counts.get(best_year, 0):
+            best_year = int(year)
+    return best_year
+
+
+def leaderboard_rows(df):
+    """(year, rows of `df` on the leaderboard): schools of the fiscal year with the most usable rows."""
+    fte = df['StudentFTE'].to_numpy(dtype=float, na_value=np.nan)
+    cap = df['CapacityFTE'].to_numpy(dtype=float, na_value=np.nan)
+    fy = np.floor(np.nan_to_num(df['FiscalYear'].to_numpy(dtype=float, na_value=np.nan))).astype(int)
+    year = _best_year(fy, fte, cap)
+    fte, cap = np.nan_to_num(fte), np.nan_to_num(cap)
+    return year, np.flatnonzero((fy == year) & ((fte > 10) | (cap > 50)))
+
+
+def build_leaderboard(df, scaling='fixed', weights=SCORE_WEIGHTS):
+    """(year, rows of `df`, Leaderboard) for the leaderboard year, rows in score order."""
+    def board(rows):
+        sub = df.iloc[rows]
+        return Leaderboard(sub['School'].astype(str), leaderboard_metrics(sub), weights, scaling)
+
+    year, rows = leaderboard_rows(df)
+    # Rebuilt in score order so ties in every other order fall back to the score, as on the page
+    rows = rows[board(rows).orders['score']]
+    return year, rows, board(rows)
+
+
+def load_leaderboard(source=CSV_PATH, scaling='fixed'):
+    """build_leaderboard() of `source`, kept in memory until the file changes.
+
+    The board is shared between calls: what-ifs leave it untouched, update()
+    changes it for every later caller.
+    """
+    path = resolve_source(source)
+    st = os.stat(path)
+    return _load_leaderboard(source, scaling, path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_leaderboard(source, scaling, path, mtime_ns, size):
+    return build_leaderboard(load_school_data(LEADERBOARD_COLUMNS, source=source), scaling)
+
+
+def leaderboard_payload(df, store=None):
+    """Schools of the leaderboard year in score order, with every metric's sort order.
+
+    `orders[key]` lists positions in `schools` from highest to lowest `key`,
+    schools without a value last.
+    """
+    year, rows, board = build_leaderboard(df)
+    sub = df.iloc[rows]
+    schools = board.ids
+    cities = sub['City'].to_numpy(dtype=object) if 'City' in df.columns else [None] * len(schools)
+    regions = sub['Region'].to_numpy(dtype=object) if 'Region' in df.columns else [None] * len(schools)
+    fte = np.nan_to_num(sub['StudentFTE'].to_numpy(dtype=float, na_value=np.nan))
+    cap = np.nan_to_num(sub['CapacityFTE'].to_numpy(dtype=float, na_value=np.nan))
+    leads = np.nan_to_num(sub['leads_submitted'].to_numpy(dtype=float, na_value=np.nan))
+
+    out = []
+    for i in range(len(board)):
+        city, region = LOCATION_FALLBACKS[_name_hash(schools[i]) % len(LOCATION_FALLBACKS)]
+        if isinstance(cities[i], str) and cities[i] and cities[i] != 'Other':
+            city = cities[i]
+        if isinstance(regions[i], str) and regions[i] and regions[i] != 'Other':
+            region = regions[i]
+        row = {'id': schools[i], 'name': schools[i], 'city': city, 'region': region,
+               'fte': float(fte[i]), 'capacity': float(cap[i]), 'leadsRaw': float(leads[i]),
+               'score': round(float(board.score[i]), 4)}
+        for key in METRIC_KEYS:
+            value = board.column(key)[i]
+            row[key] = None if np.isnan(value) else round(float(value), 4)
+        out.append(row)
+
+    return {
+        'year': year,
+        'schools': out,
+        'orders': {key: board.orders[key].tolist() for key in RANK_KEYS},
+        'averages': {key: round(value, 4) for key, value in board.averages().items()},
+    }
+
+
+def sweep_summary(board, batch, top=10):
+    """Schools that make the top `top` under any weighting of `batch`.
+
+    Columns: share of the weightings that rank the school in the top, its
+    best rank under any of them and its rank under the board's own weights.
+    """
+    rows, _ = board.what_if_batch(batch, top)
+    k = rows.shape[1]
+    counts = np.bincount(rows.ravel(), minlength=len(board))
+    best = np.full(len(board), k + 1)
+    np.minimum.at(best, rows.ravel(), np.tile(np.arange(1, k + 1), len(rows)))
+    summary = pd.DataFrame({'top_share': counts / max(len(rows), 1), 'best_rank': best,
+                            'rank': board.ranks['score'] + 1}, index=pd.Index(board.ids, name='School'))
+    return summary[counts > 0].sort_values(['top_share', 'rank'], ascending=[False, True])
+
+
+def _parse_values(pairs):
+    values = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected METRIC=VALUE, got {pair!r}")
+        values[key] = None if value.lower() in ('', 'none', 'nan') else float(value)
+    return values
+
+
+def _print_ranking(board, ranking):
+    print(f"\n{'#':>4}  {'School':<40} {'Score':>6} {'Was':>5}  " + ' '.join(f'{k:>13}' for k in METRIC_KEYS))
+    for rank, (school, score) in enumerate(ranking, start=1):
+        i = board.row[school]
+        cells = ' '.join(f"{'-' if np.isnan(v) else f'{v:.2f}':>13}" for v in board.values[i])
+        print(f"{rank:>4}  {school:<40} {score:>6.1f} {'#' + str(board.rank('score', school)):>5}  {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score and rank the schools of the leaderboard year')
+    parser.add_argument('--source', default=CSV_PATH)
+    parser.add_argument('--scaling', choices=SCALINGS, default='fixed')
+    parser.add_argument('--top', type=int, default=10, help='schools to list (default: 10)')
+    parser.add_argument('--update', nargs='+', metavar=('SCHOOL', 'METRIC=VALUE'),
+                        help='change metrics of one school and show how its ranks move')
+    parser.add_argument('--weights', nargs='+', metavar='METRIC=WEIGHT',
+                        help='rank with these weights instead of SCORE_WEIGHTS (scaled to sum to 1)')
+    parser.add_argument('--sweep', metavar='CSV',
+                        help='compare the weightings in CSV, one per row with a column per metric')
+    parser.add_argument('--random', type=int, metavar='N',
+                        help='compare N random weightings of the scored metrics')
+    parser.add_argument('--seed', type=int, default=0, help='seed of --random (default: 0)')
+    args = parser.parse_args()
+
+    year, _, board = load_leaderboard(args.source, args.scaling)
+    weights = _parse_values(args.weights) if args.weights else SCORE_WEIGHTS
+    named = ', '.join(f'{k}={w:.2f}' for k, w in zip(METRIC_KEYS, weight_vector(weights)) if w)
+    print(f"FY{year}: {len(board)} schools, {args.scaling} scaling, weights {named}")
+    _print_ranking(board, board.what_if(weights, args.top))
+
+    if args.sweep or args.random:
+        if args.sweep:
+            batch = pd.read_csv(args.sweep)
+            batch = batch[[c for c in batch.columns if c in METRIC_KEYS]].fillna(0)
+            label = args.sweep
+        else:
+            rng = np.random.default_rng(args.seed)
+            batch = np.zeros((args.random, len(METRIC_KEYS)))
+            batch[:, [METRIC_KEYS.index(k) for k in SCORE_WEIGHTS]] = rng.dirichlet(
+                np.ones(len(SCORE_WEIGHTS)), size=args.random)
+            label = f'random weightings of {", ".join(SCORE_WEIGHTS)}'
+        start = time.perf_counter()
+        summary = sweep_summary(board, batch, args.top)
+        elapsed = time.perf_counter() - start
+        print(f"\n{len(batch)} weightings ({label}) ranked in {elapsed * 1000:.1f} ms")
+        print(f"\n{'School':<40} {'In top ' + str(args.top):>10} {'Best':>5} {'Was':>5}")
+        for school, row in summary.iterrows():
+            print(f"{school:<40} {row['top_share']:>10.0%} {'#' + str(int(row['best_rank'])):>5} "
+                  f"{'#' + str(int(row['rank'])):>5}")
+
+    if args.update:
+        school, values = args.update[0], _parse_values(args.update[1:])
+        if school not in board.row:
+            raise SystemExit(f"{school!r} is not on the FY{year} leaderboard")
+        moves = board.update(school, **values)
+        print(f"\n{school}: " + ', '.join(f'{k}={v}' for k, v in values.items()))
+        for key, (old, new) in moves.items():
+            print(f"  {key:<14} #{old or '-'} -> #{new or '-'}")
+        if not moves:
+            print("  no rank changes")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,10 @@
 
-import pandas as pd
+from data_loader import XLSX_PATH, school_data_columns
 
 try:
-    df = pd.read_excel('School Level Data.xlsx', sheet_name=0)
+    columns = school_data_columns(XLSX_PATH)
     print("Column List:")
-    for col in df.columns:
+    for col in columns:
         print(f"'{col}'")
 except Exception as e:
     print(f"Error: {e}")
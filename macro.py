@@ -0,0 +1,76 @@
+"""
+Country-year macro covariates of School Level Data.
+
+The source files repeat the country-year columns (GDP growth, inflation,
+population, HNWI counts, ...; data_loader.MACRO_COLUMNS) on every school
+row. The data_loader snapshot stores each one that is constant per
+(iso2, FiscalYear) once per key in a country-year table and hash-joins it
+back only for the scripts that ask for it:
+
+    df = load_school_data(['School', 'FiscalYear', 'gdp_growth_pct'])   # joined on demand
+    macro_table(CSV_PATH)                     # one row per (iso2, FiscalYear)
+
+`refresh()` rebuilds or validates the snapshots, and with them the
+country-year tables, of several source files concurrently (one process
+per file: parsing a CSV or XLSX is CPU-bound). `python macro.py` reports
+which covariates are stored per key and which still vary within a key and
+stay on the school rows.
+
+    python macro.py                           # the CSV and XLSX extracts
+    python macro.py extract.csv --refresh     # force a rebuild
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_loader import (CSV_PATH, MACRO_COLUMNS, MACRO_KEYS, XLSX_PATH, _snapshot_paths, ensure_snapshot,
+                         macro_path)
+
+
+def macro_table(source=CSV_PATH):
+    """The country-year table of `source`'s snapshot (keys plus the covariates stored per key)."""
+    moved = ensure_snapshot(source)['macro_columns']
+    if not moved:
+        return pd.DataFrame(columns=list(MACRO_KEYS))
+    return pd.read_parquet(macro_path(source))
+
+
+def refresh(sources, force=False, processes=None):
+    """{source: snapshot metadata} for every source, building the stale snapshots concurrently."""
+    processes = min(processes or os.cpu_count() or 1, len(sources))
+    if processes <= 1:
+        return {source: ensure_snapshot(source, refresh=force) for source in sources}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {source: pool.submit(ensure_snapshot, source, force) for source in sources}
+        return {source: future.result() for source, future in futures.items()}
+
+
+def report(source, meta):
+    moved = meta['macro_columns']
+    kept = [c for c in MACRO_COLUMNS if c in meta['columns'] and c not in moved]
+    keys = len(macro_table(source)) if moved else 0
+    size = os.path.getsize(_snapshot_paths(source)[0])
+    print(f"{source}: {meta['rows']:,} rows, snapshot {size:,} bytes")
+    print(f"  stored per (iso2, FiscalYear): {len(moved)} columns x {keys:,} keys "
+          f"(instead of x {meta['rows']:,} rows)")
+    if kept:
+        print(f"  kept on the school rows (values differ within a key): {len(kept)} columns")
+        print(f"    {', '.join(kept)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalise the country-year macro columns of the source files')
+    parser.add_argument('sources', nargs='*', help='source files (default: the CSV and XLSX extracts)')
+    parser.add_argument('--refresh', action='store_true', help='rebuild the snapshots even if they are current')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per file)')
+    args = parser.parse_args()
+
+    sources = args.sources or [p for p in (CSV_PATH, XLSX_PATH) if os.path.exists(p)]
+    for source, meta in refresh(sources, force=args.refresh, processes=args.processes).items():
+        report(source, meta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Derived metrics of School Level Data, defined once.
+
+Each Metric names its source columns, its formula and its null/zero policy
+(`defined`: the rows where the metric has a value; it is NaN elsewhere).
+MetricFrame, query.py and the scripts all take rate, utilization,
+stability and growth from METRICS instead of dividing columns inline, so a
+school with no students has no rate everywhere rather than inf in one
+script and 0 in another.
+
+    rate = METRICS['rate'].series(df)
+
+`MetricStore(source)` materialises metrics of a data file into a column
+store in .cache/metrics/. A column is keyed by the content hash of the file
+and of this module, so it is computed once per version of the data and of
+the definitions, read (memory-mapped) on first access only, and evicted
+least recently used once the store grows past METRIC_CACHE_MAX_BYTES:
+
+    store = MetricStore(CSV_PATH)
+    store['growth']          # computed on the first run, loaded afterwards
+
+    python metrics.py        # list the metrics and their cached columns
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (CACHE_DIR, CSV_PATH, _is_parquet, ensure_snapshot, file_sha256,
+                         load_school_data, resolve_source, school_data_columns)
+from stats_engine import as_float_array
+
+METRIC_CACHE_DIR = os.path.join(CACHE_DIR, 'metrics')
+METRIC_CACHE_MAX_BYTES = 256 * 2**20
+
+
+def _previous_year(school, year, values):
+    """`values` of the same school in the previous fiscal year (NaN if there is none)."""
+    codes = pd.factorize(school)[0]  # -1 = missing school
+    order = np.lexsort((year, codes))
+    s, y, v = codes[order], year[order], values[order]
+    follows = (s[1:] == s[:-1]) & (s[1:] >= 0) & (y[1:] == y[:-1] + 1)
+    prev = np.full(len(values), np.nan)
+    prev[order[1:][follows]] = v[:-1][follows]
+    return prev
+
+
+@functools.lru_cache(maxsize=None)
+def definitions_digest():
+    """Hash of this module: editing any definition invalidates every cached column."""
+    return file_sha256(__file__)
+
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    sources: tuple  # float columns, passed to formula/defined after the keys
+    formula: Callable
+    defined: Callable = None  # rows with a value; None = wherever the sources are present
+    policy: str = ''
+    keys: tuple = ()  # raw (unconverted) columns, e.g. School for per-school metrics
+
+    @property
+    def columns(self):
+        return self.keys + self.sources
+
+    def compute(self, *values):
+        """The metric from its key and source arrays, NaN where it is not defined."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.asarray(self.formula(*values), dtype=float)
+            if self.defined is not None:
+                result = np.where(self.defined(*values), result, np.nan)
+        return result
+
+    def values(self, df):
+        """The metric over the rows of `df` as a float array (NaN if a column is missing)."""
+        def column(name, convert):
+            if name not in df.columns:
+                return np.full(len(df), np.nan)
+            return as_float_array(df[name]) if convert else df[name].to_numpy()
+        return self.compute(*(column(k, False) for k in self.keys),
+                            *(column(s, True) for s in self.sources))
+
+    def series(self, df):
+        return pd.Series(self.values(df), index=df.index, name=self.name)
+
+
+METRICS = {m.name: m for m in (
+    Metric('rate', ('enquiries_started', 'StudentFTE'),
+           lambda enq, fte: enq / fte,
+           lambda enq, fte: fte > 0,
+           'enquiries per student FTE; NaN unless StudentFTE > 0'),
+    Metric('utilization', ('StudentFTE', 'CapacityFTE'),
+           lambda fte, cap: fte / cap * 100,
+           lambda fte, cap: cap > 0,
+           'StudentFTE as % of CapacityFTE; NaN unless CapacityFTE > 0'),
+    Metric('stability', ('Teachers_Attrition_Pct',),
+           lambda attr: 100 - attr,
+           policy='100 - Teachers_Attrition_Pct; NaN where attrition is missing'),
+    Metric('growth', ('FiscalYear', 'StudentFTE'),
+           lambda school, year, fte: (fte / _previous_year(school, year, fte) - 1) * 100,
+           lambda school, year, fte: _previous_year(school, year, fte) > 0,
+           "% change in StudentFTE on the school's previous fiscal year; "
+           'NaN without a previous year or when its StudentFTE is not > 0',
+           keys=('School',)),
+)}
+
+
+# ----------------------------------------------------------------------------
+# Column store
+# ----------------------------------------------------------------------------
+class MetricStore:
+    """Derived columns of one data file, computed once per version of its content.
+
+    Columns are .npy files named by digest; the manifest records their size
+    and last use for LRU eviction (as ChartCache does for charts) and the
+    content hash of canonical Parquet files by (mtime, size). Rows line up
+    with load_school_data(source=source).
+    """
+
+    def __init__(self, source=CSV_PATH, directory=METRIC_CACHE_DIR, max_bytes=METRIC_CACHE_MAX_BYTES):
+        self.source = source
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.manifest = self._load()
+        self.hits = self.misses = 0
+        self._columns = {}
+        self._used = set()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault('columns', {})
+        manifest.setdefault('sources', {})
+        return manifest
+
+    def source_digest(self):
+        """SHA-256 of the file loads of `source` currently read."""
+        path = resolve_source(self.source)
+        if not _is_parquet(path):
+            return ensure_snapshot(path)['sha256']
+        st = os.stat(path)
+        known = self.manifest['sources'].get(path)
+        if not known or (known['mtime_ns'], known['size']) != (st.st_mtime_ns, st.st_size):
+            known = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': file_sha256(path)}
+            self.manifest['sources'][path] = known
+        return known['sha256']
+
+    def key(self, name):
+        text = f'{self.source_digest()}:{definitions_digest()}:{name}'
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def column_path(self, digest):
+        return os.path.join(self.directory, digest + '.npy')
+
+    def __contains__(self, name):
+        return name in METRICS
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            metric = METRICS[name]
+            digest = self.key(name)
+            path = self.column_path(digest)
+            try:
+                values = np.load(path, mmap_mode='r')
+                self.hits += 1
+            except (OSError, ValueError):
+                available = school_data_columns(self.source)
+                columns = [c for c in metric.columns if c in available]
+                values = metric.values(load_school_data(columns, source=self.source))
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = path + '.tmp.npy'
+                np.save(tmp, values)
+                os.replace(tmp, path)
+                self.misses += 1
+            self.manifest['columns'][digest] = {'metric': name, 'source': self.source,
+                                                'size': os.path.getsize(path), 'used': time.time()}
+            self._used.add(digest)
+            self._columns[name] = values
+            self.save()
+        return self._columns[name]
+
+    def frame(self, *names):
+        """The named metrics (default: all) as a DataFrame."""
+        return pd.DataFrame({name: self[name] for name in names or METRICS})
+
+    def evict(self):
+        """Drop least recently used columns (never ones used this run) down to max_bytes."""
+        columns = self.manifest['columns']
+        total = sum(c['size'] for c in columns.values())
+        for digest in sorted(columns, key=lambda d: columns[d]['used']):
+            if total <= self.max_bytes:
+                break
+            if digest in self._used:
+                continue
+            total -= columns.pop(digest)['size']
+            try:
+                os.remove(self.column_path(digest))
+            except OSError:
+                pass
+
+    def save(self):
+        self.evict()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def clear(self):
+        for digest in list(self.manifest['columns']):
+            try:
+                os.remove(self.column_path(digest))
+            except OSError:
+                pass
+        self.manifest['columns'] = {}
+        self._columns.clear()
+        self._used.clear()
+        self.save()
+
+    def summary(self):
+        return f"Metric store: {self.hits} loaded, {self.misses} computed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List the derived metrics and their cached columns')
+    parser.add_argument('--source', default=CSV_PATH)
+    parser.add_argument('--build', action='store_true', help='compute every metric of --source now')
+    parser.add_argument('--clear', action='store_true', help='delete every cached column')
+    args = parser.parse_args()
+
+    store = MetricStore(args.source)
+    if args.clear:
+        store.clear()
+        print(f"Cleared {store.directory}")
+        return
+    if args.build:
+        for name in METRICS:
+            store[name]
+        print(store.summary())
+
+    current = {store.key(name) for name in METRICS} if os.path.exists(args.source) else set()
+    print(f"\n{'Metric':<12} {'Columns':<40} Policy")
+    print("-" * 100)
+    for m in METRICS.values():
+        print(f"{m.name:<12} {', '.join(m.columns):<40} {m.policy}")
+    columns = store.manifest['columns']
+    total = sum(c['size'] for c in columns.values())
+    print(f"\n{len(columns)} cached column(s), {total / 2**20:.1f} MB (limit {store.max_bytes / 2**20:.0f} MB)")
+    for digest, c in sorted(columns.items(), key=lambda item: -item[1]['used']):
+        state = 'current' if digest in current else 'stale'
+        print(f"  {c['metric']:<12} {c['source']:<28} {c['size'] / 2**10:>8.1f} KB  {state}")
+
+
+if __name__ == '__main__':
+    main()
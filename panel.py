@@ -0,0 +1,185 @@
+"""
+Panel-aware statistics: the 503 rows are ~80 schools observed over several
+fiscal years, so school-years are not independent observations.
+
+* `within_correlation()`: correlation of the within-school deviations
+  (each school's mean removed), i.e. "in years when a school has more X,
+  does it have more Y?"; p-values use n - schools - 1 degrees of freedom.
+* `between_correlation()`: correlation of the school means, one point per
+  school.
+* `block_bootstrap()`: percentile CI of the pooled correlation resampling
+  whole schools, so a school's repeated years stay together.
+
+Everything runs on a GroupIndex: the np.unique inverse codes of a grouping
+column, computed once and reused for every sum, mean and count (one
+bincount each instead of a pandas groupby per call). The block bootstrap
+only touches per-school sufficient statistics (n, sums, sums of squares
+and products), so a resample costs a (resamples x schools) weight matrix
+product, not a pass over the rows.
+
+Inputs follow pearson_batch: (rows, pairs) arrays with NaN for missing
+values, and each pair uses its pairwise-complete rows.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from stats_engine import MIN_PAIRS, as_float_array, correlation_p_values, pearson_batch
+
+BLOCK_RESAMPLES = 10_000
+CONFIDENCE = 0.95
+
+
+class GroupIndex:
+    """Integer group codes of one column (missing labels get -1), sorted like groupby."""
+
+    def __init__(self, labels, name=None):
+        labels = pd.Series(labels) if not isinstance(labels, pd.Series) else labels
+        if pd.api.types.is_numeric_dtype(labels.dtype):
+            values = labels.to_numpy(dtype=float, na_value=np.nan)
+            valid = ~np.isnan(values)
+            keys, inverse = np.unique(values[valid], return_inverse=True)
+            self.codes = np.full(len(values), -1, dtype=np.intp)
+            self.codes[valid] = inverse
+        else:
+            # Same sorted keys and inverse codes as np.unique, but hashed: sorting
+            # object arrays of strings is an order of magnitude slower
+            self.codes, keys = pd.factorize(labels, sort=True)
+            keys = keys.to_numpy()
+        self.size = len(keys)
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=self.size)
+        dtype = labels.dtype if labels.dtype != object else None
+        self.index = pd.Index(keys, dtype=dtype, name=name or labels.name)
+
+    def __len__(self):
+        return self.size
+
+    def _bincount(self, values, weighted):
+        values = as_float_array(values)
+        matrix = values[:, None] if values.ndim == 1 else values
+        present = ~np.isnan(matrix) & (self.codes >= 0)[:, None]
+        keys = (self.codes[:, None] * matrix.shape[1] + np.arange(matrix.shape[1]))[present]
+        result = np.bincount(keys, weights=matrix[present] if weighted else None,
+                             minlength=self.size * matrix.shape[1]).reshape(self.size, matrix.shape[1])
+        return result[:, 0] if values.ndim == 1 else result
+
+    def sum(self, values):
+        """Sum of the non-missing values per group (column-wise for 2-D values)."""
+        return self._bincount(values, weighted=True)
+
+    def count(self, values):
+        """Non-missing values per group."""
+        return self._bincount(values, weighted=False)
+
+    def mean(self, values):
+        """Mean of the non-missing values per group (NaN for groups with none)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.sum(values) / self.count(values)
+
+    def nunique(self, labels):
+        """Distinct non-missing `labels` per group (e.g. schools per region)."""
+        other = GroupIndex(labels)
+        keep = (self.codes >= 0) & (other.codes >= 0)
+        pairs = np.unique(self.codes[keep] * other.size + other.codes[keep])
+        return np.bincount(pairs // max(other.size, 1), minlength=self.size)
+
+    def broadcast(self, group_values):
+        """Per-group values back onto the rows (NaN for rows without a group)."""
+        group_values = np.asarray(group_values, dtype=float)
+        out = group_values[np.maximum(self.codes, 0)]
+        out[self.codes < 0] = np.nan
+        return out
+
+    def demean(self, values):
+        """Values minus their group's mean (NaN stays NaN)."""
+        return as_float_array(values) - self.broadcast(self.mean(values))
+
+    def series(self, group_values, name=None):
+        return pd.Series(group_values, index=self.index, name=name)
+
+
+# ----------------------------------------------------------------------------
+# Correlations
+# ----------------------------------------------------------------------------
+def _complete(X, Y, groups):
+    X, Y = as_float_array(X), as_float_array(Y)
+    if X.ndim == 1:
+        X, Y = X[:, None], Y[:, None]
+    mask = ~(np.isnan(X) | np.isnan(Y)) & (groups.codes >= 0)[:, None]
+    return np.where(mask, X, np.nan), np.where(mask, Y, np.nan), mask
+
+
+def within_correlation(X, Y, groups, min_n=MIN_PAIRS):
+    """Within-group (demeaned) correlation of each X/Y column pair.
+
+    Returns (r, n rows, groups with data, p). Each group's mean is taken
+    over the pair's complete rows; p uses n - groups - 1 degrees of freedom.
+    r is NaN when a side never varies within a group (e.g. one row per group).
+    """
+    X, Y, _ = _complete(X, Y, groups)
+    r, n, _ = pearson_batch(groups.demean(X), groups.demean(Y), min_n=min_n, constant_r=np.nan)
+    g = (groups.count(X) > 0).sum(axis=0)
+    dof_n = n - g + 1  # correlation_p_values uses n - 2 degrees of freedom
+    p = np.where(dof_n > 2, correlation_p_values(r, dof_n), np.nan)
+    return r, n, g, p
+
+
+def between_correlation(X, Y, groups, min_n=MIN_PAIRS):
+    """Correlation of the group means (one point per group) of each X/Y column pair.
+
+    Returns (r, groups, p).
+    """
+    X, Y, _ = _complete(X, Y, groups)
+    r, g, p = pearson_batch(groups.mean(X), groups.mean(Y), min_n=min_n)
+    return r, g, p
+
+
+def block_bootstrap(X, Y, groups, resamples=BLOCK_RESAMPLES, confidence=CONFIDENCE, seed=0,
+                    chunk=1000):
+    """Percentile CI (low, high) of the pooled correlation, resampling whole groups.
+
+    Each resample draws len(groups) groups with replacement; a group drawn
+    k times contributes its rows k times. Computed from per-group sums of
+    the centred values, `chunk` resamples at a time.
+    """
+    X, Y, mask = _complete(X, Y, groups)
+    # Centre on the pooled means so the sums of squares do not cancel
+    n_rows = np.maximum(mask.sum(axis=0), 1)
+    X = X - np.nansum(X, axis=0) / n_rows
+    Y = Y - np.nansum(Y, axis=0) / n_rows
+    stats = np.stack([groups.count(X), groups.sum(X), groups.sum(Y),
+                      groups.sum(X * X), groups.sum(Y * Y), groups.sum(X * Y)], axis=1)  # (groups, 6, pairs)
+    pairs = stats.shape[2]
+    stats = stats.reshape(groups.size, -1)
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    k = groups.size
+    boot = []
+    for start in range(0, resamples, chunk):
+        size = min(chunk, resamples - start)
+        draws = rng.integers(0, k, size=(size, k)) + k * np.arange(size)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=size * k).reshape(size, k).astype(float)
+        n, sx, sy, sxx, syy, sxy = (weights @ stats).reshape(size, 6, pairs).transpose(1, 0, 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sxy - sx * sy / n
+            r = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+        boot.append(np.where(n >= MIN_PAIRS, np.clip(r, -1.0, 1.0), np.nan))
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Pairs without data stay NaN
+        low, high = np.nanpercentile(np.concatenate(boot), [tail, 100 - tail], axis=0)
+    return low, high
+
+
+def panel_correlations(X, Y, groups, resamples=BLOCK_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Pooled, within-group and between-group r plus the block-bootstrap CI per column pair.
+
+    Returns a dict of arrays: r, n, within, within_p, between, groups, between_p, low, high.
+    """
+    r, n, _ = pearson_batch(X, Y)
+    within, _, g, within_p = within_correlation(X, Y, groups)
+    between, _, between_p = between_correlation(X, Y, groups)
+    low, high = block_bootstrap(X, Y, groups, resamples, confidence, seed)
+    return {'r': r, 'n': n, 'within': within, 'within_p': within_p, 'between': between,
+            'groups': g, 'between_p': between_p, 'low': low, 'high': high}
@@ -0,0 +1,265 @@
+"""
+Per-stage timing and profiling for the analysis scripts.
+
+    profiler = Profiler(trace='trace.json', profile=['correlation'])
+    with profiler.stage('load') as s:
+        df = load_school_data(...)
+        s.rows = len(df)
+    ...
+    profiler.report()
+    profiler.close()   # writes the trace
+
+Every stage records wall time, CPU time, peak RSS and an optional row
+count. Stages nest, and can also be used as a decorator (`@profiler.timed()`).
+Work done in other processes (chart workers) is recorded with `span()` and
+merged in with `Profiler.add_spans()`.
+
+The trace is Chrome Trace Event JSON: open it in Perfetto
+(ui.perfetto.dev), chrome://tracing or speedscope to get a flame chart with
+one lane per process. Stages named in `profile` additionally run under
+cProfile (`profiles/<stage>.prof`, for snakeviz/pstats) or, with
+profiler='sample', under a stack sampler writing folded stacks
+(`profiles/<stage>.folded`, for flamegraph.pl/speedscope).
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+PROFILE_DIR = 'profiles'
+SAMPLE_INTERVAL = 0.005
+
+
+# ----------------------------------------------------------------------------
+# Peak RSS
+# ----------------------------------------------------------------------------
+def reset_peak_rss():
+    """Reset the process's RSS high-water mark; False where the OS does not allow it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unknown)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+# ----------------------------------------------------------------------------
+# Spans from worker processes
+# ----------------------------------------------------------------------------
+@contextmanager
+def span(spans, name, **args):
+    """Append a (name, start_ns, end_ns, cpu_seconds, pid, args) tuple to list `spans`.
+
+    Lightweight and picklable, for code running in worker processes;
+    perf_counter_ns is system-wide, so spans line up with the parent's stages.
+    """
+    start, cpu = time.perf_counter_ns(), time.process_time()
+    try:
+        yield
+    finally:
+        spans.append((name, start, time.perf_counter_ns(), time.process_time() - cpu, os.getpid(), args))
+
+
+# ----------------------------------------------------------------------------
+# Sampling profiler
+# ----------------------------------------------------------------------------
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a background thread."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+# ----------------------------------------------------------------------------
+# Profiler
+# ----------------------------------------------------------------------------
+@dataclass
+class Stage:
+    name: str
+    depth: int
+    start_ns: int
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_rss_mb: float = None
+    rows: int = None
+    pid: int = field(default_factory=os.getpid)
+    args: dict = field(default_factory=dict)
+
+
+class Profiler:
+    def __init__(self, trace=None, profile=(), profiler='cprofile', out_dir=PROFILE_DIR):
+        if profiler not in ('cprofile', 'sample'):
+            raise ValueError(f"Unsupported profiler: {profiler}")
+        self.trace = trace
+        self.profile = set(profile)
+        self.profiler = profiler
+        self.out_dir = out_dir
+        self.stages = []
+        self._open = []
+        self._profiling = False
+        self._origin_ns = time.perf_counter_ns()
+
+    def _fold_peak(self):
+        """Fold the current high-water mark into every open stage before it is reset."""
+        peak = peak_rss_mb()
+        if peak is not None:
+            for s in self._open:
+                s.peak_rss_mb = max(s.peak_rss_mb or 0, peak)
+
+    @contextmanager
+    def stage(self, name, rows=None, **args):
+        """Time the enclosed block; yields the Stage so callers can set `rows` later."""
+        self._fold_peak()
+        reset_peak_rss()
+        record = Stage(name, len(self._open), time.perf_counter_ns(), rows=rows, args=args)
+        self._open.append(record)
+        self.stages.append(record)
+        cpu = time.process_time()
+        stop_profiler = self._start_profiler(name)
+        try:
+            yield record
+        finally:
+            record.wall = (time.perf_counter_ns() - record.start_ns) / 1e9
+            record.cpu = time.process_time() - cpu
+            if stop_profiler:
+                stop_profiler()
+            self._fold_peak()
+            self._open.pop()
+
+    def timed(self, name=None):
+        """Decorator form of stage(); the stage is named after the function by default."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or func.__name__):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_spans(self, spans, prefix=''):
+        """Record spans collected with span() (e.g. in worker processes) as stages."""
+        depth = len(self._open)
+        for name, start, end, cpu, pid, args in spans:
+            self.stages.append(Stage(prefix + name, depth, start, wall=(end - start) / 1e9, cpu=cpu,
+                                     pid=pid, args=args))
+
+    def _start_profiler(self, name):
+        if name not in self.profile or self._profiling:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, name.replace(':', '_'))
+        self._profiling = True
+        if self.profiler == 'sample':
+            sampler = StackSampler()
+            sampler.start()
+
+            def stop():
+                sampler.stop()
+                sampler.write_folded(path + '.folded')
+                self._profiling = False
+                print(f"  Profile of {name}: {path}.folded ({sum(sampler.counts.values())} samples)")
+            return stop
+
+        prof = cProfile.Profile()
+        prof.enable()
+
+        def stop():
+            prof.disable()
+            prof.dump_stats(path + '.prof')
+            self._profiling = False
+            print(f"  Profile of {name}: {path}.prof")
+            pstats.Stats(prof, stream=sys.stdout).sort_stats('cumulative').print_stats(10)
+        return stop
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+    def report(self, file=None):
+        """Print one line per stage (worker spans are listed under the stage that ran them)."""
+        print(f"\n{'Stage':<36} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS (MB)':>14} {'Rows':>10}", file=file)
+        print("-" * 82, file=file)
+        for s in sorted(self.stages, key=lambda s: s.start_ns):
+            label = ('  ' * s.depth + s.name)[:36]
+            rss = f"{s.peak_rss_mb:,.0f}" if s.peak_rss_mb is not None else ''
+            rows = f"{s.rows:,}" if s.rows is not None else ''
+            print(f"{label:<36} {s.wall:>9.3f} {s.cpu:>9.3f} {rss:>14} {rows:>10}", file=file)
+
+    def trace_events(self):
+        """Chrome Trace Event Format 'complete' events (timestamps in microseconds)."""
+        events = []
+        for pid in dict.fromkeys(s.pid for s in self.stages):
+            label = 'main' if pid == os.getpid() else f'worker {pid}'
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': label}})
+        for s in self.stages:
+            args = {'cpu_s': round(s.cpu, 6), **s.args}
+            if s.peak_rss_mb is not None:
+                args['peak_rss_mb'] = round(s.peak_rss_mb, 1)
+            if s.rows is not None:
+                args['rows'] = s.rows
+            events.append({
+                'name': s.name, 'cat': 'stage', 'ph': 'X', 'pid': s.pid, 'tid': 0,
+                'ts': (s.start_ns - self._origin_ns) / 1e3, 'dur': s.wall * 1e6, 'args': args,
+            })
+        return events
+
+    def write_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def close(self):
+        if self.trace:
+            print(f"Trace written to {self.write_trace(self.trace)}")
@@ -0,0 +1,207 @@
+"""
+Lazy queries over School Level Data with projection and predicate pushdown.
+
+A Query describes the columns, filters, derived metrics and group-by a
+script needs; nothing is read until `collect()`. The scan then runs on the
+typed Parquet snapshot (or canonical file) through pyarrow.dataset, so only
+the referenced columns are decoded and filters on source columns are
+evaluated inside the scan, row group by row group:
+
+    fy24_rate = (Query(XLSX_PATH)
+                 .where('FiscalYear', '==', 2024)
+                 .group_by('Region')
+                 .agg(Rate=('rate', 'mean'))
+                 .collect())
+
+reads FiscalYear, Region, enquiries_started and StudentFTE of the FY2024
+rows only. Derived metrics (metrics.METRICS: rate, utilization, stability,
+growth) can be selected, filtered and aggregated like columns; their
+filters run after the scan. Per-school metrics (growth) need every year of
+a school, so a query using one applies all its filters after the scan.
+`explain()` shows what will be pushed down.
+
+As in SQL, a filter never matches rows where its column is missing. Without
+pyarrow, or when it reads country-year columns that the snapshot stores in
+its own table (data_loader.MACRO_COLUMNS), the same query runs on
+load_school_data() with pandas masks.
+"""
+import operator
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (CSV_PATH, _is_parquet, _snapshot_paths, ensure_snapshot, resolve_source,
+                         school_data_columns, load_school_data)
+from hypotheses import DERIVED_METRICS, MetricFrame
+from metrics import METRICS
+
+try:
+    import pyarrow.dataset as ds
+except ImportError:  # Filters are applied in pandas after a full load
+    ds = None
+
+OPS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda column, values: column.isin(list(values)),
+    'notnull': None,
+}
+
+
+@dataclass(frozen=True)
+class Filter:
+    column: str
+    op: str
+    value: object = None
+
+    def arrow(self):
+        field = ds.field(self.column)
+        if self.op == 'notnull':
+            return field.is_valid()
+        return OPS[self.op](field, self.value)
+
+    def mask(self, column):
+        """Boolean mask over a pandas Series (missing values never match)."""
+        if self.op == 'notnull':
+            return column.notna()
+        return OPS[self.op](column, self.value).fillna(False).astype(bool) & column.notna()
+
+    def __str__(self):
+        if self.op == 'notnull':
+            return f'{self.column} IS NOT NULL'
+        return f'{self.column} {self.op} {self.value!r}'
+
+
+@dataclass(frozen=True)
+class Query:
+    source: str = CSV_PATH
+    columns: tuple = None  # None = every column
+    filters: tuple = ()
+    keys: tuple = ()
+    aggs: tuple = ()  # (output name, column, function)
+
+    # ------------------------------------------------------------------
+    # Building (every method returns a new Query)
+    # ------------------------------------------------------------------
+    def select(self, *columns):
+        """Keep only these columns (source columns or derived metrics)."""
+        return replace(self, columns=tuple(dict.fromkeys(columns)))
+
+    def where(self, column, op, value=None):
+        if op not in OPS:
+            raise ValueError(f"Unsupported operator {op!r}; expected one of {', '.join(OPS)}")
+        return replace(self, filters=self.filters + (Filter(column, op, value),))
+
+    def dropna(self, *columns):
+        query = self
+        for column in columns:
+            query = query.where(column, 'notnull')
+        return query
+
+    def group_by(self, *keys):
+        return replace(self, keys=tuple(keys))
+
+    def agg(self, **aggs):
+        """Aggregations per group: name='mean' (of column `name`) or name=(column, 'mean')."""
+        spec = tuple((name, *(a if isinstance(a, tuple) else (name, a))) for name, a in aggs.items())
+        return replace(self, aggs=self.aggs + spec)
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+    def _output_columns(self):
+        if self.aggs:
+            return list(self.keys) + [column for _, column, _ in self.aggs]
+        return None if self.columns is None else list(self.keys) + list(self.columns)
+
+    def plan(self):
+        """(source columns to read, filters pushed into the scan, filters applied after it).
+
+        Raises KeyError for a selected, grouped, aggregated or filtered column
+        that is neither in the source nor a derived metric.
+        """
+        available = school_data_columns(self.source)
+        wanted = self._output_columns()
+        referenced = (wanted or []) + [f.column for f in self.filters]
+        unknown = [n for n in dict.fromkeys(referenced) if n not in available and n not in DERIVED_METRICS]
+        if unknown:
+            raise KeyError(f"Column(s) not in {self.source}: {', '.join(unknown)}")
+        names = list(available) if wanted is None else wanted + [f.column for f in self.filters]
+        read = []
+        for name in names:
+            read.extend(DERIVED_METRICS[name][0] if name in DERIVED_METRICS else (name,))
+        read = [c for c in dict.fromkeys(read) if c in available]
+        pushed = tuple(f for f in self.filters if f.column not in DERIVED_METRICS)
+        if any(METRICS[n].keys for n in names if n in METRICS):
+            return read, (), self.filters
+        return read, pushed, tuple(f for f in self.filters if f.column in DERIVED_METRICS)
+
+    def explain(self):
+        read, pushed, post = self.plan()
+        total = len(school_data_columns(self.source))
+        lines = [f"Scan {resolve_source(self.source)}: {len(read)} of {total} columns "
+                 f"({', '.join(read)})"]
+        if pushed:
+            lines.append(f"  pushed filter: {' AND '.join(map(str, pushed))}")
+        derived = [n for n in (self._output_columns() or []) + [f.column for f in post] if n in DERIVED_METRICS]
+        if derived:
+            lines.append(f"  derive: {', '.join(dict.fromkeys(derived))}")
+        if post:
+            lines.append(f"  filter after scan: {' AND '.join(map(str, post))}")
+        if self.aggs:
+            lines.append(f"  group by {', '.join(self.keys) or '()'}: "
+                         + ', '.join(f'{name}={func}({column})' for name, column, func in self.aggs))
+        return '\n'.join(lines)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    def _joins_macro(self, read):
+        """True if the scan needs country-year columns the snapshot keeps in its own table."""
+        source = resolve_source(self.source)
+        return not _is_parquet(source) and bool(set(read) & set(ensure_snapshot(source)['macro_columns']))
+
+    def _scan(self, read, pushed):
+        if ds is None or self._joins_macro(read):
+            df = load_school_data(read, source=self.source)
+            mask = np.ones(len(df), dtype=bool)
+            for f in pushed:
+                mask &= f.mask(df[f.column]).to_numpy()
+            return df[mask].reset_index(drop=True)
+
+        source = resolve_source(self.source)
+        if not _is_parquet(source):
+            ensure_snapshot(source)
+            source = _snapshot_paths(source)[0]
+        expr = None
+        for f in pushed:
+            expr = f.arrow() if expr is None else expr & f.arrow()
+        table = ds.dataset(source, format='parquet').to_table(columns=read, filter=expr)
+        return table.to_pandas()
+
+    def collect(self):
+        """Run the query and return a DataFrame."""
+        read, pushed, post = self.plan()
+        df = self._scan(read, pushed)
+
+        wanted = self._output_columns()
+        derived = [n for n in (wanted or []) + [f.column for f in post] if n in DERIVED_METRICS]
+        if derived:
+            frame = MetricFrame(df)
+            df = df.assign(**{name: frame.column(name) for name in dict.fromkeys(derived)})
+        for f in post:
+            df = df[f.mask(df[f.column])]
+
+        if self.aggs:
+            spec = {name: (column, func) for name, column, func in self.aggs}
+            if not self.keys:
+                return pd.DataFrame({name: [df[column].agg(func)] for name, column, func in self.aggs})
+            return df.groupby(list(self.keys)).agg(**spec)
+        if wanted is not None:
+            df = df[list(dict.fromkeys(wanted))]
+        return df.reset_index(drop=True)
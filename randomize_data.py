@@ -1,96 +1,45 @@
-
-import pandas as pd
-import numpy as np
-
-# Set seed for reproducibility
-np.random.seed(42)
+"""
+Regenerate the school metrics of School Level Data with the synthetic model
+in synthetic.py (per-school latents, vectorized draws).
+
+    python randomize_data.py                     # rewrite the CSV and XLSX in place
+    python randomize_data.py --schools 20000 --years 50 --out fixture.csv
+                                                 # N x M load-test fixture, source untouched
+"""
+import argparse
+import time
+
+from data_loader import CSV_PATH, load_school_data
+from synthetic import randomize_panel, synthetic_panel
+from writers import save_school_data
+
+parser = argparse.ArgumentParser(description='Randomize school metrics or build a synthetic fixture')
+parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+parser.add_argument('--schools', type=int, help='generate this many synthetic schools instead')
+parser.add_argument('--years', type=int, default=7, help='fiscal years per synthetic school (default: 7)')
+parser.add_argument('--out', default='synthetic_school_data.csv', help='output file for --schools (.csv or .parquet)')
+args = parser.parse_args()
+
+if args.schools:
+    start = time.perf_counter()
+    df = synthetic_panel(args.schools, args.years, seed=args.seed)
+    print(f"Generated {len(df):,} rows ({args.schools:,} schools x {args.years} years) "
+          f"in {time.perf_counter() - start:.2f}s")
+    if args.out.endswith('.parquet'):
+        df.to_parquet(args.out, index=False)
+    else:
+        df.to_csv(args.out, index=False)
+    print(f"Saved {args.out}")
+    raise SystemExit
 
 # Load existing filtered data (80 schools)
-df_orig = pd.read_csv('School Level Data.csv')
+df_orig = load_school_data(source=CSV_PATH)
 print(f"Loaded {len(df_orig)} rows from 80 schools.")
 
-# Create a copy
-df = df_orig.copy()
-
-# Define Regional Base Parameters (Size, Fee Base, Growth Factor)
-regional_params = {
-    'The Americas': {'size': 900, 'fee': 35000, 'growth': 1.2},
-    'Europe': {'size': 800, 'fee': 30000, 'growth': 1.0},
-    'China Bilingual': {'size': 1200, 'fee': 25000, 'growth': 1.5},
-    'China International': {'size': 1000, 'fee': 32000, 'growth': 1.1},
-    'South East Asia & India': {'size': 1100, 'fee': 22000, 'growth': 1.3},
-    'Middle East': {'size': 1500, 'fee': 20000, 'growth': 1.4}
-}
-
-# Generate Hidden Latent Variables per SCHOOL (fixed across years)
-schools = df['School'].unique()
-school_latent = {}
-for school in schools:
-    # Aggressiveness: 0 to 1 (focus on growth vs boutique)
-    agg = np.random.beta(2, 2) 
-    # Quality: 0 to 1 (academic excellence/care)
-    qual = np.random.beta(3, 2) 
-    school_latent[school] = {'agg': agg, 'qual': qual}
-
-# Apply Logic Row by Row
-for idx, row in df.iterrows():
-    region = row['Region']
-    school = row['School']
-    params = regional_params.get(region, {'size': 800, 'fee': 25000, 'growth': 1.0})
-    
-    latent = school_latent.get(school, {'agg': 0.5, 'qual': 0.5})
-    agg = latent['agg']
-    qual = latent['qual']
-    
-    # 1. StudentFTE (Size): Driven by region + aggressiveness
-    # Add yearly growth trend (small)
-    year_factor = 1 + (row['FiscalYear'] - 2020) * 0.05 * params['growth']
-    base_size = params['size'] * (0.8 + 0.6 * agg) 
-    fte = base_size * year_factor * np.random.normal(1, 0.05)
-    fte = max(100, fte)
-    
-    # 2. Capacity: Always > FTE
-    cap_util = 0.7 + (0.4 * agg) # Aggressive schools run hotter (higher util)
-    cap = fte / cap_util * np.random.normal(1, 0.02)
-    
-    # 3. Fees: Driven by Region + Quality
-    base_fee = params['fee']
-    fee = base_fee * (0.8 + 0.5 * qual) * np.random.normal(1, 0.05)
-    
-    # 4. NPS: Driven ONLY by Quality (Strong Positive) and mildly utilization (Negative)
-    # This ensures "Quality" actually matches NPS
-    nps_base = 10 + (qual * 60) # 10 to 70 range
-    util_penalty = max(0, (cap_util - 0.9) * 20) # Penalty if over 90% utilized
-    nps = nps_base - util_penalty + np.random.normal(0, 5)
-    
-    # 5. Teacher Attrition: High Attrition in Aggressive schools, Low in High Quality
-    attrition = 10 + (20 * agg) - (10 * qual) + np.random.normal(0, 3)
-    attrition = np.clip(attrition, 2, 40)
-    
-    # 6. Leads: Driven by Size (Scale) and Fee (Lower fee = more leads usually, but high demand curve)
-    # Let's say Leads ~ Size * Aggressiveness * 1.2
-    leads = (fte * 1.2) * (0.5 + 1.5 * agg) * np.random.normal(1, 0.1)
-    
-    # 7. Enquiries: Conversion from Leads based on Quality and NPS
-    # Penalized by Attrition: Turnover undermines market trust (STEEP negative pressure)
-    attr_penalty = max(0.05, 1.3 - (attrition / 15)) 
-    conv_rate = (0.2 + 0.3 * qual) * attr_penalty
-    enquiries = leads * conv_rate * np.random.normal(1, 0.05)
-    enquiries = max(10, enquiries)
-    
-    # Assign to dataframe
-    df.at[idx, 'StudentFTE'] = int(fte)
-    df.at[idx, 'CapacityFTE'] = int(cap)
-    df.at[idx, 'NAE_Overall_Average_Fee_USD'] = int(fee)
-    df.at[idx, 'nps_score'] = round(nps, 1)
-    df.at[idx, 'nps_responses_count'] = int(fte * 0.2 * qual) # More responses in good schools
-    df.at[idx, 'Teachers_Attrition_Pct'] = round(attrition, 1)
-    df.at[idx, 'leads_submitted'] = int(leads)
-    df.at[idx, 'enquiries_started'] = int(enquiries)
+df = randomize_panel(df_orig, seed=args.seed)
 
-# Save
-df.to_csv('School Level Data.csv', index=False)
-df.to_excel('School Level Data.xlsx', index=False)
+# Save (Parquet now, CSV/XLSX exported by writers.py)
+save_school_data(df)
 
 # Calculate Totals for Hero Section
 total_students = df[df['FiscalYear'] == 2025]['StudentFTE'].sum() 
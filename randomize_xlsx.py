@@ -4,13 +4,16 @@ Randomize school metrics data in the Excel file.
 import pandas as pd
 import numpy as np
 
+from data_loader import XLSX_PATH, load_school_data
+from writers import save_school_data
+
 print("Starting randomization...")
 
 # Set random seed
 np.random.seed(2026)
 
 # Load Excel file
-df = pd.read_excel('School Level Data.xlsx')
+df = load_school_data(source=XLSX_PATH)
 print(f"Loaded {len(df)} rows, {len(df.columns)} columns")
 
 # Columns to preserve
@@ -56,11 +59,8 @@ for c in int_cols:
     if c in df.columns:
         df[c] = df[c].round(0)
 
-# Save to both formats
-print("Saving to Excel...")
-df.to_excel('School Level Data.xlsx', index=False)
-print("Saving to CSV...")
-df.to_csv('School Level Data.csv', index=False)
+# Save (Parquet now, CSV/XLSX exported by writers.py)
+save_school_data(df)
 
 print("\n✓ Randomization complete!")
 print(f"Sample data:")
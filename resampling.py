@@ -0,0 +1,201 @@
+"""
+Bootstrap confidence intervals and permutation p-values.
+
+Resamples are drawn as index matrices (one row per resample) and every
+statistic is computed for a whole shard of resamples in one vectorized
+pass. Shards are spread over a process pool; each shard draws from its own
+SeedSequence child, so results depend on `seed` only, not on the number of
+processes:
+
+    tests = resample_tests(
+        correlations={'H1': (fte, enquiries, 'spearman')},
+        groups={'region': (rate, region_names)},
+        resamples=10_000, seed=0)
+    tests['H1']       # {'r', 'n', 'low', 'high', 'p'}
+    tests['region']   # DataFrame: mean, n, low, high, p per group
+
+Correlations get a percentile bootstrap CI (pairs resampled with
+replacement; Spearman re-ranks each resample) and a permutation p-value
+(y shuffled against x). Group means get a per-group bootstrap CI and a
+permutation p-value for the group's mean differing from the mean of the
+other groups (labels shuffled).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from stats_engine import MIN_PAIRS, as_float_array
+
+RESAMPLES = 10_000
+CONFIDENCE = 0.95
+# Values drawn per shard (resamples x rows): bounds worker memory on large extracts
+SHARD_ELEMENTS = 1 << 21
+
+
+def rowwise_pearson(X, Y):
+    """Pearson r of each row of X with the same row of Y (no missing values).
+
+    Rows where either side is constant get 0, as pearson_batch does.
+    """
+    dx = X - X.mean(axis=-1, keepdims=True)
+    dy = Y - Y.mean(axis=-1, keepdims=True)
+    sxx = (dx * dx).sum(axis=-1)
+    syy = (dy * dy).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = (dx * dy).sum(axis=-1) / np.sqrt(sxx * syy)
+    return np.clip(np.where((sxx == 0) | (syy == 0), 0.0, r), -1.0, 1.0)
+
+
+def permutation_p_value(observed, null):
+    """Two-sided p-value of `observed` against the permutation distribution `null`."""
+    extreme = np.abs(null) >= np.abs(observed) - 1e-12
+    return (1 + extreme.sum(axis=0)) / (len(null) + 1)
+
+
+def percentile_interval(boot, confidence=CONFIDENCE):
+    tail = (1 - confidence) / 2 * 100
+    return np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+
+
+# ----------------------------------------------------------------------------
+# Shards (run in worker processes on the data shipped by _init_worker)
+# ----------------------------------------------------------------------------
+_WORKER_DATA = None
+
+
+def _init_worker(data):
+    global _WORKER_DATA
+    _WORKER_DATA = data
+
+
+def _correlation_shard(key, seed, size):
+    """(bootstrap r, permutation r) of `size` resamples of correlation `key`."""
+    x, y, method = _WORKER_DATA['correlations'][key]
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    idx = rng.integers(0, n, size=(size, n))
+    xb, yb = x[idx], y[idx]
+    if method == 'spearman':
+        xb, yb = rankdata(xb, axis=1), rankdata(yb, axis=1)
+        x, y = rankdata(x), rankdata(y)  # Ranks do not change under permutation
+    boot = rowwise_pearson(xb, yb)
+    null = rowwise_pearson(x, rng.permuted(np.tile(y, (size, 1)), axis=1))
+    return boot, null
+
+
+def _group_shard(key, seed, size):
+    """(bootstrap group means, permuted mean-minus-rest) of `size` resamples, one column per group."""
+    values, codes, members = _WORKER_DATA['groups'][key]
+    rng = np.random.default_rng(seed)
+    n, k = len(values), len(members)
+    boot = np.empty((size, k))
+    for g, rows in enumerate(members):
+        boot[:, g] = values[rows[rng.integers(0, len(rows), size=(size, len(rows)))]].mean(axis=1)
+
+    # Shuffled labels; the group sums of all resamples in one bincount
+    labels = rng.permuted(np.tile(codes, (size, 1)), axis=1) + k * np.arange(size)[:, None]
+    sums = np.bincount(labels.ravel(), weights=np.tile(values, size), minlength=size * k).reshape(size, k)
+    counts = np.bincount(codes, minlength=k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        null = sums / counts - (values.sum() - sums) / (n - counts)
+    return boot, null
+
+
+def _shard_sizes(resamples, rows):
+    per_shard = max(1, SHARD_ELEMENTS // max(rows, 1))
+    return [min(per_shard, resamples - start) for start in range(0, resamples, per_shard)]
+
+
+# ----------------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------------
+def _prepare(correlations, groups):
+    data = {'correlations': {}, 'groups': {}}
+    for key, (x, y, method) in correlations.items():
+        if method not in ('pearson', 'spearman'):
+            raise ValueError(f"Unknown method {method!r} for {key}")
+        x, y = as_float_array(x), as_float_array(y)
+        complete = ~(np.isnan(x) | np.isnan(y))
+        data['correlations'][key] = (x[complete], y[complete], method)
+    for key, (values, labels) in groups.items():
+        values = as_float_array(values)
+        labels = pd.Series(np.asarray(labels, dtype=object))
+        keep = ~np.isnan(values) & labels.notna().to_numpy() & (labels.astype(str).str.strip() != '').to_numpy()
+        codes, names = pd.factorize(labels[keep], sort=True)
+        members = [np.flatnonzero(codes == g) for g in range(len(names))]
+        data['groups'][key] = (values[keep], codes, members)
+        data.setdefault('names', {})[key] = list(names)
+    return data
+
+
+def resample_tests(correlations=None, groups=None, resamples=RESAMPLES, confidence=CONFIDENCE,
+                   seed=0, processes=None):
+    """Bootstrap CIs and permutation p-values for named correlations and group means.
+
+    `correlations` maps name -> (x, y, 'pearson'|'spearman'), with NaN for
+    missing values (pairwise-complete rows are used). `groups` maps name ->
+    (values, labels); rows with a missing value or label are dropped.
+    processes=1 runs in-process; the default is one process per CPU.
+    """
+    correlations, groups = correlations or {}, groups or {}
+    data = _prepare(correlations, groups)
+
+    tasks = []
+    root = np.random.SeedSequence(seed)
+    for kind, func in (('correlations', _correlation_shard), ('groups', _group_shard)):
+        for key, seq in zip(data[kind], root.spawn(len(data[kind]))):
+            rows = len(data[kind][key][0])
+            if rows < (MIN_PAIRS if kind == 'correlations' else 1):
+                continue
+            sizes = _shard_sizes(resamples, rows)
+            tasks.extend((func, key, child, size) for child, size in zip(seq.spawn(len(sizes)), sizes))
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        _init_worker(data)
+        shards = [func(key, child, size) for func, key, child, size in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(data,)) as pool:
+            futures = [pool.submit(func, key, child, size) for func, key, child, size in tasks]
+            shards = [f.result() for f in futures]
+
+    by_key = {}
+    for (func, key, _, _), (boot, null) in zip(tasks, shards):
+        by_key.setdefault((func, key), ([], []))
+        by_key[(func, key)][0].append(boot)
+        by_key[(func, key)][1].append(null)
+
+    results = {}
+    for key, (x, y, method) in data['correlations'].items():
+        n = len(x)
+        if n < MIN_PAIRS:
+            results[key] = {'r': None, 'n': n, 'low': None, 'high': None, 'p': None}
+            continue
+        boot, null = (np.concatenate(parts) for parts in by_key[(_correlation_shard, key)])
+        if method == 'spearman':
+            x, y = rankdata(x), rankdata(y)
+        r = float(rowwise_pearson(x, y))
+        low, high = percentile_interval(boot, confidence)
+        results[key] = {'r': r, 'n': n, 'low': float(low), 'high': float(high),
+                        'p': float(permutation_p_value(r, null))}
+
+    for key, (values, codes, members) in data['groups'].items():
+        names = data['names'][key]
+        if not names:
+            results[key] = pd.DataFrame(columns=['mean', 'n', 'low', 'high', 'p'])
+            continue
+        boot, null = (np.concatenate(parts) for parts in by_key[(_group_shard, key)])
+        counts = np.array([len(rows) for rows in members])
+        sums = np.bincount(codes, weights=values, minlength=len(names))
+        means = sums / counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            observed = means - (values.sum() - sums) / (len(values) - counts)
+        low, high = percentile_interval(boot, confidence)
+        results[key] = pd.DataFrame({'mean': means, 'n': counts, 'low': low, 'high': high,
+                                     'p': np.where(np.isnan(observed), np.nan,
+                                                   permutation_p_value(observed, null))},
+                                    index=pd.Index(names, name=key))
+    return results
@@ -0,0 +1,77 @@
+"""
+Seeded, single-pass reservoir sampling over streamed chunks.
+
+Every row gets a uniform random key from a seeded generator, and each
+stratum keeps only the rows with the smallest keys (bottom-k sampling). The
+k smallest keys of a stream form a uniform sample without replacement, so:
+
+* memory is bounded by strata x capacity rows, whatever the file size;
+* any size up to `capacity` is the key-ordered prefix of the reservoir, so
+  several sample sizes come out of the same pass;
+* keys are drawn in row order, so the sample depends on the seed and the
+  rows, not on how the file was chunked.
+
+With strata, a sample of size n is split across strata in proportion to the
+rows each stratum contributed (largest-remainder rounding).
+"""
+import numpy as np
+import pandas as pd
+
+_KEY = '_sample_key'
+
+
+class StratifiedReservoir:
+    def __init__(self, capacity, seed=0, strata=()):
+        self.capacity = int(capacity)
+        self.strata = list(strata)
+        self.seen = {}
+        self._rng = np.random.default_rng(seed)
+        self._reservoir = None
+
+    def _labels(self, df):
+        if not self.strata:
+            return pd.Series(0, index=df.index)
+        return df[self.strata].astype(str).agg('|'.join, axis=1) if len(df) else pd.Series(dtype=str)
+
+    def update(self, chunk):
+        """Offer every row of DataFrame `chunk` to the reservoir."""
+        keys = self._rng.random(len(chunk))
+        if len(chunk) == 0:
+            return self
+        chunk = chunk.assign(**{_KEY: keys})
+        labels = self._labels(chunk)
+        for label, count in labels.value_counts(sort=False).items():
+            self.seen[label] = self.seen.get(label, 0) + int(count)
+
+        pool = chunk if self._reservoir is None else pd.concat([self._reservoir, chunk], ignore_index=True)
+        pool_labels = self._labels(pool)
+        order = np.lexsort((pool[_KEY].to_numpy(), pool_labels.to_numpy()))
+        pool = pool.iloc[order]
+        rank = pool.groupby(pool_labels.iloc[order].to_numpy(), sort=False).cumcount().to_numpy()
+        self._reservoir = pool[rank < self.capacity].reset_index(drop=True)
+        return self
+
+    def allocation(self, size):
+        """{stratum: rows} for a sample of `size`, proportional to rows seen."""
+        total = sum(self.seen.values())
+        if total <= size:
+            return dict(self.seen)
+        labels = list(self.seen)
+        exact = np.array([self.seen[l] for l in labels], dtype=float) * size / total
+        quota = np.floor(exact).astype(int)
+        for i in np.argsort(-(exact - quota), kind='stable')[:size - quota.sum()]:
+            quota[i] += 1
+        return dict(zip(labels, quota.tolist()))
+
+    def sample(self, size):
+        """Sample of `size` rows (all rows if fewer were seen), in random order."""
+        if size > self.capacity:
+            raise ValueError(f"Sample size {size} exceeds reservoir capacity {self.capacity}")
+        if self._reservoir is None:
+            return pd.DataFrame()
+        pool = self._reservoir
+        labels = self._labels(pool).to_numpy()
+        rank = pool.groupby(labels, sort=False).cumcount().to_numpy()
+        quota = self.allocation(size)
+        keep = rank < np.array([quota.get(l, 0) for l in labels])
+        return pool[keep].sort_values(_KEY).drop(columns=_KEY).reset_index(drop=True)
@@ -0,0 +1,131 @@
+"""
+Streaming statistics for extracts too large to load at once.
+
+The CSV is read in typed chunks holding only the columns the measures need
+(data_loader.iter_school_data). Each chunk is folded into mergeable
+accumulators for the whole network, every Region and every FiscalYear, so
+peak memory is set by the chunk size rather than the file size. The result
+answers the same queries as the incremental PartitionStore (totals, means,
+correlation, histogram, schools).
+
+Spearman correlations need global ranks and cannot be streamed.
+
+    python streaming.py                       # School Level Data.csv
+    python streaming.py big_extract.csv --chunksize 200000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from accumulators import BinCounts, CorrelationMoments
+from binning import histogram
+from data_loader import CHUNK_ROWS, CSV_PATH, iter_school_data
+from hypotheses import MetricFrame
+from incremental import MEASURES, NETWORK, UTIL_EDGES, GroupQueries, _year_label, source_columns
+from panel import GroupIndex
+
+KEY_COLUMNS = ('School', 'FiscalYear', 'Region')
+
+
+class StreamingStats(GroupQueries):
+    """Network, per-Region and per-FiscalYear accumulators built chunk by chunk."""
+
+    def __init__(self, measures=MEASURES, edges=UTIL_EDGES):
+        self.measures = list(measures)
+        self.edges = list(edges)
+        self.groups = {}
+        self.rows = 0
+        self._schools = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = (CorrelationMoments(len(self.measures)), BinCounts(self.edges))
+        return self.groups[key]
+
+    def update(self, chunk):
+        """Fold a DataFrame chunk (source columns, not derived ones) into the totals."""
+        frame = MetricFrame(chunk)
+        X = np.column_stack([frame.column(m) for m in self.measures])
+        util = frame.column('utilization')
+        moments, hist = self._group(NETWORK)
+        moments.update(X)
+        hist.update(util)
+
+        schools = chunk['School'].astype(str).to_numpy()
+        labels = {
+            'region': chunk['Region'].fillna('').astype(str).to_numpy(),
+            'year': np.array([_year_label(y) for y in chunk['FiscalYear']], dtype=object),
+        }
+        for dim, values in labels.items():
+            groups = GroupIndex(values)
+            # Every group's histogram from one bincount over (group, bin)
+            counts = histogram(util, self.edges, by=groups).counts
+            for i, value in enumerate(groups.index):
+                if not value:
+                    continue
+                rows = groups.codes == i
+                moments, hist = self._group((dim, value))
+                moments.update(X[rows])
+                hist.counts += counts[i]
+                self._schools.setdefault((dim, value), set()).update(schools[rows])
+        self.rows += len(chunk)
+        return self
+
+    def __iadd__(self, other):
+        """Merge statistics streamed separately (e.g. one file per worker)."""
+        for key, (moments, hist) in other.groups.items():
+            mine_moments, mine_hist = self._group(key)
+            mine_moments += moments
+            mine_hist += hist
+        for key, schools in other._schools.items():
+            self._schools.setdefault(key, set()).update(schools)
+        self.rows += other.rows
+        return self
+
+    def schools(self, dim):
+        """{group value: number of distinct schools}."""
+        return {value: len(s) for (d, value), s in self._schools.items() if d == dim}
+
+
+def stream_statistics(source=CSV_PATH, measures=MEASURES, edges=UTIL_EDGES, chunksize=CHUNK_ROWS):
+    """Build StreamingStats for `source` one chunk at a time."""
+    stats = StreamingStats(measures, edges)
+    columns = source_columns(measures)
+    numeric = [c for c in columns if c not in KEY_COLUMNS] + ['FiscalYear']
+    for chunk in iter_school_data(columns, source, chunksize=chunksize, numeric=numeric):
+        stats.update(chunk)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a CSV extract into network, regional and yearly statistics')
+    parser.add_argument('source', nargs='?', default=CSV_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='rows per chunk (default: %(default)s)')
+    args = parser.parse_args()
+
+    stats = stream_statistics(args.source, chunksize=args.chunksize)
+    print(f"Streamed {stats.rows:,} rows from {args.source}")
+
+    print("\nEnquiry rate by region (mean enquiries per student FTE):")
+    rates = pd.Series(stats.means('region', 'rate')).sort_values(ascending=False)
+    schools = stats.schools('region')
+    for region, rate in rates.items():
+        print(f"  {region:<28} {rate:6.3f}  ({schools[region]} schools)")
+
+    print("\nStudent FTE by fiscal year:")
+    for year, total in sorted(stats.totals('year', 'StudentFTE').items()):
+        print(f"  FY{year}: {total:,.0f}")
+
+    print("\nUtilization histogram:")
+    for low, high, count in zip(stats.edges[:-1], stats.edges[1:], stats.histogram()):
+        print(f"  {low:>3}-{high:<3}% {count:>8,}")
+
+    print("\nPearson correlation with enquiries_started:")
+    corr = stats.correlation()['enquiries_started'].drop('enquiries_started')
+    for name, r in corr.sort_values(key=abs, ascending=False).items():
+        print(f"  {name:<30} {r:+.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Vectorized synthetic school metrics.
+
+Each school gets two hidden latents, drawn once: aggressiveness (growth vs
+boutique) and quality (academic excellence/care). They are broadcast to
+that school's rows by index, and every metric is drawn as a whole array from
+a seeded np.random.Generator:
+
+* StudentFTE  - regional base size x aggressiveness x yearly growth
+* CapacityFTE - FTE / target utilization (aggressive schools run hotter)
+* Fees        - regional base x quality
+* NPS         - quality, minus a penalty above 90% utilization
+* Attrition   - up with aggressiveness, down with quality
+* Leads       - size x aggressiveness
+* Enquiries   - leads x conversion (quality, penalized by attrition)
+
+`simulate_metrics()` rewrites the metrics of an existing panel
+(randomize_data.py); `synthetic_panel()` builds N schools x M years from
+scratch for load-test fixtures.
+"""
+import numpy as np
+import pandas as pd
+
+# Regional base parameters (size, fee base, growth factor)
+REGIONAL_PARAMS = {
+    'The Americas': {'size': 900, 'fee': 35000, 'growth': 1.2},
+    'Europe': {'size': 800, 'fee': 30000, 'growth': 1.0},
+    'China Bilingual': {'size': 1200, 'fee': 25000, 'growth': 1.5},
+    'China International': {'size': 1000, 'fee': 32000, 'growth': 1.1},
+    'South East Asia & India': {'size': 1100, 'fee': 22000, 'growth': 1.3},
+    'Middle East': {'size': 1500, 'fee': 20000, 'growth': 1.4}
+}
+DEFAULT_PARAMS = {'size': 800, 'fee': 25000, 'growth': 1.0}
+
+METRIC_COLUMNS = [
+    'StudentFTE', 'CapacityFTE', 'NAE_Overall_Average_Fee_USD', 'nps_score',
+    'nps_responses_count', 'Teachers_Attrition_Pct', 'leads_submitted', 'enquiries_started',
+]
+
+
+def school_latents(rng, n_schools):
+    """(aggressiveness, quality) arrays, one value per school."""
+    agg = rng.beta(2, 2, n_schools)   # 0 to 1
+    qual = rng.beta(3, 2, n_schools)  # 0 to 1
+    return agg, qual
+
+
+def _regional(region, key):
+    table = {r: p[key] for r, p in REGIONAL_PARAMS.items()}
+    return pd.Series(region).map(table).fillna(DEFAULT_PARAMS[key]).to_numpy(dtype=float)
+
+
+def simulate_metrics(region, fiscal_year, agg, qual, rng):
+    """Metric arrays for rows with the given region, year and (per-row) latents."""
+    n = len(agg)
+    year = np.asarray(fiscal_year, dtype=float)
+
+    # 1. StudentFTE (Size): Driven by region + aggressiveness, small yearly growth trend
+    year_factor = 1 + (year - 2020) * 0.05 * _regional(region, 'growth')
+    base_size = _regional(region, 'size') * (0.8 + 0.6 * agg)
+    fte = np.fmax(100, base_size * year_factor * rng.normal(1, 0.05, n))  # NaN year -> 100
+
+    # 2. Capacity: Aggressive schools run hotter (higher util)
+    cap_util = 0.7 + (0.4 * agg)
+    cap = fte / cap_util * rng.normal(1, 0.02, n)
+
+    # 3. Fees: Driven by Region + Quality
+    fee = _regional(region, 'fee') * (0.8 + 0.5 * qual) * rng.normal(1, 0.05, n)
+
+    # 4. NPS: Driven by Quality (Strong Positive) and mildly utilization (Negative)
+    util_penalty = np.maximum(0, (cap_util - 0.9) * 20)  # Penalty if over 90% utilized
+    nps = 10 + (qual * 60) - util_penalty + rng.normal(0, 5, n)
+
+    # 5. Teacher Attrition: High in Aggressive schools, Low in High Quality
+    attrition = np.clip(10 + (20 * agg) - (10 * qual) + rng.normal(0, 3, n), 2, 40)
+
+    # 6. Leads: Driven by Size (Scale) and Aggressiveness
+    leads = (fte * 1.2) * (0.5 + 1.5 * agg) * rng.normal(1, 0.1, n)
+
+    # 7. Enquiries: Conversion from Leads based on Quality, penalized by Attrition
+    attr_penalty = np.maximum(0.05, 1.3 - (attrition / 15))
+    conv_rate = (0.2 + 0.3 * qual) * attr_penalty
+    enquiries = np.maximum(10, leads * conv_rate * rng.normal(1, 0.05, n))
+
+    return {
+        'StudentFTE': np.trunc(fte),
+        'CapacityFTE': np.trunc(cap),
+        'NAE_Overall_Average_Fee_USD': np.trunc(fee),
+        'nps_score': np.round(nps, 1),
+        'nps_responses_count': np.trunc(fte * 0.2 * qual),  # More responses in good schools
+        'Teachers_Attrition_Pct': np.round(attrition, 1),
+        'leads_submitted': np.trunc(leads),
+        'enquiries_started': np.trunc(enquiries),
+    }
+
+
+def randomize_panel(df, seed=42):
+    """Copy of `df` with METRIC_COLUMNS regenerated from per-school latents."""
+    rng = np.random.default_rng(seed)
+    codes, schools = pd.factorize(df['School'])
+    agg, qual = school_latents(rng, len(schools))
+    known = codes >= 0  # rows without a School get the neutral latent
+    out = df.copy()
+    metrics = simulate_metrics(df['Region'].to_numpy(), df['FiscalYear'].to_numpy(dtype=float),
+                               np.where(known, agg[codes], 0.5), np.where(known, qual[codes], 0.5), rng)
+    for col, values in metrics.items():
+        out[col] = values
+    return out
+
+
+def synthetic_panel(n_schools, n_years, seed=0, start_year=2020, regions=None):
+    """N schools x M fiscal years of synthetic rows (School, FiscalYear, Region + metrics)."""
+    rng = np.random.default_rng(seed)
+    regions = list(regions or REGIONAL_PARAMS)
+    school_region = rng.integers(0, len(regions), n_schools)
+    agg, qual = school_latents(rng, n_schools)
+
+    school_idx = np.repeat(np.arange(n_schools), n_years)
+    years = np.tile(np.arange(start_year, start_year + n_years, dtype=float), n_schools)
+    region = np.asarray(regions, dtype=object)[school_region][school_idx]
+    names = np.array([f'School{i}' for i in range(1, n_schools + 1)], dtype=object)
+    df = pd.DataFrame({
+        'School': names[school_idx],
+        'FiscalYear': years,
+        'Region': region,
+    })
+    for col, values in simulate_metrics(region, years, agg[school_idx], qual[school_idx], rng).items():
+        df[col] = values
+    return df
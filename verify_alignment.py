@@ -4,7 +4,11 @@ Verify alignment between CSV data and HTML dashboard values.
 import pandas as pd
 import numpy as np
 
+from cube import Cube
+from hypotheses import DRIVERS, evaluate
+
 df = pd.read_csv('School Level Data.csv')
+cube = Cube.from_frame(df)
 
 print("=" * 60)
 print("DATA ALIGNMENT VERIFICATION REPORT")
@@ -14,7 +18,7 @@ print()
 # 1. Trend Data
 print("1. TREND DATA (Total StudentFTE by Year)")
 print("-" * 40)
-trend = df.groupby('FiscalYear')['StudentFTE'].sum()
+trend = cube.total('StudentFTE', 'FiscalYear')
 for yr, val in sorted(trend.items()):
     print(f"   FY{int(yr)}: {val:,.0f}")
 print()
@@ -22,8 +26,7 @@ print()
 # 2. Regional Performance
 print("2. REGIONAL PERFORMANCE (Rate = enquiries/student)")
 print("-" * 40)
-df['rate'] = df['enquiries_started'] / df['StudentFTE']
-regional = df.groupby('Region')['rate'].mean().sort_values(ascending=False)
+regional = cube.mean('rate', 'Region').sort_values(ascending=False)
 for reg, val in regional.items():
     if pd.notna(val):
         print(f"   {reg}: {val:.2f}")
@@ -32,18 +35,11 @@ print()
 # 3. Key Correlations
 print("3. CORRELATION ANALYSIS (Spearman rho)")
 print("-" * 40)
-metrics = {
-    'leads_submitted': 'Leads',
-    'NAE_Overall_Average_Fee_USD': 'Fees',
-    'StudentFTE': 'School Size',
-    'nps_score': 'NPS Score',
-    'Teachers_Attrition_Pct': 'Teacher Attrition'
-}
-for col, name in metrics.items():
-    valid = df[[col, 'enquiries_started']].dropna()
-    if len(valid) > 10:
-        corr = valid.corr(method='spearman').iloc[0, 1]
-        print(f"   {name}: rho = {corr:.3f} (n={len(valid)})")
+driver_results = evaluate(df, DRIVERS)
+for h in DRIVERS:
+    res = driver_results[h.id]
+    if res['n'] > 10:
+        print(f"   {h.name}: rho = {res['r']:.3f} (n={res['n']})")
 print()
 
 print("=" * 60)
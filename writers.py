@@ -0,0 +1,238 @@
+"""
+Output layer for scripts that rewrite School Level Data.
+
+`save_school_data()` writes one canonical, typed Parquet file synchronously
+(School Level Data.parquet) and leaves the CSV and XLSX exports to later:
+
+* 'background' (default): a detached worker process writes them while the
+  script carries on or exits;
+* 'lazy': nothing is exported until `python writers.py` (or
+  `export_pending()`) is run;
+* 'sync': exported before returning, like the old to_csv/to_excel calls.
+
+The mode can be set per call or with SCHOOL_DATA_EXPORTS, so a chained
+pipeline pays for one Excel write instead of one per step:
+
+    SCHOOL_DATA_EXPORTS=lazy python filter_top_schools.py
+    SCHOOL_DATA_EXPORTS=lazy python randomize_data.py
+    python writers.py                     # write the pending CSV/XLSX once
+
+The canonical file records the stamp (mtime, size) of each export as it
+was before the save. Loads through data_loader read the canonical file while
+an export still has that stamp, so later steps never see a stale CSV, and a
+CSV written or restored afterwards is read as is. An export is written to a
+temporary file and only replaces the old one if the canonical file has not
+changed in the meantime.
+
+XLSX is written row by row in write-only mode, a chunk of rows at a time:
+with xlsxwriter (faster, optional) in constant-memory mode, otherwise with
+openpyxl's write-only workbook.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from data_loader import (CSV_PATH, EXPORTS_KEY, ROW_GROUP_ROWS, XLSX_PATH, _typed, canonical_path,
+                         export_is_pending, file_stamp, recorded_exports)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # No canonical file; exports are written synchronously
+    pa = pq = None
+
+DEFAULT_EXPORTS = (CSV_PATH, XLSX_PATH)
+MODES = ('background', 'lazy', 'sync')
+XLSX_ENGINES = ('xlsxwriter', 'openpyxl')
+XLSX_CHUNK_ROWS = 10_000
+SHEET_NAME = 'Sheet1'
+
+
+def default_mode():
+    mode = os.environ.get('SCHOOL_DATA_EXPORTS', 'background')
+    if mode not in MODES:
+        raise ValueError(f"SCHOOL_DATA_EXPORTS must be one of {', '.join(MODES)}, got {mode!r}")
+    return mode
+
+
+# ----------------------------------------------------------------------------
+# Exports
+# ----------------------------------------------------------------------------
+def xlsx_engine(name=None):
+    """Name of the XLSX engine to use: `name`, or the fastest one installed."""
+    for engine in ([name] if name else XLSX_ENGINES):
+        try:
+            __import__(engine)
+            return engine
+        except ImportError:
+            if name:
+                raise
+    raise ImportError("Writing XLSX needs xlsxwriter or openpyxl")
+
+
+def _rows(df, chunk_rows=XLSX_CHUNK_ROWS):
+    """Rows as tuples of Python values (None for missing), converted a chunk at a time."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield from chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_xlsx(df, path, engine=None):
+    """Stream `df` to an XLSX file with a write-only workbook."""
+    engine = xlsx_engine(engine)
+    header = [str(c) for c in df.columns]
+    if engine == 'xlsxwriter':
+        import xlsxwriter
+        book = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        sheet = book.add_worksheet(SHEET_NAME)
+        sheet.write_row(0, 0, header)
+        for i, row in enumerate(_rows(df), start=1):
+            sheet.write_row(i, 0, row)
+        book.close()
+    else:
+        import openpyxl
+        book = openpyxl.Workbook(write_only=True)
+        sheet = book.create_sheet(SHEET_NAME)
+        sheet.append(header)
+        for row in _rows(df):
+            sheet.append(row)
+        book.save(path)
+
+
+def export(df, path, engine=None, canonical=None, stamp=None):
+    """Write `df` to `path` (CSV or XLSX by extension) through a temporary file.
+
+    With `canonical` and `stamp`, the new file only replaces `path` if the
+    canonical file still has that (mtime, size); returns False otherwise.
+    """
+    root, ext = os.path.splitext(path)
+    tmp = f'{root}.{os.getpid()}.tmp{ext}'
+    try:
+        if ext.lower() == '.csv':
+            df.to_csv(tmp, index=False)
+        elif ext.lower() == '.xlsx':
+            write_xlsx(df, tmp, engine)
+        else:
+            raise ValueError(f"Unsupported export format: {path}")
+        if canonical and stamp and file_stamp(canonical) != stamp:
+            return False  # Superseded by a newer save; that save exports its own data
+        os.replace(tmp, path)
+        return True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# ----------------------------------------------------------------------------
+# Canonical file
+# ----------------------------------------------------------------------------
+def write_canonical(df, path, exports=()):
+    """Atomically write the typed canonical Parquet file, recording the current stamp of each export."""
+    table = pa.Table.from_pandas(_typed(df), preserve_index=False)
+    stamps = {os.path.basename(p): file_stamp(p) for p in exports}
+    metadata = {**(table.schema.metadata or {}), EXPORTS_KEY: json.dumps(stamps).encode()}
+    tmp = path + '.tmp'
+    pq.write_table(table.replace_schema_metadata(metadata), tmp, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, path)
+    return path
+
+
+def pending_exports(canonical, exports=None):
+    """Recorded exports of `canonical` that are missing or unchanged since it was written."""
+    if not os.path.exists(canonical):
+        return []
+    recorded = recorded_exports(canonical)
+    folder = os.path.dirname(canonical)
+    if exports is None:
+        exports = [os.path.join(folder, name) for name in recorded]
+    return [p for p in exports
+            if os.path.basename(p) in recorded and export_is_pending(p, recorded[os.path.basename(p)])]
+
+
+def export_pending(canonical=None, exports=None, engine=None, stamp=None, quiet=False):
+    """Write the pending exports of `canonical` from it; returns the paths written."""
+    canonical = canonical or canonical_path(CSV_PATH)
+    pending = pending_exports(canonical, exports)
+    stamp = stamp or (file_stamp(canonical) if pending else None)
+    if not pending or file_stamp(canonical) != stamp:
+        return []
+    df = pd.read_parquet(canonical)
+    written = []
+    for path in pending:
+        start = time.perf_counter()
+        if not export(df, path, engine, canonical, stamp):
+            break
+        written.append(path)
+        if not quiet:
+            print(f"  ✓ Exported {path} ({time.perf_counter() - start:.1f}s)")
+    return written
+
+
+def export_in_background(canonical, engine=None):
+    """Start a detached process that writes the exports of the current `canonical`."""
+    mtime, size = file_stamp(canonical)
+    cmd = [sys.executable, os.path.abspath(__file__), '--canonical', canonical,
+           '--stamp', f'{mtime}:{size}', '--quiet']
+    if engine:
+        cmd += ['--xlsx-engine', engine]
+    return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def save_school_data(df, exports=DEFAULT_EXPORTS, mode=None, engine=None):
+    """Save `df` as the canonical Parquet file of `exports` and export them per `mode`.
+
+    All exports share the canonical file of the first one (same name,
+    .parquet). Returns the canonical path (the first export without pyarrow).
+    """
+    mode = mode or default_mode()
+    if mode not in MODES:
+        raise ValueError(f"Unknown export mode {mode!r}; expected one of {', '.join(MODES)}")
+    exports = list(exports)
+    if pq is None:
+        for path in exports:
+            export(df, path, engine)
+            print(f"✓ Saved {path}")
+        return exports[0]
+
+    canonical = write_canonical(df, canonical_path(exports[0]), exports)
+    print(f"✓ Saved {canonical} ({len(df)} rows)")
+    if mode == 'sync':
+        export_pending(canonical, exports, engine)
+    elif mode == 'background':
+        proc = export_in_background(canonical, engine)
+        print(f"  Exporting {', '.join(exports)} in the background (pid {proc.pid})")
+    else:
+        print(f"  {', '.join(exports)} pending; run `python writers.py` to export")
+    return canonical
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write pending CSV/XLSX exports of the canonical data file')
+    parser.add_argument('--canonical', default=canonical_path(CSV_PATH))
+    parser.add_argument('--xlsx-engine', choices=XLSX_ENGINES, default=None,
+                        help='default: xlsxwriter if installed, else openpyxl')
+    parser.add_argument('--status', action='store_true', help='list pending exports and exit')
+    parser.add_argument('--stamp', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--quiet', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if pq is None:
+        raise SystemExit("pyarrow is not installed: there is no canonical file to export from")
+    if args.status:
+        pending = pending_exports(args.canonical)
+        print('\n'.join(f"  pending: {p}" for p in pending) or "All exports up to date")
+        return
+    stamp = tuple(int(v) for v in args.stamp.split(':')) if args.stamp else None
+    written = export_pending(args.canonical, engine=args.xlsx_engine, stamp=stamp, quiet=args.quiet)
+    if not args.quiet and not written:
+        print("All exports up to date")
+
+
+if __name__ == '__main__':
+    main()